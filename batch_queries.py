@@ -0,0 +1,166 @@
+"""
+Batch Queries
+Answers a JSON-lines file of student questions without the interactive
+loop: queries stream from disk in chunks, each chunk's keyword misses are
+scored by the TF-IDF tier in one sparse product, the remaining misses are
+generated in batches on worker threads, and results are written out as
+each chunk finishes, so memory stays flat however long the file is
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_engine import Conversation, degrade_reply, generate_replies
+
+# Queries read, matched and written together
+DEFAULT_CHUNK_SIZE = 256
+
+# Knowledge base misses per generate call
+DEFAULT_GENERATE_BATCH = 8
+
+DEFAULT_BATCH_WORKERS = 2
+
+# Keys a query may be given under in an input line
+QUERY_KEYS = ('message', 'query', 'question')
+
+PROGRESS_EVERY = 10000
+
+
+def parse_line(line, line_number):
+    """(id, query) from one input line: {"id": ..., "message": ...} or a bare JSON string"""
+    item = json.loads(line)
+    if isinstance(item, str) and item.strip():
+        return line_number, item.strip()
+    if isinstance(item, dict):
+        for key in QUERY_KEYS:
+            if isinstance(item.get(key), str) and item[key].strip():
+                return item.get('id', line_number), item[key].strip()
+    raise ValueError(f"expected a string or an object with one of {', '.join(QUERY_KEYS)}")
+
+
+def read_chunks(f, chunk_size):
+    """Lists of (line_number, id, query, error) of at most chunk_size non-blank lines"""
+    chunk = []
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            item_id, query = parse_line(line, line_number)
+            chunk.append((line_number, item_id, query, None))
+        except ValueError as e:
+            chunk.append((line_number, line_number, None, str(e)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchRunner:
+    """Runs input files through a CollegeChatbotCLI's knowledge base and model.
+
+    Every query is answered as a fresh conversation: logged questions come
+    from different students, so none sees another's history. A query's
+    latency_ms is its share of its chunk's knowledge base pass, plus, for
+    AI replies, the whole generate call of its batch.
+    """
+
+    def __init__(self, bot, chunk_size=DEFAULT_CHUNK_SIZE, generate_batch=DEFAULT_GENERATE_BATCH,
+                 workers=DEFAULT_BATCH_WORKERS):
+        self.bot = bot
+        self.chunk_size = chunk_size
+        self.generate_batch = generate_batch
+        self.workers = workers
+        self.counts = {'kb': 0, 'ai': 0, 'miss': 0, 'error': 0}
+        self.deadline_hits = 0
+
+    def run(self, in_path, out_path):
+        bot = self.bot
+        if bot.model_thread is not None and bot.model_thread.is_alive():
+            print("⏳ Waiting for the AI model to load...")
+            bot.model_thread.join()
+
+        start = time.perf_counter()
+        processed = 0
+        with open(in_path, encoding='utf-8') as source, \
+                open(out_path, 'w', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            for chunk in read_chunks(source, self.chunk_size):
+                for record in self.answer_chunk(chunk, executor):
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    self.counts[record['source']] += 1
+                    self.deadline_hits += record.get('deadline_hit', False)
+                out.flush()
+
+                previous, processed = processed, processed + len(chunk)
+                if processed // PROGRESS_EVERY > previous // PROGRESS_EVERY:
+                    print(f"  {processed} queries, {processed / (time.perf_counter() - start):.0f}/s",
+                          file=sys.stderr, flush=True)
+
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f"{count} {source}" for source, count in self.counts.items())
+        print(f"✓ {processed} queries in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.0f}/s): {summary}")
+        if self.deadline_hits:
+            print(f"⏱️ {self.deadline_hits} AI replies cut short at the {bot.reply_deadline:g}s deadline")
+        return self.counts
+
+    def answer_chunk(self, chunk, executor):
+        """Output records for one chunk, in input order"""
+        kb_index = self.bot.kb_index
+        queries = [query for _, _, query, error in chunk if error is None]
+
+        kb_start = time.perf_counter()
+        categories = iter(kb_index.find_categories(queries))
+        kb_ms = (time.perf_counter() - kb_start) * 1000 / max(len(chunk), 1)
+
+        records = []
+        misses = []
+        for line_number, item_id, query, error in chunk:
+            if error is not None:
+                records.append({'id': item_id, 'line': line_number, 'source': 'error', 'error': error})
+                continue
+            category = next(categories)
+            record = {'id': item_id, 'message': query, 'response': None, 'source': 'miss',
+                      'latency_ms': round(kb_ms, 3)}
+            if category is not None:
+                record.update(response=kb_index.knowledge_base[category]['response'], source='kb',
+                              category=category)
+            elif self.bot.model is not None:
+                misses.append(record)
+            records.append(record)
+
+        batches = [misses[i:i + self.generate_batch] for i in range(0, len(misses), self.generate_batch)]
+        futures = [executor.submit(self.generate, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                future.result()
+            except Exception as e:
+                # One failed generate call loses its own batch, not the run
+                for record in batch:
+                    record.pop('cached', None)
+                    record.pop('deadline_hit', None)
+                    record.update(source='error', response=None, error=f"generation failed: {e}")
+        return records
+
+    def generate(self, batch):
+        """Fill in AI replies for one batch of knowledge base misses"""
+        bot = self.bot
+        conversations = [Conversation() for _ in batch]
+        deadline = time.perf_counter() + bot.reply_deadline if bot.reply_deadline else None
+        replies = generate_replies(
+            bot.model, bot.tokenizer, [(c, record['message']) for c, record in zip(conversations, batch)],
+            max_new_tokens=bot.max_new_tokens,
+            response_cache=bot.response_cache,
+            deterministic=bot.deterministic,
+            deadline=deadline
+        )
+        for record, conversation, reply in zip(batch, conversations, replies):
+            timing = conversation.last_timing
+            record.update(source='ai', latency_ms=round(record['latency_ms'] + timing['total_latency'] * 1000, 3),
+                          cached=timing['cached'])
+            if timing.get('deadline_hit'):
+                record['deadline_hit'] = True
+                reply = degrade_reply(reply, lambda: bot.kb_index.nearest_answer(record['message']))
+            record['response'] = reply or None
@@ -0,0 +1,106 @@
+"""
+Batch Scheduler
+Collects pending AI fallback turns for a few milliseconds and generates them together
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from chat_engine import DEFAULT_MAX_NEW_TOKENS, generate_replies
+
+
+class BatchScheduler:
+    """Micro-batching front end for chat_engine.generate_replies.
+
+    `submit` returns a Future for the reply. A background thread waits for
+    the first pending turn, then keeps collecting until `max_batch_size`
+    turns are waiting or `max_wait_ms` has passed, and runs them as one
+    batch. Two turns of the same conversation never share a batch; the
+    later one waits for the next batch so history stays in order. A batch
+    stops at the earliest deadline among its turns.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=8, max_wait_ms=10,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS, response_cache=None, deterministic=False):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_new_tokens = max_new_tokens
+        self.response_cache = response_cache
+        self.deterministic = deterministic
+
+        self.pending = queue.Queue()
+        self.deferred = []
+        self.batches_run = 0
+        self.turns_run = 0
+
+        self.worker = threading.Thread(target=self.run, daemon=True, name="batch-scheduler")
+        self.worker.start()
+
+    def submit(self, conversation, user_input, deadline=None):
+        """Queue one turn; the returned Future resolves to the reply text"""
+        future = Future()
+        self.pending.put((conversation, user_input, future, deadline))
+        return future
+
+    def collect_batch(self):
+        """Block for the first turn, then gather more until full or the window closes"""
+        batch = []
+        conversations = set()
+        deferred, self.deferred = self.deferred, []
+        for item in deferred:
+            if id(item[0]) in conversations or len(batch) >= self.max_batch_size:
+                self.deferred.append(item)
+            else:
+                conversations.add(id(item[0]))
+                batch.append(item)
+
+        if not batch:
+            item = self.pending.get()
+            conversations.add(id(item[0]))
+            batch.append(item)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if id(item[0]) in conversations:
+                self.deferred.append(item)
+            else:
+                conversations.add(id(item[0]))
+                batch.append(item)
+
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect_batch()
+            turns = [(conversation, user_input) for conversation, user_input, _, _ in batch]
+            deadlines = [deadline for _, _, _, deadline in batch if deadline is not None]
+
+            try:
+                replies = generate_replies(
+                    self.model, self.tokenizer, turns,
+                    max_new_tokens=self.max_new_tokens,
+                    response_cache=self.response_cache,
+                    deterministic=self.deterministic,
+                    deadline=min(deadlines) if deadlines else None
+                )
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.turns_run += len(batch)
+            for (_, _, future, _), reply in zip(batch, replies):
+                future.set_result(reply)
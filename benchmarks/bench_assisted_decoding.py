@@ -0,0 +1,161 @@
+"""
+Benchmark: assisted decoding with a draft model vs plain generate
+Run: python benchmarks/bench_assisted_decoding.py [--turns 24] [--deterministic]
+     python benchmarks/bench_assisted_decoding.py --real [--model-size medium] [--draft-model small]
+
+Answers the replay queries the knowledge base misses, one conversation
+after another, with generate_reply, once plainly and once with the draft
+model as assistant_model. Reports tokens/s, the model's forward passes per
+token, the draft's acceptance rate and the draft's memory cost.
+
+Offline by default: the model is a 12-layer stand-in and the draft its
+first --draft-layers layers (same embeddings and tokenizer), so the
+numbers show the mechanics, not DialoGPT's. --real loads DialoGPT
+through model_loader (hub cache or --model-path/--draft-model-path).
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE, Conversation, generate_reply
+from kb_store import load_index
+from model_loader import DEFAULT_PRECISION, MODEL_SIZES, PRECISIONS, load_draft_model, load_model
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+# Turns per conversation before it starts over
+TURNS_PER_CONVERSATION = 4
+
+
+def rss_mb():
+    """Resident set size of this process in MB, from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def parameter_mb(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+
+
+def missed_queries():
+    kb_index = load_index()
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [query for query in queries if kb_index.find_answer(query) is None]
+
+
+class ForwardCounter:
+    """Counts forward passes of a model through a hook"""
+
+    def __init__(self, model):
+        self.calls = 0
+        self.handle = model.register_forward_hook(self.count)
+
+    def count(self, module, inputs, output):
+        self.calls += 1
+
+
+def run(model, tokenizer, prompts, max_new_tokens, deterministic, draft=None):
+    """One pass over the prompts; returns tokens, seconds and forward pass counts"""
+    import torch
+
+    model_calls = ForwardCounter(model)
+    draft_calls = ForwardCounter(draft) if draft is not None else None
+    torch.manual_seed(0)
+    tokens = 0
+    seconds = 0.0
+    conversation = Conversation()
+    for turn, prompt in enumerate(prompts):
+        if turn % TURNS_PER_CONVERSATION == 0:
+            conversation.reset()
+        generate_reply(model, tokenizer, conversation, prompt, max_new_tokens=max_new_tokens,
+                       deterministic=deterministic, assistant_model=draft)
+        tokens += conversation.last_timing['new_tokens']
+        seconds += conversation.last_timing['generate']
+    model_calls.handle.remove()
+    result = {'tokens': tokens, 'seconds': seconds, 'tokens_per_second': tokens / seconds,
+              'model_forwards': model_calls.calls}
+    if draft_calls is not None:
+        draft_calls.handle.remove()
+        # Every verification pass yields the accepted draft tokens plus one
+        # of the model's own; every draft forward proposes one token
+        accepted = tokens - model_calls.calls
+        result['draft_forwards'] = draft_calls.calls
+        result['acceptance_rate'] = accepted / draft_calls.calls if draft_calls.calls else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=24)
+    parser.add_argument('--max-new-tokens', type=int, default=48)
+    parser.add_argument('--deterministic', action='store_true', help="greedy decoding instead of sampling")
+    parser.add_argument('--draft-layers', type=int, default=2, help="stand-in draft: layers kept from the model")
+    parser.add_argument('--real', action='store_true', help="DialoGPT through model_loader instead of the stand-in")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default='medium')
+    parser.add_argument('--draft-model', choices=list(MODEL_SIZES), default='small')
+    parser.add_argument('--precision', choices=PRECISIONS, default=DEFAULT_PRECISION)
+    parser.add_argument('--model-path')
+    parser.add_argument('--draft-model-path')
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    if not TRANSFORMERS_AVAILABLE:
+        print("transformers is not installed: skipped")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        prompts = missed_queries()
+    prompts = (prompts * (args.turns // len(prompts) + 1))[:args.turns]
+
+    if args.real:
+        tokenizer, model = load_model(args.model_size, args.precision, model_path=args.model_path)
+        before = rss_mb()
+        draft = load_draft_model(args.draft_model, args.precision, args.draft_model_path, model.config.vocab_size)
+        label = f"DialoGPT-{args.model_size}, draft DialoGPT-{args.draft_model} ({args.precision})"
+    else:
+        tokenizer, model = load_stand_in_model(n_layer=12, n_embd=256)
+        before = rss_mb()
+        draft = copy.deepcopy(model)
+        draft.transformer.h = draft.transformer.h[:args.draft_layers]
+        draft.config.n_layer = args.draft_layers
+        label = f"stand-in 12 layers, draft its first {args.draft_layers}"
+    draft_rss = rss_mb() - before
+
+    run(model, tokenizer, prompts[:2], args.max_new_tokens, args.deterministic)
+    run(model, tokenizer, prompts[:2], args.max_new_tokens, args.deterministic, draft)
+    results = {
+        'plain': run(model, tokenizer, prompts, args.max_new_tokens, args.deterministic),
+        'assisted': run(model, tokenizer, prompts, args.max_new_tokens, args.deterministic, draft),
+        'draft_parameter_mb': parameter_mb(draft),
+        'draft_rss_mb': draft_rss,
+        'model_parameter_mb': parameter_mb(model),
+    }
+
+    print(f"{label}, {'greedy' if args.deterministic else 'sampling'}, {args.turns} turns\n")
+    print(f"{'variant':<10} {'tokens':>7} {'tok/s':>8} {'fwd/token':>10} {'acceptance':>11}")
+    for variant in ('plain', 'assisted'):
+        result = results[variant]
+        acceptance = f"{result['acceptance_rate'] * 100:>10.1f}%" if 'acceptance_rate' in result else f"{'-':>11}"
+        print(f"{variant:<10} {result['tokens']:>7} {result['tokens_per_second']:>8.1f} "
+              f"{result['model_forwards'] / max(result['tokens'], 1):>10.2f} {acceptance}")
+    print(f"\nspeed-up {results['assisted']['tokens_per_second'] / results['plain']['tokens_per_second']:.2f}x; "
+          f"draft adds {results['draft_parameter_mb']:.0f} MB of weights "
+          f"(RSS +{results['draft_rss_mb']:.0f} MB; model {results['model_parameter_mb']:.0f} MB)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: eager PyTorch vs the ONNX Runtime backend
+Run: python benchmarks/bench_backends.py [--turns 24] [--max-new-tokens 48] [--batch-size 8]
+     python benchmarks/bench_backends.py --real --model-path models/dialogpt-medium
+
+Checks greedy parity first: the replay queries the knowledge base misses
+are answered, two turns each, by both backends and their token ids
+compared. Then, per backend: the forward latency of one decoding step at
+a 128-token past, reply latency and tokens/s over conversations answered
+one at a time (generate_reply), and tokens/s for batches
+(generate_replies).
+
+Offline by default: the stand-in at DialoGPT-small's depth and width
+(its vocabulary is far smaller) is exported to a temporary directory.
+--real uses a snapshot exported with export_snapshot.py --onnx.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE, Conversation, generate_replies, generate_reply
+from kb_store import load_index
+from model_loader import load_model
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+# Turns per conversation before it starts over
+TURNS_PER_CONVERSATION = 4
+
+STEP_PAST_TOKENS = 128
+STEP_REPEATS = 200
+
+
+def missed_queries():
+    kb_index = load_index()
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [query for query in queries if kb_index.find_answer(query) is None]
+
+
+def step_latency_ms(model):
+    """Median forward time of one new token on top of a STEP_PAST_TOKENS-token KV cache"""
+    import torch
+
+    with torch.no_grad():
+        past = model(torch.ones(1, STEP_PAST_TOKENS, dtype=torch.long), use_cache=True).past_key_values
+        token = torch.ones(1, 1, dtype=torch.long)
+        samples = []
+        for _ in range(STEP_REPEATS):
+            start = time.perf_counter()
+            model(token, past_key_values=past, use_cache=True)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run_single(model, tokenizer, prompts, max_new_tokens):
+    latencies = []
+    tokens = 0
+    seconds = 0.0
+    conversation = Conversation()
+    for turn, prompt in enumerate(prompts):
+        if turn % TURNS_PER_CONVERSATION == 0:
+            conversation.reset()
+        generate_reply(model, tokenizer, conversation, prompt, max_new_tokens=max_new_tokens, deterministic=True)
+        latencies.append(conversation.last_timing['total_latency'])
+        tokens += conversation.last_timing['new_tokens']
+        seconds += conversation.last_timing['generate']
+    ordered = sorted(latencies)
+    return {
+        'reply_p50_ms': statistics.median(ordered) * 1000,
+        'reply_p95_ms': ordered[int((len(ordered) - 1) * 0.95)] * 1000,
+        'tokens_per_second': tokens / seconds,
+    }
+
+
+def run_batched(model, tokenizer, prompts, max_new_tokens, batch_size):
+    tokens = 0
+    start = time.perf_counter()
+    for first in range(0, len(prompts), batch_size):
+        turns = [(Conversation(), prompt) for prompt in prompts[first:first + batch_size]]
+        generate_replies(model, tokenizer, turns, max_new_tokens=max_new_tokens, deterministic=True)
+        tokens += sum(conversation.last_timing['new_tokens'] for conversation, _ in turns)
+    return tokens / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=24)
+    parser.add_argument('--max-new-tokens', type=int, default=48)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--real', action='store_true', help="a DialoGPT snapshot instead of the stand-in")
+    parser.add_argument('--model-path', help="snapshot with model.onnx (export_snapshot.py --onnx)")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    if not TRANSFORMERS_AVAILABLE:
+        print("transformers is not installed: skipped")
+        return
+    from onnx_backend import ONNXRUNTIME_AVAILABLE, export_onnx, greedy_parity, load_onnx_model
+    if not ONNXRUNTIME_AVAILABLE:
+        print("onnxruntime is not installed: skipped")
+        return
+    if args.real and not args.model_path:
+        parser.error("--real needs --model-path")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        prompts = missed_queries()
+    prompts = (prompts * (args.turns // len(prompts) + 1))[:args.turns]
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.real:
+            tokenizer, eager = load_model(model_path=args.model_path)
+            onnx = load_model(model_path=args.model_path, backend='onnx')[1]
+            label = f"{args.model_path} (fp32)"
+        else:
+            tokenizer, eager = load_stand_in_model(n_layer=12, n_embd=768, n_head=12)
+            eager.config.save_pretrained(directory)
+            export_onnx(eager, directory)
+            onnx = load_onnx_model(directory)
+            label = "stand-in, 12 layers x 768"
+        backends = {'eager': eager, 'onnx': onnx}
+
+        mismatches = greedy_parity(eager, onnx, tokenizer, prompts=sorted(set(prompts)),
+                                   max_new_tokens=args.max_new_tokens)
+        results = {'parity_prompts': len(set(prompts)), 'parity_mismatches': mismatches}
+        for name, model in backends.items():
+            run_single(model, tokenizer, prompts[:2], args.max_new_tokens)
+            results[name] = run_single(model, tokenizer, prompts, args.max_new_tokens)
+            results[name]['step_ms'] = step_latency_ms(model)
+            results[name]['batched_tokens_per_second'] = run_batched(
+                model, tokenizer, prompts, args.max_new_tokens, args.batch_size)
+
+    print(f"{label}, greedy, {args.turns} turns\n")
+    status = "✓ identical" if not mismatches else f"✗ {len(mismatches)} differ"
+    print(f"token-id parity over {results['parity_prompts']} prompts x 2 turns: {status}\n")
+    print(f"{'backend':<8} {'step ms':>8} {'reply p50':>10} {'reply p95':>10} {'tok/s':>8} "
+          f"{'batch ' + str(args.batch_size) + ' tok/s':>14}")
+    for name in backends:
+        result = results[name]
+        print(f"{name:<8} {result['step_ms']:>8.2f} {result['reply_p50_ms']:>10.1f} {result['reply_p95_ms']:>10.1f} "
+              f"{result['tokens_per_second']:>8.1f} {result['batched_tokens_per_second']:>14.1f}")
+    print(f"\nonnx speed-up {results['onnx']['tokens_per_second'] / results['eager']['tokens_per_second']:.2f}x "
+          f"one at a time, {results['onnx']['batched_tokens_per_second'] / results['eager']['batched_tokens_per_second']:.2f}x batched")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: CLI batch mode throughput and memory
+Run: python benchmarks/bench_batch_mode.py [--sizes 10000,100000,1000000] [--ai-queries 200]
+
+- knowledge base: input files of each --sizes lines (replay queries,
+  repeated) answered with --kb-only, each in a fresh subprocess; reports
+  queries/s and peak RSS, which should not grow with the file
+- AI misses: --ai-queries knowledge base misses generated with the offline
+  stand-in model one at a time vs in batches on worker threads
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_queries import DEFAULT_BATCH_WORKERS, DEFAULT_GENERATE_BATCH, BatchRunner
+from chat_engine import TRANSFORMERS_AVAILABLE
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+
+def read_queries():
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def write_input(path, queries, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            f.write(json.dumps({'id': i, 'message': queries[i % len(queries)]}) + '\n')
+
+
+def quiet_bot(**kwargs):
+    from chatbot_cli import CollegeChatbotCLI
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CollegeChatbotCLI(watch_kb=False, **kwargs)
+
+
+def measure_kb(in_path, out_path):
+    """Run inside the worker subprocess; returns one result dict"""
+    bot = quiet_bot(kb_only=True)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = BatchRunner(bot).run(in_path, out_path)
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'counts': counts, 'peak_rss_mb': peak_rss_mb()}
+
+
+def run_worker(in_path, out_path):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', in_path, out_path],
+        capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr else "worker failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def measure_ai(queries, count, directory):
+    """Seconds to answer `count` misses unbatched vs batched"""
+    bot = quiet_bot(kb_only=True)
+    bot.tokenizer, bot.model = load_stand_in_model()
+    bot.max_new_tokens = 32
+    misses = [query for query in queries if bot.find_answer(query) is None]
+    in_path = os.path.join(directory, 'misses.jsonl')
+    write_input(in_path, misses, count)
+    out_path = os.path.join(directory, 'misses.out.jsonl')
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        BatchRunner(bot, generate_batch=2, workers=1).run(in_path, out_path)
+    for label, generate_batch, workers in [('one at a time', 1, 1),
+                                           ('batched', DEFAULT_GENERATE_BATCH, DEFAULT_BATCH_WORKERS)]:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            BatchRunner(bot, generate_batch=generate_batch, workers=workers).run(in_path, out_path)
+        results[label] = time.perf_counter() - start
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="comma-separated input line counts")
+    parser.add_argument('--ai-queries', type=int, default=200, help="AI misses to generate (0 to skip)")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--worker', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure_kb(*args.worker)))
+        return
+
+    queries = read_queries()
+    results = {'knowledge_base': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        in_path = os.path.join(directory, 'in.jsonl')
+        out_path = os.path.join(directory, 'out.jsonl')
+        print(f"{'lines':>9} {'seconds':>8} {'queries/s':>10} {'peak RSS MB':>12}")
+        for size in [int(size) for size in args.sizes.split(',')]:
+            write_input(in_path, queries, size)
+            result = run_worker(in_path, out_path)
+            results['knowledge_base'][size] = result
+            print(f"{size:>9} {result['seconds']:>8.1f} {size / result['seconds']:>10.0f} "
+                  f"{result['peak_rss_mb']:>12.1f}")
+
+        if TRANSFORMERS_AVAILABLE and args.ai_queries > 0:
+            results['ai'] = measure_ai(queries, args.ai_queries, directory)
+            print(f"\n{args.ai_queries} AI misses (stand-in model)")
+            for label, seconds in results['ai'].items():
+                print(f"{label:<14} {seconds:>8.2f} s {args.ai_queries / seconds:>8.1f} queries/s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: generation throughput of batched vs one-at-a-time replies on CPU
+Run: python benchmarks/bench_batching.py [--model microsoft/DialoGPT-medium] [--max-new-tokens 32]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from chat_engine import Conversation, generate_replies
+
+
+BATCH_SIZES = [1, 4, 8, 16]
+
+PROMPTS = [
+    "what is the dress code",
+    "is there a bus to the campus",
+    "can i bring my bike",
+    "what time does the canteen close",
+    "are there any clubs for music and dance on weekends",
+    "how big is the campus",
+    "do you have a swimming pool",
+    "who is the dean of engineering",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default="microsoft/DialoGPT-medium")
+    parser.add_argument('--max-new-tokens', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model)
+    model.eval()
+
+    # Warm up kernels and allocator before timing
+    generate_replies(model, tokenizer, [(Conversation(), PROMPTS[0])], max_new_tokens=4)
+
+    print(f"{'batch':>6} {'replies/s':>10} {'tokens/s':>9} {'ms/batch':>9}")
+    for batch_size in BATCH_SIZES:
+        elapsed = 0.0
+        replies = 0
+        tokens = 0
+        for _ in range(args.rounds):
+            turns = [(Conversation(), PROMPTS[i % len(PROMPTS)]) for i in range(batch_size)]
+            start = time.perf_counter()
+            outputs = generate_replies(model, tokenizer, turns, max_new_tokens=args.max_new_tokens)
+            elapsed += time.perf_counter() - start
+            replies += len(outputs)
+            tokens += sum(len(tokenizer.encode(reply)) for reply in outputs)
+
+        print(f"{batch_size:>6} {replies / elapsed:>10.2f} {tokens / elapsed:>9.1f} {elapsed / args.rounds * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: FuzzyIndex lookup cost as the number of indexed keywords grows
+Run: python benchmarks/bench_fuzzy_index.py
+"""
+
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_index import SUBSTITUTION_LENGTH, FuzzyIndex, edit_distance, is_slip, max_distance_for
+
+
+SIZES = [100, 1000, 10000, 50000]
+LOOKUPS = 500
+LINEAR_SCAN_LIMIT = 1000
+
+
+def random_word(rng):
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 11)))
+
+
+def misspell(word, rng):
+    """Apply one random typo: deletion, insertion, substitution or swap"""
+    i = rng.randrange(1, len(word))
+    kind = rng.choice(('delete', 'insert', 'substitute', 'swap'))
+    if kind == 'delete':
+        return word[:i] + word[i + 1:]
+    if kind == 'insert':
+        return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i:]
+    if kind == 'substitute':
+        return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+    if i == len(word) - 1:
+        i -= 1
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def linear_lookup(words, token):
+    """Reference: compare the token against every word"""
+    limit = max_distance_for(token)
+    if limit == 0:
+        return None
+    found = []
+    for rank, word in enumerate(words):
+        if word[0] != token[0]:
+            continue
+        distance = edit_distance(token, word, limit)
+        if distance > limit or (len(token) < SUBSTITUTION_LENGTH and not is_slip(token, word)):
+            continue
+        found.append((distance, rank, word))
+    if not found:
+        return None
+    best = min(found)
+    if sum(1 for candidate in found if candidate[0] == best[0]) > 1:
+        return None
+    return best
+
+
+def main():
+    rng = random.Random(7)
+
+    print(f"{'keywords':>9} {'build (s)':>10} {'index (us)':>11} {'linear (us)':>12} {'resolved':>9}")
+    for size in SIZES:
+        words = list(dict.fromkeys(random_word(rng) for _ in range(size)))
+        queries = [misspell(rng.choice(words), rng) for _ in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        index = FuzzyIndex({word: rank for rank, word in enumerate(words)})
+        build = time.perf_counter() - start
+
+        per_lookup = timeit.timeit(lambda: [index.lookup(q) for q in queries], number=3) / (3 * LOOKUPS)
+        resolved = sum(1 for q in queries if index.lookup(q) is not None) / LOOKUPS
+
+        linear = ''
+        if size <= LINEAR_SCAN_LIMIT:
+            sample = queries[:50]
+            for q in sample:
+                assert linear_lookup(words, q) == index.lookup(q), q
+            per_linear = timeit.timeit(lambda: [linear_lookup(words, q) for q in sample], number=1) / len(sample)
+            linear = f"{per_linear * 1e6:.1f}"
+
+        print(f"{len(words):>9} {build:>10.2f} {per_lookup * 1e6:>11.1f} {linear:>12} {resolved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark: resident memory, tokens/sec and output quality per inference mode
+Run: python benchmarks/bench_inference_modes.py [--sizes small medium] [--precisions fp32 bf16 int8]
+
+Each mode is measured in a fresh subprocess so RSS is not shared between
+modes. Quality is the perplexity of a fixed set of reference dialogue
+turns (lower is better) plus the greedy reply to one prompt, so a mode
+that degrades the model badly stands out next to fp32.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_loader import MODEL_SIZES, PRECISIONS
+
+
+REFERENCE_DIALOGUE = [
+    ("Hi, how are you today?", "I'm good, thanks for asking. How about you?"),
+    ("Do you like studying at college?", "Yes, I enjoy my classes and meeting new people."),
+    ("What is your favourite subject?", "I really like computer science."),
+    ("Are you going to the library later?", "Yes, I need to return a book."),
+]
+
+SPEED_PROMPT = "What do you like to do on weekends?"
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(model_size, precision, new_tokens):
+    """Run inside the worker subprocess; returns one result dict"""
+    import torch
+    from model_loader import load_model
+
+    torch.manual_seed(0)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    tokenizer, model = load_model(model_size, precision)
+    load_time = time.perf_counter() - start
+    rss_loaded = current_rss_mb()
+    if precision == 'bf16' and model.dtype != torch.bfloat16:
+        precision = 'bf16->fp32'
+
+    eos = tokenizer.eos_token
+    total_loss = 0.0
+    total_tokens = 0
+    with torch.no_grad():
+        for question, answer in REFERENCE_DIALOGUE:
+            prompt_ids = tokenizer.encode(question + eos, return_tensors='pt')
+            answer_ids = tokenizer.encode(answer + eos, return_tensors='pt')
+            input_ids = torch.cat([prompt_ids, answer_ids], dim=-1)
+            labels = input_ids.clone()
+            labels[:, :prompt_ids.shape[-1]] = -100
+            loss = model(input_ids, labels=labels).loss.float().item()
+            total_loss += loss * answer_ids.shape[-1]
+            total_tokens += answer_ids.shape[-1]
+    perplexity = float(torch.exp(torch.tensor(total_loss / total_tokens)))
+
+    input_ids = tokenizer.encode(SPEED_PROMPT + eos, return_tensors='pt')
+    attention_mask = torch.ones_like(input_ids)
+    with torch.no_grad():
+        model.generate(input_ids, attention_mask=attention_mask, max_new_tokens=4,
+                       pad_token_id=tokenizer.eos_token_id)
+        start = time.perf_counter()
+        output = model.generate(
+            input_ids, attention_mask=attention_mask,
+            max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+            do_sample=False, pad_token_id=tokenizer.eos_token_id,
+        )
+        elapsed = time.perf_counter() - start
+
+    greedy_ids = output[0, input_ids.shape[-1]:]
+    first_eos = (greedy_ids == tokenizer.eos_token_id).nonzero().flatten()
+    reply_ids = greedy_ids[:first_eos[0]] if len(first_eos) else greedy_ids
+
+    return {
+        'model_size': model_size,
+        'precision': precision,
+        'load_seconds': load_time,
+        'rss_mb': rss_loaded,
+        'model_rss_mb': rss_loaded - rss_before,
+        'tokens_per_second': (output.shape[-1] - input_ids.shape[-1]) / elapsed,
+        'perplexity': perplexity,
+        'greedy_reply': tokenizer.decode(reply_ids, skip_special_tokens=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(MODEL_SIZES), default=['small', 'medium'])
+    parser.add_argument('--precisions', nargs='+', choices=PRECISIONS, default=list(PRECISIONS))
+    parser.add_argument('--new-tokens', type=int, default=32)
+    parser.add_argument('--json', help="also write results to this file")
+    parser.add_argument('--worker', nargs=2, metavar=('SIZE', 'PRECISION'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, args.new_tokens)))
+        return
+
+    results = []
+    print(f"{'mode':<16} {'RSS (MB)':>9} {'model (MB)':>11} {'load (s)':>9} {'tok/s':>7} {'ppl':>8}  greedy reply")
+    for size in args.sizes:
+        for precision in args.precisions:
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', size, precision,
+                 '--new-tokens', str(args.new_tokens)],
+                capture_output=True, text=True,
+            )
+            if process.returncode != 0:
+                print(f"{size}/{precision:<10} failed: {process.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(process.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{size + '/' + result['precision']:<16} {result['rss_mb']:>9.0f} {result['model_rss_mb']:>11.0f} "
+                  f"{result['load_seconds']:>9.1f} {result['tokens_per_second']:>7.1f} {result['perplexity']:>8.1f}  "
+                  f"{result['greedy_reply'][:40]!r}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
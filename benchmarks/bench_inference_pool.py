@@ -0,0 +1,155 @@
+"""
+Benchmark: front-end responsiveness and throughput, in-process vs inference pool
+Run: python benchmarks/bench_inference_pool.py [--workers 2] [--conversations 4] [--turns 6]
+
+- tick lateness: a 16 ms "main loop" tick doing a little Python work (like
+  Tk's event loop) runs while replies are generated in a background thread;
+  reports how late the ticks fire, idle vs in-process vs pooled generation
+- throughput: --conversations conversations answered concurrently from
+  threads, total new tokens per second, in-process vs --workers workers
+
+Uses the offline stand-in model. Worker processes share its weights; on a
+box with fewer CPUs than workers the pool can only show the responsiveness
+win, not the throughput one.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE, Conversation, generate_reply
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+TICK_MS = 16
+
+
+def read_queries():
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def tick_work():
+    """A little pure-Python work, roughly one Tk event loop iteration's worth"""
+    return sum(i * i for i in range(2000))
+
+
+def tick_lateness(model, tokenizer, queries, seconds, max_new_tokens):
+    """Lateness of each tick in ms while generate_reply runs in a background thread (model=None: idle)"""
+    stop = threading.Event()
+
+    def generate():
+        conversation = Conversation()
+        i = 0
+        while not stop.is_set():
+            generate_reply(model, tokenizer, conversation, queries[i % len(queries)], max_new_tokens=max_new_tokens)
+            i += 1
+
+    thread = None
+    if model is not None:
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        time.sleep(0.2)
+
+    lateness = []
+    due = time.perf_counter() + TICK_MS / 1000
+    end = time.perf_counter() + seconds
+    while due < end:
+        time.sleep(max(0.0, due - time.perf_counter()))
+        lateness.append((time.perf_counter() - due) * 1000)
+        tick_work()
+        due = max(due + TICK_MS / 1000, time.perf_counter())
+
+    stop.set()
+    if thread is not None:
+        thread.join()
+    ordered = sorted(lateness)
+    return {
+        'ticks': len(ordered),
+        'p50': statistics.median(ordered),
+        'p95': ordered[int((len(ordered) - 1) * 0.95)],
+        'max': ordered[-1],
+    }
+
+
+def throughput(model, tokenizer, queries, conversations, turns, max_new_tokens):
+    """New tokens per second with `conversations` threads each answering `turns` queries"""
+    tokens = [0] * conversations
+
+    def run(index):
+        conversation = Conversation()
+        for turn in range(turns):
+            generate_reply(model, tokenizer, conversation, queries[(index * turns + turn) % len(queries)],
+                           max_new_tokens=max_new_tokens)
+            tokens[index] += conversation.last_timing['new_tokens']
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(conversations)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'tokens': sum(tokens), 'seconds': elapsed, 'tokens_per_second': sum(tokens) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads-per-worker', type=int)
+    parser.add_argument('--conversations', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=6)
+    parser.add_argument('--max-new-tokens', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5.0, help="length of each tick lateness run")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    if not TRANSFORMERS_AVAILABLE:
+        print("transformers is not installed: skipped")
+        return
+
+    from inference_pool import InferencePool
+
+    queries = read_queries()
+    tokenizer, model = load_stand_in_model()
+    start = time.perf_counter()
+    pool = InferencePool(load_stand_in_model, args.workers, args.threads_per_worker, args.max_new_tokens)
+    startup = time.perf_counter() - start
+    print(f"{os.cpu_count()} CPUs, pool of {args.workers} workers x {pool.threads_per_worker} threads "
+          f"started in {startup:.1f}s\n")
+
+    results = {'cpus': os.cpu_count(), 'workers': args.workers, 'pool_startup_seconds': startup}
+    try:
+        print(f"{'tick lateness':<14} {'ticks':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        lateness = {}
+        for label, variant_model, variant_tokenizer in [('idle', None, None), ('in-process', model, tokenizer),
+                                                        ('pool', pool.model, pool.tokenizer)]:
+            result = tick_lateness(variant_model, variant_tokenizer, queries, args.seconds, args.max_new_tokens)
+            lateness[label] = result
+            print(f"{label:<14} {result['ticks']:>6} {result['p50']:>8.2f} {result['p95']:>8.2f} {result['max']:>8.1f}")
+        results['tick_lateness_ms'] = lateness
+
+        print(f"\n{'throughput':<14} {'tokens':>6} {'seconds':>8} {'tok/s':>8}")
+        rates = {}
+        for label, variant_model, variant_tokenizer in [('in-process', model, tokenizer),
+                                                        ('pool', pool.model, pool.tokenizer)]:
+            result = throughput(variant_model, variant_tokenizer, queries, args.conversations, args.turns,
+                                args.max_new_tokens)
+            rates[label] = result
+            print(f"{label:<14} {result['tokens']:>6} {result['seconds']:>8.2f} {result['tokens_per_second']:>8.1f}")
+        results['throughput'] = rates
+    finally:
+        pool.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: compiled KeywordMatcher vs the original nested keyword scan
+Run: python benchmarks/bench_kb_matcher.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_matcher import KeywordMatcher
+
+
+SIZES = [15, 500, 5000]
+KEYWORDS_PER_CATEGORY = 6
+PHRASE_RATIO = 0.3
+QUERIES = 200
+
+
+def legacy_find_category(knowledge_base, user_input):
+    """The original two-pass scan from find_answer"""
+    user_lower = user_input.lower().strip()
+    for category, data in knowledge_base.items():
+        for keyword in data['keywords']:
+            if ' ' in keyword:
+                if keyword in user_lower:
+                    return category
+
+    words_in_query = user_lower.split()
+    for category, data in knowledge_base.items():
+        for keyword in data['keywords']:
+            if ' ' not in keyword and keyword in words_in_query:
+                return category
+
+    return None
+
+
+def random_word(rng):
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+
+
+def build_knowledge_base(num_categories, rng):
+    """Synthetic KB shaped like the real one (a few words, some phrases)"""
+    knowledge_base = {}
+    for i in range(num_categories):
+        keywords = []
+        for _ in range(KEYWORDS_PER_CATEGORY):
+            if rng.random() < PHRASE_RATIO:
+                keywords.append(f"{random_word(rng)} {random_word(rng)}")
+            else:
+                keywords.append(random_word(rng))
+        knowledge_base[f"category_{i}"] = {'keywords': keywords, 'response': f"Response {i}"}
+    return knowledge_base
+
+
+def build_queries(knowledge_base, rng):
+    """Mix of hits (a random keyword in filler text) and misses"""
+    all_keywords = [kw for data in knowledge_base.values() for kw in data['keywords']]
+    queries = []
+    for i in range(QUERIES):
+        filler = [random_word(rng) for _ in range(rng.randint(3, 10))]
+        if i % 2 == 0:
+            filler.insert(rng.randint(0, len(filler)), rng.choice(all_keywords))
+        queries.append(' '.join(filler))
+    return queries
+
+
+def main():
+    rng = random.Random(42)
+
+    print(f"{'categories':>10} {'keywords':>9} {'legacy (us/q)':>14} {'compiled (us/q)':>16} {'speedup':>8}")
+    for size in SIZES:
+        knowledge_base = build_knowledge_base(size, rng)
+        queries = build_queries(knowledge_base, rng)
+        # Exact tiers only: the fuzzy fallback deliberately answers more than the old loop
+        matcher = KeywordMatcher(knowledge_base, fuzzy=False)
+
+        for query in queries:
+            expected = legacy_find_category(knowledge_base, query)
+            actual = matcher.match(query)
+            assert expected == actual, f"Mismatch for {query!r}: {expected} != {actual}"
+
+        repeat = max(1, 2000 // size)
+        legacy = timeit.timeit(
+            lambda: [legacy_find_category(knowledge_base, q) for q in queries], number=repeat
+        ) / (repeat * len(queries))
+        compiled = timeit.timeit(
+            lambda: [matcher.match(q) for q in queries], number=repeat * 10
+        ) / (repeat * 10 * len(queries))
+
+        num_keywords = size * KEYWORDS_PER_CATEGORY
+        print(f"{size:>10} {num_keywords:>9} {legacy * 1e6:>14.1f} {compiled * 1e6:>16.1f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
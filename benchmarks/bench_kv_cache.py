@@ -0,0 +1,75 @@
+"""
+Benchmark: per-turn latency with and without KV cache reuse across turns
+Run: python benchmarks/bench_kv_cache.py [--model microsoft/DialoGPT-medium] [--turns 30]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from chat_engine import Conversation, generate_reply
+
+
+PROMPTS = [
+    "what is the dress code",
+    "is there a bus to the campus",
+    "can i bring my bike",
+    "what time does the canteen close",
+    "are there any clubs for music",
+    "how big is the campus",
+    "do you have a swimming pool",
+    "who is the dean",
+    "can parents visit on weekends",
+    "is there a medical room",
+]
+
+
+def run_session(model, tokenizer, turns, reuse_cache, seed):
+    """Play a scripted session and return (latency, context length, reply) per turn"""
+    torch.manual_seed(seed)
+    conversation = Conversation()
+    results = []
+    for turn in range(turns):
+        prompt = PROMPTS[turn % len(PROMPTS)]
+        start = time.perf_counter()
+        reply = generate_reply(model, tokenizer, conversation, prompt, reuse_cache=reuse_cache)
+        elapsed = time.perf_counter() - start
+        results.append((elapsed, conversation.chat_history_ids.shape[-1], reply))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default="microsoft/DialoGPT-medium")
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model)
+    model.eval()
+
+    fresh = run_session(model, tokenizer, args.turns, reuse_cache=False, seed=args.seed)
+    cached = run_session(model, tokenizer, args.turns, reuse_cache=True, seed=args.seed)
+
+    print(f"{'turn':>5} {'context':>8} {'no cache (ms)':>14} {'cache (ms)':>11} {'speedup':>8}")
+    for turn in (10, 30):
+        if turn > args.turns:
+            continue
+        fresh_time, context, _ = fresh[turn - 1]
+        cached_time, _, _ = cached[turn - 1]
+        print(f"{turn:>5} {context:>8} {fresh_time * 1000:>14.1f} {cached_time * 1000:>11.1f} {fresh_time / cached_time:>7.2f}x")
+
+    # Same seed, same logits: both runs should sample the same replies
+    same = sum(1 for a, b in zip(fresh, cached) if a[2] == b[2])
+    print(f"\nIdentical replies with the same seed: {same}/{args.turns}")
+
+
+if __name__ == "__main__":
+    main()
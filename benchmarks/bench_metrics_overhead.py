@@ -0,0 +1,117 @@
+"""
+Benchmark: cost of per-turn instrumentation, disabled and enabled
+Run: python benchmarks/bench_metrics_overhead.py [--rounds 200] [--ai-turns 30]
+
+Compares each hot path called directly (no instrumentation code at all)
+with the same path through the entry point with metrics disabled
+(metrics=None) and enabled (JSON log sink to /dev/null plus Prometheus
+rendering). The AI path uses the offline stand-in model.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE, generate_reply
+from chatbot_cli import CollegeChatbotCLI
+from metrics import JsonLogSink, Metrics
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+
+def read_queries():
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def time_kb(calls, queries, rounds):
+    """Median per-query time of each call in microseconds, rounds interleaved so drift hits all equally"""
+    samples = [[] for _ in calls]
+    for _ in range(rounds):
+        for call, call_samples in zip(calls, samples):
+            start = time.perf_counter()
+            for query in queries:
+                call(query)
+            call_samples.append((time.perf_counter() - start) / len(queries))
+    return [statistics.median(call_samples) * 1e6 for call_samples in samples]
+
+
+def time_ai(bot, calls, prompts, repeats):
+    """Best seeded session of each call in ms per turn; same seed, so the same tokens every time"""
+    import torch
+
+    best = [None] * len(calls)
+    for _ in range(repeats):
+        for i, call in enumerate(calls):
+            torch.manual_seed(0)
+            bot.conversation.reset()
+            start = time.perf_counter()
+            for prompt in prompts:
+                call(prompt)
+            elapsed = (time.perf_counter() - start) / len(prompts) * 1000
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def report(label, direct, disabled, enabled, unit):
+    print(f"{label:<14} {direct:>10.2f} {disabled:>10.2f} {enabled:>10.2f}  {unit}   "
+          f"disabled {(disabled / direct - 1) * 100:+.2f}%   enabled {(enabled / direct - 1) * 100:+.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--ai-turns', type=int, default=30)
+    parser.add_argument('--repeats', type=int, default=3, help="sessions per AI variant (best is kept)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = CollegeChatbotCLI(kb_only=True, watch_kb=False)
+    metrics = Metrics([JsonLogSink(os.devnull)])
+    queries = read_queries()
+
+    def instrumented_kb(query):
+        turn = metrics.start_turn('bench')
+        bot.find_answer(query, turn)
+        turn.finish()
+
+    print(f"{'path':<14} {'direct':>10} {'disabled':>10} {'enabled':>10}")
+    report("find_answer", *time_kb([bot.kb_index.find_answer, bot.find_answer, instrumented_kb],
+                                   queries, args.rounds), "us/query")
+
+    if not TRANSFORMERS_AVAILABLE or args.ai_turns <= 0:
+        print("get_ai_response: skipped")
+        return
+
+    bot.tokenizer, bot.model = load_stand_in_model()
+    bot.max_new_tokens = 32
+    prompts = [query for query in queries if bot.find_answer(query) is None]
+    prompts = (prompts * (args.ai_turns // len(prompts) + 1))[:args.ai_turns]
+
+    def direct_ai(prompt):
+        bot.kb_index.find_answer(prompt)
+        generate_reply(bot.model, bot.tokenizer, bot.conversation, prompt, max_new_tokens=bot.max_new_tokens)
+
+    def instrumented_ai(prompt):
+        turn = metrics.start_turn('bench')
+        bot.find_answer(prompt, turn)
+        bot.get_ai_response(prompt, turn=turn)
+        turn.finish()
+        metrics.prometheus_text()
+
+    def disabled_ai(prompt):
+        bot.find_answer(prompt)
+        bot.get_ai_response(prompt)
+
+    time_ai(bot, [direct_ai], prompts[:3], 1)
+    report("get_ai_response", *time_ai(bot, [direct_ai, disabled_ai, instrumented_ai], prompts, args.repeats),
+           "ms/turn")
+
+
+if __name__ == "__main__":
+    main()
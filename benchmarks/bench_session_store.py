@@ -0,0 +1,164 @@
+"""
+Benchmark: memory and rehydration latency of the session store
+Run: python benchmarks/bench_session_store.py [--sessions 5000] [--tokens 256] [--memory-mb 1]
+
+- tensors: every history kept as a live int64 (1, n) tensor, as a server
+  Session's Conversation holds it (its KV cache, far larger, not counted)
+- store: session_store.SessionStore with --memory-mb for the memory tier,
+  the rest spilled to a memory-mapped file
+
+Each variant runs in a fresh subprocess so RSS is comparable. The store
+variant also times rehydrating sessions from memory and from disk, and
+reopening the file as a restarted server would.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE
+
+VARIANTS = ('tensors', 'store')
+
+# DialoGPT's vocabulary; every id fits in uint16
+VOCAB_SIZE = 50257
+
+
+def rss_mb():
+    """Resident set size of this process in MB, from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    return {
+        'p50': statistics.median(ordered) * 1000,
+        'p95': ordered[int((len(ordered) - 1) * 0.95)] * 1000,
+    }
+
+
+def measure(variant, sessions, tokens, memory_mb, path):
+    """Run inside the worker subprocess; returns one result dict"""
+    import torch
+
+    from session_store import SessionStore, to_array, to_tensor
+
+    generator = torch.Generator().manual_seed(0)
+    lengths = [random.Random(i).randint(tokens // 2, tokens) for i in range(sessions)]
+    # Warm up torch's kernels first so their one-off allocations are not counted
+    to_tensor(to_array(torch.randint(0, VOCAB_SIZE, (1, tokens), generator=generator)))
+    rss_start = rss_mb()
+
+    if variant == 'tensors':
+        histories = {}
+        for i, length in enumerate(lengths):
+            histories[f"student-{i}"] = torch.randint(0, VOCAB_SIZE, (1, length), generator=generator)
+        return {'rss_growth_mb': rss_mb() - rss_start, 'bytes_per_session': None}
+
+    store = SessionStore(path, int(memory_mb * 1024 * 1024))
+    for i, length in enumerate(lengths):
+        store.put(f"student-{i}", torch.randint(0, VOCAB_SIZE, (1, length), generator=generator))
+    rss_growth = rss_mb() - rss_start
+    stats = store.stats()
+
+    recent = [f"student-{i}" for i in range(sessions - stats['sessions_in_memory'], sessions)]
+    from_memory = []
+    for session_id in recent[-200:]:
+        start = time.perf_counter()
+        store.get(session_id)
+        from_memory.append(time.perf_counter() - start)
+
+    from_disk = []
+    spilled = sessions - stats['sessions_in_memory']
+    for i in random.Random(1).sample(range(spilled), min(200, spilled)):
+        start = time.perf_counter()
+        store.get(f"student-{i}")
+        from_disk.append(time.perf_counter() - start)
+
+    store.close()
+    start = time.perf_counter()
+    reopened = SessionStore(path, int(memory_mb * 1024 * 1024))
+    reopen_seconds = time.perf_counter() - start
+    restored = reopened.stats()['sessions_on_disk']
+    reopened.close()
+
+    return {
+        'rss_growth_mb': rss_growth,
+        'bytes_per_session': stats['bytes_per_session'],
+        'sessions_in_memory': stats['sessions_in_memory'],
+        'sessions_on_disk': stats['sessions_on_disk'],
+        'disk_mb': os.path.getsize(path) / (1024 * 1024),
+        'rehydrate_memory_ms': latency_summary(from_memory),
+        'rehydrate_disk_ms': latency_summary(from_disk) if from_disk else None,
+        'reopen_ms': reopen_seconds * 1000,
+        'restored_sessions': restored,
+    }
+
+
+def run_worker(variant, args, path):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', variant, '--sessions', str(args.sessions),
+         '--tokens', str(args.tokens), '--memory-mb', str(args.memory_mb), '--path', path],
+        capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr else "worker failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--tokens', type=int, default=256, help="longest history; lengths vary from half of it")
+    parser.add_argument('--memory-mb', type=float, default=1.0, help="session store memory tier")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--worker', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not TRANSFORMERS_AVAILABLE:
+        print("torch is not installed: skipped")
+        return
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.sessions, args.tokens, args.memory_mb, args.path)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.bin')
+        for variant in VARIANTS:
+            results[variant] = run_worker(variant, args, path)
+
+    print(f"{args.sessions} sessions of {args.tokens // 2}-{args.tokens} tokens\n")
+    tensors, store = results['tensors'], results['store']
+    print(f"live tensors   RSS +{tensors['rss_growth_mb']:.1f} MB")
+    print(f"session store  RSS +{store['rss_growth_mb']:.1f} MB  "
+          f"({store['sessions_in_memory']} in memory at {store['bytes_per_session']:.0f} B each, "
+          f"{store['sessions_on_disk']} on disk in {store['disk_mb']:.1f} MB)")
+    print(f"\nrehydrate from memory  p50 {store['rehydrate_memory_ms']['p50']:.3f} ms  "
+          f"p95 {store['rehydrate_memory_ms']['p95']:.3f} ms")
+    if store['rehydrate_disk_ms'] is not None:
+        print(f"rehydrate from disk    p50 {store['rehydrate_disk_ms']['p50']:.3f} ms  "
+              f"p95 {store['rehydrate_disk_ms']['p95']:.3f} ms")
+    print(f"reopen after restart   {store['reopen_ms']:.1f} ms, {store['restored_sessions']} sessions")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
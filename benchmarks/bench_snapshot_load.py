@@ -0,0 +1,135 @@
+"""
+Benchmark: model load time and memory, hub cache vs memory-mapped snapshot
+Run: python benchmarks/bench_snapshot_load.py --model-path models/dialogpt-medium [--model-size medium]
+
+Every load runs in a fresh subprocess. "cold" evicts the snapshot files
+from the page cache first (posix_fadvise DONTNEED, Linux only), "warm"
+loads right after another process has read them. RSS is split into
+file-backed pages (mapped weights, shareable between processes) and
+anonymous pages (private copies).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_loader import DEFAULT_MODEL_SIZE, MODEL_SIZES
+
+
+def rss_breakdown_mb():
+    """(RssFile, RssAnon) of this process in MB, from /proc/self/status"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('RssFile', 'RssAnon'):
+                values[key] = int(rest.split()[0]) / 1024
+    return values.get('RssFile', 0.0), values.get('RssAnon', 0.0)
+
+
+def drop_page_cache(model_path):
+    """Ask the kernel to drop cached pages of every file in the snapshot"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for name in os.listdir(model_path):
+        path = os.path.join(model_path, name)
+        if not os.path.isfile(path):
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def measure(source, model_size, model_path):
+    """Run inside the worker subprocess; returns one result dict"""
+    import torch
+    from model_loader import load_model
+
+    file_before, anon_before = rss_breakdown_mb()
+    start = time.perf_counter()
+    if source == 'hub':
+        tokenizer, model = load_model(model_size, 'fp32')
+    else:
+        tokenizer, model = load_model(model_size, 'fp32', model_path=model_path)
+    load_time = time.perf_counter() - start
+
+    input_ids = tokenizer.encode("Hello there" + tokenizer.eos_token, return_tensors='pt')
+    start = time.perf_counter()
+    with torch.no_grad():
+        model(input_ids)
+    first_forward = time.perf_counter() - start
+    file_after, anon_after = rss_breakdown_mb()
+
+    return {
+        'load_seconds': load_time,
+        'first_forward_seconds': first_forward,
+        'rss_file_mb': file_after - file_before,
+        'rss_anon_mb': anon_after - anon_before,
+    }
+
+
+def run_worker(source, model_size, model_path):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', source,
+         '--model-size', model_size, '--model-path', model_path or ''],
+        capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default=DEFAULT_MODEL_SIZE)
+    parser.add_argument('--model-path', help="snapshot written by export_snapshot.py")
+    parser.add_argument('--skip-hub', action='store_true', help="only measure the snapshot")
+    parser.add_argument('--json', help="also write results to this file")
+    parser.add_argument('--worker', choices=['hub', 'snapshot'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.model_size, args.model_path)))
+        return
+
+    runs = []
+    if not args.skip_hub:
+        runs.append(('hub cache (warm)', 'hub', False))
+    if args.model_path:
+        runs.append(('snapshot (cold)', 'snapshot', True))
+        runs.append(('snapshot (warm)', 'snapshot', False))
+    if not runs:
+        parser.error("nothing to measure: pass --model-path and/or drop --skip-hub")
+
+    results = []
+    print(f"{'source':<18} {'load (s)':>9} {'1st fwd (ms)':>13} {'RssFile (MB)':>13} {'RssAnon (MB)':>13}")
+    for label, source, cold in runs:
+        if cold and not drop_page_cache(args.model_path):
+            print(f"{label:<18} skipped (posix_fadvise not available)")
+            continue
+        try:
+            result = run_worker(source, args.model_size, args.model_path)
+        except RuntimeError as e:
+            print(f"{label:<18} failed: {e}")
+            continue
+        result['source'] = label
+        results.append(result)
+        print(f"{label:<18} {result['load_seconds']:>9.2f} {result['first_forward_seconds'] * 1000:>13.1f} "
+              f"{result['rss_file_mb']:>13.0f} {result['rss_anon_mb']:>13.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
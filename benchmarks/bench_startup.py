@@ -0,0 +1,96 @@
+"""
+Benchmark: startup time of the CLI and GUI entry points
+Run: python benchmarks/bench_startup.py [--runs 3]
+
+For each entry point this measures, in a fresh interpreter:
+- module import time and whether torch got imported
+- time until the first knowledge-base answer (CLI, default and --kb-only)
+- time until the window is built and drawn (GUI, needs a display)
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, 'torch' in sys.modules)
+"""
+
+GUI_PROBE = """
+import sys, time
+start = time.perf_counter()
+import tkinter as tk
+import chatbot_gui
+root = tk.Tk()
+app = chatbot_gui.CollegeChatbotGUI(root, kb_only={kb_only})
+root.update()
+print(time.perf_counter() - start, 'torch' in sys.modules)
+root.destroy()
+"""
+
+
+def run_probe(code):
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed, torch_loaded = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), torch_loaded == 'True'
+
+
+def cli_first_answer(extra_args):
+    """Seconds from process start until the CLI prints its first KB answer"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'chatbot_cli.py', *extra_args],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+    )
+    process.stdin.write("hostel fees\n")
+    process.stdin.flush()
+    elapsed = None
+    for line in process.stdout:
+        if "Bot:" in line:
+            elapsed = time.perf_counter() - start
+            break
+    process.kill()
+    process.wait()
+    return elapsed
+
+
+def report(label, samples, torch_loaded=None):
+    median = statistics.median(samples)
+    suffix = '' if torch_loaded is None else f"  torch imported: {'yes' if torch_loaded else 'no'}"
+    print(f"{label:<42} {median * 1000:>9.0f} ms{suffix}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    for module in ('chatbot_cli', 'chatbot_gui'):
+        probes = [run_probe(IMPORT_PROBE.format(module=module)) for _ in range(args.runs)]
+        report(f"import {module}", [p[0] for p in probes], probes[-1][1])
+
+    for label, extra_args in (("CLI first KB answer", []), ("CLI first KB answer (--kb-only)", ['--kb-only'])):
+        samples = [cli_first_answer(extra_args) for _ in range(args.runs)]
+        report(label, samples)
+
+    if sys.platform != 'win32' and not os.environ.get('DISPLAY'):
+        print("GUI window: skipped (no DISPLAY)")
+        return
+
+    for label, kb_only in (("GUI window drawn", False), ("GUI window drawn (--kb-only)", True)):
+        probes = [run_probe(GUI_PROBE.format(kb_only=kb_only)) for _ in range(args.runs)]
+        report(label, [p[0] for p in probes], probes[-1][1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark suite: latency percentiles of find_answer and get_ai_response
+Run: python benchmarks/bench_suite.py [--models tiny small] [--json results.json] [--baseline baseline.json]
+
+Scenarios (p50/p95/p99 per model):
+- kb_hit / kb_miss: find_answer on replay queries the knowledge base
+  answers / does not answer
+- ai_turn_1 / ai_turn_10: get_ai_response on the first and the tenth turn
+  of a conversation
+- growth: per-turn latency and context length over a whole conversation
+
+"tiny" is a randomly initialised GPT-2 (benchmarks/stand_in_model.py) and
+runs offline. Real DialoGPT sizes are loaded through model_loader and are
+skipped if they cannot be loaded. With --baseline, the run exits with
+status 1 if any p50/p95 is more than --threshold slower than the baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE
+from chatbot_cli import CollegeChatbotCLI
+from model_loader import MODEL_SIZES
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+PERCENTILES = (50, 95, 99)
+
+# Only these percentiles are compared against a baseline; p99 of a few
+# dozen samples is too noisy to gate on
+GATED_PERCENTILES = ('p50', 'p95')
+
+
+def percentile(sorted_samples, q):
+    """Linear-interpolated percentile of an already sorted list"""
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    position = (len(sorted_samples) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def summarize(samples):
+    """Latency samples in seconds -> {'n', 'mean_ms', 'p50', 'p95', 'p99'} in ms"""
+    ordered = sorted(samples)
+    summary = {'n': len(ordered), 'mean_ms': sum(ordered) / len(ordered) * 1000}
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(ordered, q) * 1000
+    return summary
+
+
+def make_bot():
+    """A CLI bot with its knowledge base but no model or file watcher"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CollegeChatbotCLI(kb_only=True, watch_kb=False)
+
+
+def read_replay_queries():
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def bench_kb(bot, rounds):
+    """find_answer latency, split by whether the KB answered"""
+    queries = read_replay_queries()
+    # The classification pass also warms up the matchers
+    hits = [query for query in queries if bot.find_answer(query) is not None]
+    misses = [query for query in queries if bot.find_answer(query) is None]
+
+    results = {}
+    for name, group in (('kb_hit', hits), ('kb_miss', misses)):
+        samples = []
+        for _ in range(rounds):
+            for query in group:
+                start = time.perf_counter()
+                bot.find_answer(query)
+                samples.append(time.perf_counter() - start)
+        if samples:
+            results[name] = summarize(samples)
+    return results
+
+
+def bench_ai(bot, sessions, turns, seed):
+    """get_ai_response latency per turn over scripted conversations"""
+    import torch
+
+    prompts = [query for query in read_replay_queries() if bot.find_answer(query) is None]
+    per_turn = [[] for _ in range(turns)]
+    context_tokens = [[] for _ in range(turns)]
+
+    # One untimed turn so one-off setup cost does not land in ai_turn_1
+    bot.get_ai_response(prompts[0])
+
+    for session in range(sessions):
+        torch.manual_seed(seed + session)
+        bot.conversation.reset()
+        for turn in range(turns):
+            prompt = prompts[(session + turn) % len(prompts)]
+            start = time.perf_counter()
+            bot.get_ai_response(prompt)
+            per_turn[turn].append(time.perf_counter() - start)
+            context_tokens[turn].append(bot.conversation.chat_history_ids.shape[-1])
+
+    results = {'ai_turn_1': summarize(per_turn[0])}
+    if turns >= 10:
+        results['ai_turn_10'] = summarize(per_turn[9])
+    results['growth'] = [
+        {'turn': turn + 1, 'p50': summarize(samples)['p50'],
+         'context_tokens': sum(context_tokens[turn]) / len(context_tokens[turn])}
+        for turn, samples in enumerate(per_turn)
+    ]
+    return results
+
+
+def load_benchmark_model(name, model_path):
+    if name == 'tiny':
+        return load_stand_in_model()
+    from model_loader import load_model
+    return load_model(name, model_path=model_path)
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """List of regression messages: current slower than baseline by more than threshold"""
+    regressions = []
+    for model, scenarios in results.items():
+        for scenario, summary in scenarios.items():
+            previous = baseline.get(model, {}).get(scenario)
+            if scenario == 'growth' or not previous:
+                continue
+            for key in GATED_PERCENTILES:
+                old, new = previous[key], summary[key]
+                if new > old * (1 + threshold) and new - old > min_delta_ms:
+                    regressions.append(f"{model}/{scenario} {key}: {old:.3f} ms -> {new:.3f} ms "
+                                       f"(+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_results(model, results):
+    print(f"\n{model}")
+    print(f"  {'scenario':<12} {'n':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for scenario, summary in results.items():
+        if scenario == 'growth':
+            continue
+        print(f"  {scenario:<12} {summary['n']:>6} {summary['p50']:>10.3f} "
+              f"{summary['p95']:>10.3f} {summary['p99']:>10.3f}")
+    if 'growth' in results:
+        print(f"  {'turn':>6} {'context':>8} {'p50 (ms)':>10}")
+        for row in results['growth']:
+            print(f"  {row['turn']:>6} {row['context_tokens']:>8.0f} {row['p50']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', nargs='+', choices=['tiny', *MODEL_SIZES], default=['tiny'])
+    parser.add_argument('--model-path', help="snapshot for the real model (see export_snapshot.py)")
+    parser.add_argument('--kb-rounds', type=int, default=50, help="passes over the replay queries")
+    parser.add_argument('--sessions', type=int, default=10, help="conversations per model")
+    parser.add_argument('--turns', type=int, default=12, help="turns per conversation")
+    parser.add_argument('--max-new-tokens', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--baseline', help="results file from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.1,
+                        help="ignore slowdowns smaller than this, whatever the ratio")
+    args = parser.parse_args()
+
+    bot = make_bot()
+    bot.max_new_tokens = args.max_new_tokens
+    results = {'kb': bench_kb(bot, args.kb_rounds)}
+    print_results('kb', results['kb'])
+
+    for name in args.models:
+        if not TRANSFORMERS_AVAILABLE:
+            print(f"\n{name}: skipped (transformers not installed)")
+            continue
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                bot.tokenizer, bot.model = load_benchmark_model(name, args.model_path)
+        except Exception as e:
+            print(f"\n{name}: skipped (could not load: {e})")
+            continue
+        results[name] = bench_ai(bot, args.sessions, args.turns, args.seed)
+        print_results(name, results[name])
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'max_new_tokens': args.max_new_tokens,
+        },
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\n✓ No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
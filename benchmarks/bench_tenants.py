@@ -0,0 +1,153 @@
+"""
+Benchmark: memory of many tenants behind one loaded model
+Run: python benchmarks/bench_tenants.py [--tenants 1,50] [--shared-kb]
+
+Loads the model once (the offline stand-in, or --model-size DialoGPT with
+--real), then a TenantRegistry of N tenants, each with its own knowledge
+base file (the bundled one plus a tenant-specific topic, so every tenant
+compiles its own matcher; --shared-kb gives them all the bundled file).
+Reports RSS per tenant count against running one process per college,
+and the knowledge base lookup latency when requests are spread over all
+tenants. Each count runs in a fresh subprocess so RSS is comparable.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_engine import TRANSFORMERS_AVAILABLE
+from kb_store import DEFAULT_KB_PATH
+from model_loader import DEFAULT_PRECISION, MODEL_SIZES, load_model
+from stand_in_model import REPLAY_SAMPLE, load_stand_in_model
+
+
+def rss_mb():
+    """Resident set size of this process in MB, from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def write_tenant_files(directory, count, shared_kb):
+    """tenants.json for `count` tenants, plus one knowledge base file each unless shared"""
+    with open(DEFAULT_KB_PATH, encoding='utf-8') as f:
+        knowledge_base = json.load(f)
+    config = {}
+    for i in range(count):
+        entry = {'college_name': f"College {i}"}
+        if not shared_kb:
+            tenant_kb = dict(knowledge_base)
+            tenant_kb[f'campus_{i}'] = {
+                'keywords': [f"campus {i}", f"block {i} location"],
+                'response': f"📍 Campus {i} of {{college_name}} is next to the main gate.",
+            }
+            entry['kb_file'] = f"kb_{i}.json"
+            with open(os.path.join(directory, entry['kb_file']), 'w', encoding='utf-8') as f:
+                json.dump(tenant_kb, f)
+        config[f"tenant-{i}"] = entry
+    path = os.path.join(directory, 'tenants.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return path
+
+
+def measure(config_path, model_size, real):
+    """Run inside the worker subprocess; returns one result dict"""
+    from tenants import TenantRegistry
+
+    start_rss = rss_mb()
+    if TRANSFORMERS_AVAILABLE:
+        if real:
+            load_model(model_size, DEFAULT_PRECISION)
+        else:
+            load_stand_in_model()
+    model_rss = rss_mb()
+
+    registry = TenantRegistry(os.path.dirname(config_path))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = registry.load_config(config_path)
+    load_seconds = time.perf_counter() - start
+    tenants_rss = rss_mb()
+
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    tenant_ids = list(registry.tenants)
+    rng = random.Random(0)
+    lookups = []
+    for _ in range(2000):
+        tenant = registry.get(rng.choice(tenant_ids))
+        query = rng.choice(queries)
+        began = time.perf_counter()
+        tenant.find_answer(query)
+        lookups.append(time.perf_counter() - began)
+
+    return {
+        'tenants': count,
+        'indexes': len(registry.indexes),
+        'base_rss_mb': start_rss,
+        'model_rss_mb': model_rss - start_rss,
+        'rss_mb': tenants_rss,
+        'tenants_rss_mb': tenants_rss - model_rss,
+        'load_seconds': load_seconds,
+        'lookup_p50_us': statistics.median(lookups) * 1e6,
+    }
+
+
+def run_worker(config_path, args):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', config_path, '--model-size', args.model_size]
+    if args.real:
+        command.append('--real')
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr else "worker failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tenants', default='1,50', help="comma-separated tenant counts")
+    parser.add_argument('--shared-kb', action='store_true', help="every tenant uses the bundled knowledge base")
+    parser.add_argument('--real', action='store_true', help="load DialoGPT instead of the stand-in")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default='medium')
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.model_size, args.real)))
+        return
+
+    results = {}
+    print(f"{'tenants':>7} {'indexes':>7} {'RSS MB':>8} {'model MB':>9} {'tenants MB':>11} {'MB/tenant':>10} "
+          f"{'load s':>7} {'lookup us':>10} {'1 proc each MB':>15}")
+    for count in [int(count) for count in args.tenants.split(',')]:
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_worker(write_tenant_files(directory, count, args.shared_kb), args)
+        results[count] = result
+        # One process per college: interpreter, model and one knowledge base each
+        single_process = result['base_rss_mb'] + result['model_rss_mb'] + result['tenants_rss_mb'] / count
+        result['one_process_each_mb'] = single_process * count
+        print(f"{count:>7} {result['indexes']:>7} {result['rss_mb']:>8.1f} {result['model_rss_mb']:>9.1f} "
+              f"{result['tenants_rss_mb']:>11.1f} {result['tenants_rss_mb'] / count:>10.2f} "
+              f"{result['load_seconds']:>7.2f} {result['lookup_p50_us']:>10.1f} {result['one_process_each_mb']:>15.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark: GUI transcript redraw time and memory over a long session
+Run: python benchmarks/bench_transcript.py [--messages 10000] [--burst 10] [--max-messages 200]
+
+Pushes --messages chat messages (replay queries and knowledge base answers,
+every third reply streamed in chunks) into a ScrolledText, --burst messages
+per frame, and times each frame including Tk's redraw (update()).
+
+- unbounded: the previous GUI code path, two inserts, a state toggle and
+  see() per message, nothing ever removed
+- bounded: transcript.Transcript, one redraw per frame, at most
+  --max-messages messages in the widget and the rest in the on-disk log
+
+Each variant runs in a fresh subprocess so RSS is comparable. Needs a
+display (on a headless box, run it under xvfb-run).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_store import load_index
+from stand_in_model import REPLAY_SAMPLE
+
+VARIANTS = ('unbounded', 'bounded')
+
+# Streamed replies arrive in this many chunks
+STREAM_CHUNKS = 8
+
+
+def rss_mb():
+    """Resident set size of this process in MB, from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def session_messages(count):
+    """(sender, text, streamed) tuples alternating replay queries and KB answers"""
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    responses = [entry['response'] for entry in load_index().knowledge_base.values()]
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append(('user', queries[i // 2 % len(queries)], False))
+        else:
+            messages.append(('bot', responses[i // 2 % len(responses)], i % 6 == 5))
+    return messages
+
+
+def chunks(text):
+    size = max(1, len(text) // STREAM_CHUNKS)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def make_display(tk, scrolledtext):
+    root = tk.Tk()
+    root.geometry("900x700")
+    display = scrolledtext.ScrolledText(root, wrap=tk.WORD, font=("Segoe UI", 11), padx=15, pady=15,
+                                        state=tk.DISABLED)
+    display.pack(fill=tk.BOTH, expand=True)
+    display.tag_config("user", foreground="white", background="#0084ff", spacing1=10, spacing3=10,
+                       lmargin1=10, rmargin=10, font=("Segoe UI", 11))
+    display.tag_config("bot", foreground="#000000", background="#e4e6eb", spacing1=10, spacing3=10,
+                       lmargin1=10, rmargin=10, font=("Segoe UI", 11))
+    display.tag_config("time", foreground="#65676b", font=("Segoe UI", 8))
+    root.update()
+    return root, display
+
+
+def unbounded_frame(tk, display, burst):
+    """The GUI before the bounded transcript: every update redraws on its own"""
+    def insert(*args):
+        display.config(state=tk.NORMAL)
+        display.insert(tk.END, *args)
+        display.config(state=tk.DISABLED)
+        display.see(tk.END)
+
+    for sender, text, streamed in burst:
+        label = "You: " if sender == 'user' else "🤖 Bot: "
+        if not streamed:
+            insert("\n12:00 PM\n", "time", f"{label}{text}\n", sender)
+            continue
+        insert("\n12:00 PM\n", "time", label, "bot")
+        for chunk in chunks(text):
+            insert(chunk, "bot")
+        insert("\n", "bot")
+
+
+def bounded_frame(transcript, burst):
+    for sender, text, streamed in burst:
+        if not streamed:
+            transcript.add_message(sender, text)
+            continue
+        transcript.start_stream()
+        for chunk in chunks(text):
+            transcript.stream_text(chunk)
+        transcript.finish_stream()
+    transcript.redraw()
+
+
+def measure(variant, count, burst_size, max_messages):
+    """Run inside the worker subprocess; returns one result dict"""
+    import tkinter as tk
+    from tkinter import scrolledtext
+
+    try:
+        root, display = make_display(tk, scrolledtext)
+    except tk.TclError as e:
+        return {'skipped': f"no display ({e})"}
+
+    transcript = None
+    if variant == 'bounded':
+        from transcript import Transcript
+        transcript = Transcript(root, display, max_messages)
+
+    messages = session_messages(count)
+    rss_start = rss_mb()
+    frames = []
+    rss = []
+    for start in range(0, count, burst_size):
+        burst = messages[start:start + burst_size]
+        began = time.perf_counter()
+        if transcript is None:
+            unbounded_frame(tk, display, burst)
+        else:
+            bounded_frame(transcript, burst)
+        root.update()
+        frames.append(time.perf_counter() - began)
+        if (start + burst_size) % 1000 < burst_size or start + burst_size >= count:
+            rss.append({'messages': min(start + burst_size, count), 'rss_mb': rss_mb() - rss_start})
+
+    tenth = max(1, len(frames) // 10)
+    result = {
+        'first_frames_ms': frame_summary(frames[:tenth]),
+        'last_frames_ms': frame_summary(frames[-tenth:]),
+        'max_frame_ms': max(frames) * 1000,
+        'total_seconds': sum(frames),
+        'rss_growth_mb': rss,
+        'widget_lines': int(display.index('end-1c').split('.')[0]),
+    }
+    if transcript is not None:
+        result['log_bytes'] = transcript.log.end
+        transcript.close()
+    root.destroy()
+    return result
+
+
+def frame_summary(frames):
+    ordered = sorted(frames)
+    return {
+        'p50': statistics.median(ordered) * 1000,
+        'p95': ordered[int((len(ordered) - 1) * 0.95)] * 1000,
+    }
+
+
+def run_worker(variant, args):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', variant,
+         '--messages', str(args.messages), '--burst', str(args.burst), '--max-messages', str(args.max_messages)],
+        capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr else "worker failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--burst', type=int, default=10, help="messages queued per frame")
+    parser.add_argument('--max-messages', type=int, default=200, help="messages kept in the widget (bounded)")
+    parser.add_argument('--json', help="write machine-readable results to this file")
+    parser.add_argument('--worker', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.messages, args.burst, args.max_messages)))
+        return
+
+    results = {}
+    print(f"{args.messages} messages, {args.burst} per frame\n")
+    print(f"{'variant':<10} {'first p50':>10} {'first p95':>10} {'last p50':>10} {'last p95':>10} "
+          f"{'max':>9} {'total s':>8} {'RSS +MB':>8} {'lines':>8}")
+    for variant in VARIANTS:
+        result = run_worker(variant, args)
+        results[variant] = result
+        if 'skipped' in result:
+            print(f"{variant:<10} skipped: {result['skipped']}")
+            continue
+        first, last = result['first_frames_ms'], result['last_frames_ms']
+        print(f"{variant:<10} {first['p50']:>10.2f} {first['p95']:>10.2f} {last['p50']:>10.2f} {last['p95']:>10.2f} "
+              f"{result['max_frame_ms']:>9.1f} {result['total_seconds']:>8.2f} "
+              f"{result['rss_growth_mb'][-1]['rss_mb']:>8.1f} {result['widget_lines']:>8}")
+    print("\n(frame times in ms; first/last = the first and final tenth of the session)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
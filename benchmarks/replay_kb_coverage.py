@@ -0,0 +1,139 @@
+"""
+Replay logged queries and report how much traffic the knowledge base keeps off DialoGPT
+Run: python benchmarks/replay_kb_coverage.py [benchmarks/data/replay_sample.txt] [--threshold 0.45]
+     python benchmarks/replay_kb_coverage.py benchmarks/data/labelled_queries.jsonl
+
+The replay file is either plain text (one query per line) or JSONL with a
+"query" field per line. If the JSONL lines also carry a "category" (null
+for queries the knowledge base should not answer), precision of each tier
+is reported too, with a sweep of TF-IDF thresholds and the lowest one
+that reaches --target-precision.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_store import DEFAULT_KB_PATH, load_index
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD
+
+
+DEFAULT_REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'replay_sample.txt')
+
+
+# Marks a query with no label, as opposed to one labelled off-topic (None)
+UNLABELLED = object()
+
+SWEEP_THRESHOLDS = [step / 100 for step in range(10, 62, 2)]
+
+
+def read_queries(path):
+    """(query, expected category or None or UNLABELLED) per line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                yield record['query'], record.get('category', UNLABELLED)
+            else:
+                yield line, UNLABELLED
+
+
+def precision(routed):
+    """Share of (expected, answered) pairs answered with the expected category"""
+    if not routed:
+        return 1.0
+    return sum(expected == answered for expected, answered in routed) / len(routed)
+
+
+def report_precision(labels, keyword_hits, nearest, threshold, target):
+    """Keyword and TF-IDF precision on the labelled queries, and a threshold sweep"""
+    labelled = [i for i, label in enumerate(labels) if label is not UNLABELLED]
+    keyword_routed = [(labels[i], keyword_hits[i]) for i in labelled if keyword_hits[i] is not None]
+    missed = [i for i in labelled if keyword_hits[i] is None]
+    on_topic = sum(labels[i] is not None for i in missed)
+
+    def tfidf_routed(cutoff):
+        return [(labels[i], nearest[i][0]) for i in missed if nearest[i][1] >= cutoff]
+
+    print(f"\nLabelled: {len(labelled)}  ({sum(labels[i] is None for i in labelled)} off-topic)")
+    print(f"  keyword precision: {precision(keyword_routed):6.1%}  ({len(keyword_routed)} answered)")
+    routed = tfidf_routed(threshold)
+    print(f"  tfidf precision:   {precision(routed):6.1%}  ({len(routed)} answered of {len(missed)} keyword misses)")
+
+    print(f"\n{'threshold':>9} {'answered':>8} {'precision':>9} {'recall':>7}")
+    recommended = None
+    for cutoff in SWEEP_THRESHOLDS:
+        routed = tfidf_routed(cutoff)
+        correct = sum(expected == answered for expected, answered in routed)
+        print(f"{cutoff:>9.2f} {len(routed):>8} {precision(routed):>9.1%} {correct / max(on_topic, 1):>7.1%}")
+        if recommended is None and routed and precision(routed) >= target:
+            recommended = cutoff
+    if recommended is None:
+        print(f"No threshold reaches {target:.0%} precision")
+    else:
+        print(f"Lowest threshold with {target:.0%} precision: {recommended:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('replay', nargs='?', default=DEFAULT_REPLAY)
+    parser.add_argument('--kb-file', default=DEFAULT_KB_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_RETRIEVAL_THRESHOLD)
+    parser.add_argument('--target-precision', type=float, default=0.9,
+                        help="precision the recommended TF-IDF threshold must reach on labelled queries")
+    parser.add_argument('--show', action='store_true', help="print each query with its outcome")
+    args = parser.parse_args()
+
+    # Build only the knowledge base, not the model
+    kb_index = load_index(args.kb_file, retrieval_threshold=args.threshold)
+    retriever = kb_index.retriever
+
+    queries, labels = zip(*read_queries(args.replay))
+
+    start = time.perf_counter()
+    keyword_hits = [kb_index.matcher.match(query) for query in queries]
+    keyword_time = time.perf_counter() - start
+
+    missed = [query for query, category in zip(queries, keyword_hits) if category is None]
+    start = time.perf_counter()
+    retrieved = retriever.match_many(missed)
+    retrieval_time = time.perf_counter() - start
+
+    outcome = dict(zip(missed, retrieved))
+    sources = Counter()
+    for query, category in zip(queries, keyword_hits):
+        if category is not None:
+            source, detail = 'keyword', category
+        elif outcome[query][0] is not None:
+            source, detail = 'tfidf', f"{outcome[query][0]} ({outcome[query][1]:.2f})"
+        else:
+            source, detail = 'model', f"best {outcome[query][1]:.2f}"
+        sources[source] += 1
+        if args.show:
+            print(f"{source:>7}  {detail:<24} {query}")
+
+    total = len(queries)
+    print(f"\nQueries: {total}  (threshold {args.threshold})")
+    for source in ('keyword', 'tfidf', 'model'):
+        print(f"  {source:>7}: {sources[source]:>6}  {sources[source] / total:6.1%}")
+    print(f"Kept off the model: {(sources['keyword'] + sources['tfidf']) / total:.1%} "
+          f"(keyword tier alone: {sources['keyword'] / total:.1%})")
+    print(f"Keyword tier: {keyword_time / total * 1e6:.1f} us/query, "
+          f"TF-IDF batch of {len(missed)}: {retrieval_time * 1000:.2f} ms")
+
+    if any(label is not UNLABELLED for label in labels):
+        nearest = [None if category is not None else retriever.nearest(query)
+                   for query, category in zip(queries, keyword_hits)]
+        report_precision(labels, keyword_hits, nearest, args.threshold, args.target_precision)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Tiny randomly initialised GPT-2 that stands in for DialoGPT in offline benchmarks
+
+It shares DialoGPT's architecture and generate() path, and its byte-level BPE
+tokenizer is trained on the knowledge base text at startup, so it needs no
+network access or download. Its replies are noise: use it for latency and
+memory comparisons, never for quality.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_store import DEFAULT_KB_PATH
+
+REPLAY_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'replay_sample.txt')
+
+EOS_TOKEN = "<|endoftext|>"
+STAND_IN_VOCAB_SIZE = 2000
+STAND_IN_CONFIG = {'n_embd': 128, 'n_layer': 4, 'n_head': 4, 'n_positions': 1024}
+
+
+def training_texts():
+    """Knowledge base responses and keywords plus the replay queries"""
+    with open(DEFAULT_KB_PATH, encoding='utf-8') as f:
+        knowledge_base = json.load(f)
+    texts = []
+    for entry in knowledge_base.values():
+        texts.append(entry['response'])
+        texts.extend(entry['keywords'])
+    with open(REPLAY_SAMPLE, encoding='utf-8') as f:
+        texts.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return texts
+
+
+def build_stand_in_tokenizer(vocab_size=STAND_IN_VOCAB_SIZE):
+    """GPT-2 style byte-level BPE tokenizer trained on the KB text"""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=[EOS_TOKEN],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+        show_progress=False,
+    )
+    tokenizer.train_from_iterator(training_texts(), trainer=trainer)
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token=EOS_TOKEN)
+
+
+def load_stand_in_model(seed=0, **config_overrides):
+    """Return (tokenizer, model) set up the same way model_loader.load_model does"""
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    tokenizer = build_stand_in_tokenizer()
+    config = GPT2Config(
+        vocab_size=len(tokenizer),
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        **{**STAND_IN_CONFIG, **config_overrides},
+    )
+    torch.manual_seed(seed)
+    model = GPT2LMHeadModel(config)
+    model.eval()
+
+    tokenizer.pad_token = tokenizer.eos_token
+    model.config.pad_token_id = tokenizer.eos_token_id
+    return tokenizer, model
@@ -0,0 +1,29 @@
+"""
+Build Knowledge Base Index
+Precompiles the knowledge base file into the binary index artifact the
+chatbots load at startup
+"""
+
+import argparse
+
+from kb_store import DEFAULT_KB_PATH, index_path_for, load_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile the knowledge base index")
+    parser.add_argument('--kb-file', default=DEFAULT_KB_PATH, help="knowledge base JSON/YAML file")
+    parser.add_argument('--output', help="index file (default: next to the KB file, .idx)")
+    parser.add_argument('--college', default="Amity University")
+    args = parser.parse_args()
+
+    output = args.output or index_path_for(args.kb_file)
+    index = load_index(args.kb_file, args.college, index_path=output, rebuild=True)
+    cached = load_index(args.kb_file, args.college, index_path=output)
+
+    print(f"✓ {len(index.knowledge_base)} topics compiled in {index.load_seconds * 1000:.1f} ms")
+    print(f"✓ Index written to {output} ({index.index_bytes / 1024:.1f} KB), "
+          f"loads in {cached.load_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
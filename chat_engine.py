@@ -0,0 +1,407 @@
+"""
+Chat Engine
+DialoGPT reply generation shared by the CLI and GUI
+
+torch and transformers are imported on first use, not at module load, so
+knowledge-base answers never pay for them.
+"""
+
+import importlib.util
+import re
+import time
+
+# Checked without importing: importing torch alone takes seconds
+TRANSFORMERS_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ('torch', 'transformers')
+)
+
+
+DEFAULT_MAX_HISTORY_TOKENS = 512
+DEFAULT_MAX_NEW_TOKENS = 128
+
+# Seconds a reply may take before generation is cut short (0 or None: no limit)
+DEFAULT_REPLY_DEADLINE = 10.0
+
+# A reply cut off by the deadline is only shown if it has this many words
+MIN_PARTIAL_WORDS = 4
+
+SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+GENERATION_KWARGS = {
+    'temperature': 0.8,
+    'top_k': 50,
+    'top_p': 0.9,
+    'do_sample': True,
+    'no_repeat_ngram_size': 3,
+}
+
+# Opt-in greedy decoding so the same prompt always gets the same reply
+DETERMINISTIC_GENERATION_KWARGS = {
+    'do_sample': False,
+    'no_repeat_ngram_size': 3,
+}
+
+
+class Conversation:
+    """Token history of one chat plus the model's KV cache for it.
+
+    `past_key_values` always covers `chat_history_ids` minus its last token
+    (generate never feeds the final sampled token back through the model),
+    so the next turn only has to encode that token and the new user input.
+
+    The history is kept within `max_history_tokens` by evicting whole old
+    turns at EOS boundaries; None disables the budget.
+    """
+
+    def __init__(self, max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS):
+        self.max_history_tokens = max_history_tokens
+        self.chat_history_ids = None
+        self.past_key_values = None
+        self.last_timing = None
+
+    def reset(self):
+        """Forget the history and drop the cache"""
+        self.chat_history_ids = None
+        self.past_key_values = None
+
+    def evict_to_budget(self, incoming_tokens, eos_token_id):
+        """Drop the oldest whole turns so history plus incoming tokens fit the budget"""
+        if self.chat_history_ids is None or self.max_history_tokens is None:
+            return
+
+        history_length = self.chat_history_ids.shape[-1]
+        excess = history_length + incoming_tokens - self.max_history_tokens
+        if excess <= 0:
+            return
+
+        # Cut just after the first EOS that frees enough room; positions
+        # shift, so the cache no longer lines up and has to be rebuilt
+        boundaries = (self.chat_history_ids[0] == eos_token_id).nonzero().flatten().tolist()
+        cut = next((end + 1 for end in boundaries if end + 1 >= excess), None)
+
+        if cut is None or cut >= history_length:
+            self.reset()
+        else:
+            self.chat_history_ids = self.chat_history_ids[:, cut:]
+            self.past_key_values = None
+
+
+class ReplyStreamer:
+    """Forwards decoded reply text to a callback and timestamps the first token.
+
+    Wraps a transformers TextStreamer (which handles incremental decoding)
+    rather than subclassing it, so the import can wait until generation.
+    """
+
+    def __init__(self, tokenizer, on_text=None):
+        from transformers import TextStreamer
+
+        self.text_streamer = TextStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.text_streamer.on_finalized_text = self.on_finalized_text
+        self.on_text = on_text
+        self.first_token_time = None
+
+    def put(self, value):
+        if self.first_token_time is None and not self.text_streamer.next_tokens_are_prompt:
+            self.first_token_time = time.perf_counter()
+        self.text_streamer.put(value)
+
+    def end(self):
+        self.text_streamer.end()
+
+    def on_finalized_text(self, text, stream_end=False):
+        if text and self.on_text is not None:
+            self.on_text(text)
+
+
+class StopWhen:
+    """Stopping criterion that ends generation once `should_stop()` is true.
+
+    A plain callable rather than a transformers StoppingCriteria subclass,
+    so defining it needs no import; StoppingCriteriaList only calls it.
+    `triggered` tells afterwards whether it cut the reply short.
+    """
+
+    def __init__(self, should_stop):
+        self.should_stop = should_stop
+        self.triggered = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if not self.triggered and self.should_stop():
+            self.triggered = True
+        return self.triggered
+
+
+def stopping_criteria(*criteria):
+    from transformers import StoppingCriteriaList
+
+    return StoppingCriteriaList([criterion for criterion in criteria if criterion is not None])
+
+
+def deadline_criterion(deadline):
+    """StopWhen for a time.perf_counter() deadline, or None without one"""
+    if deadline is None:
+        return None
+    return StopWhen(lambda: time.perf_counter() >= deadline)
+
+
+def usable_partial_reply(text, min_words=MIN_PARTIAL_WORDS):
+    """A reply cut off mid-generation, trimmed to its last full sentence, or None if too short"""
+    text = text.strip()
+    ends = [match.end() for match in SENTENCE_END.finditer(text)]
+    if ends and len(text[:ends[-1]].split()) >= min_words:
+        return text[:ends[-1]]
+    if len(text.split()) >= min_words:
+        return text + "…"
+    return None
+
+
+def degrade_reply(partial, fallback, on_text=None):
+    """Reply to give when the deadline cut generation short.
+
+    The partial reply is kept if it is usable; otherwise `fallback()`
+    supplies one (the entry points use the nearest KB answer or the help
+    menu). Text already streamed through `on_text` is followed by an
+    ellipsis or by the fallback answer.
+    """
+    reply = usable_partial_reply(partial)
+    if reply is not None:
+        if on_text is not None:
+            on_text(" …")
+        return reply
+
+    reply = fallback()
+    if on_text is not None:
+        on_text(f"\n\n{reply}" if partial.strip() else reply)
+    return reply
+
+
+def generation_kwargs(deterministic=False):
+    return DETERMINISTIC_GENERATION_KWARGS if deterministic else GENERATION_KWARGS
+
+
+def model_name(model):
+    """Hub id or snapshot path the model was loaded from, for response cache keys"""
+    return getattr(model.config, 'name_or_path', '') or type(model).__name__
+
+
+def append_cached_reply(tokenizer, conversation, new_input_ids, reply_ids):
+    """Extend the history with a cached reply as if it had just been generated"""
+    import torch
+
+    reply = torch.tensor([list(reply_ids) + [tokenizer.eos_token_id]], dtype=torch.long)
+    parts = [new_input_ids, reply]
+    if conversation.chat_history_ids is not None:
+        parts.insert(0, conversation.chat_history_ids)
+    # The KV cache still covers a prefix of the new history, so it stays valid
+    conversation.chat_history_ids = torch.cat(parts, dim=-1)
+
+
+def generate_reply(model, tokenizer, conversation, user_input, reuse_cache=True,
+                   max_new_tokens=DEFAULT_MAX_NEW_TOKENS, on_text=None,
+                   response_cache=None, deterministic=False, should_stop=None, deadline=None,
+                   assistant_model=None):
+    """Generate a DialoGPT reply and append the turn to the conversation.
+
+    If `on_text` is given it is called with each chunk of reply text as it
+    is generated. Time-to-first-token, total latency, the encode/generate/
+    decode stage times and the number of new tokens are stored on
+    `conversation.last_timing`. With a `response_cache`, a reply
+    cached for the same query and history is reused instead of generated.
+
+    `should_stop` is polled after every generated token; once it returns
+    True generation ends and the partial reply is kept (but not cached),
+    with `cancelled` set on `last_timing`. `deadline` (a time.perf_counter()
+    value) ends generation the same way once it passes and sets
+    `deadline_hit`.
+
+    With an `assistant_model` (a smaller model sharing the tokenizer) the
+    reply is decoded assisted: the draft proposes a few tokens and the
+    model checks them in one forward pass, with the same sampling
+    settings. transformers would hand the model's KV cache to the draft,
+    so in this mode the history is re-encoded each turn instead.
+    """
+    import torch
+
+    conversation.last_timing = None
+    start = time.perf_counter()
+    new_input_ids = tokenizer.encode(
+        user_input + tokenizer.eos_token,
+        return_tensors='pt'
+    )
+    conversation.evict_to_budget(new_input_ids.shape[-1], tokenizer.eos_token_id)
+    encoded = time.perf_counter()
+
+    cache_key = None
+    if response_cache is not None:
+        cache_key = response_cache.key(user_input, conversation.chat_history_ids, model_name(model), deterministic)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            text, reply_ids = cached
+            append_cached_reply(tokenizer, conversation, new_input_ids, reply_ids)
+            if on_text is not None and text:
+                on_text(text)
+            elapsed = time.perf_counter() - start
+            conversation.last_timing = {
+                'time_to_first_token': elapsed,
+                'total_latency': elapsed,
+                'encode': encoded - start,
+                'new_tokens': 0,
+                'cached': True,
+            }
+            return text
+
+    if conversation.chat_history_ids is not None:
+        bot_input_ids = torch.cat([conversation.chat_history_ids, new_input_ids], dim=-1)
+    else:
+        bot_input_ids = new_input_ids
+
+    attention_mask = torch.ones(bot_input_ids.shape, dtype=torch.long)
+    reuse_cache = reuse_cache and assistant_model is None
+    past_key_values = conversation.past_key_values if reuse_cache else None
+    streamer = ReplyStreamer(tokenizer, on_text)
+    stop_when = StopWhen(should_stop) if should_stop is not None else None
+    out_of_time = deadline_criterion(deadline)
+
+    generate_start = time.perf_counter()
+    with torch.no_grad():
+        output = model.generate(
+            bot_input_ids,
+            attention_mask=attention_mask,
+            past_key_values=past_key_values,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=tokenizer.eos_token_id,
+            use_cache=True,
+            return_dict_in_generate=True,
+            streamer=streamer,
+            stopping_criteria=stopping_criteria(stop_when, out_of_time),
+            assistant_model=assistant_model,
+            **generation_kwargs(deterministic)
+        )
+
+    sequences = output.sequences
+    if sequences[0, -1].item() != tokenizer.eos_token_id:
+        # Reply was cut off by max_new_tokens; close the turn so later
+        # evictions and the model still see clean EOS boundaries
+        eos = torch.full((1, 1), tokenizer.eos_token_id, dtype=sequences.dtype)
+        sequences = torch.cat([sequences, eos], dim=-1)
+
+    generate_end = time.perf_counter()
+
+    conversation.chat_history_ids = sequences
+    conversation.past_key_values = output.past_key_values if reuse_cache else None
+
+    reply_ids = output.sequences[0, bot_input_ids.shape[-1]:]
+    response = tokenizer.decode(reply_ids, skip_special_tokens=True)
+
+    end = time.perf_counter()
+    first_token = streamer.first_token_time or generate_end
+    conversation.last_timing = {
+        'time_to_first_token': first_token - start,
+        'total_latency': end - start,
+        'encode': encoded - start,
+        'generate': generate_end - generate_start,
+        'decode': end - generate_end,
+        'new_tokens': reply_ids.shape[-1],
+        'cached': False,
+        'cancelled': stop_when is not None and stop_when.triggered,
+        'deadline_hit': out_of_time is not None and out_of_time.triggered,
+    }
+
+    cut_short = conversation.last_timing['cancelled'] or conversation.last_timing['deadline_hit']
+    if cache_key is not None and response and not cut_short:
+        reply_ids = reply_ids.tolist()
+        if reply_ids and reply_ids[-1] == tokenizer.eos_token_id:
+            reply_ids = reply_ids[:-1]
+        response_cache.put(cache_key, response, reply_ids)
+
+    return response
+
+
+def generate_replies(model, tokenizer, turns, max_new_tokens=DEFAULT_MAX_NEW_TOKENS,
+                     response_cache=None, deterministic=False, deadline=None):
+    """Generate replies for several (conversation, user_input) turns in one call.
+
+    Prompts of different lengths are left-padded with the pad token and
+    masked out, so each row samples exactly as it would on its own. The
+    KV caches of the conversations are dropped since their histories are
+    rebuilt here. Turns answered from `response_cache` skip the batch.
+    Once `deadline` passes the whole batch stops; rows that had not
+    finished get `deadline_hit` on their `last_timing`.
+    Returns the decoded replies in input order.
+    """
+    import torch
+
+    replies = [None] * len(turns)
+    pending = []
+    for index, (conversation, user_input) in enumerate(turns):
+        new_input_ids = tokenizer.encode(user_input + tokenizer.eos_token, return_tensors='pt')
+        conversation.evict_to_budget(new_input_ids.shape[-1], tokenizer.eos_token_id)
+
+        cache_key = None
+        if response_cache is not None:
+            cache_key = response_cache.key(user_input, conversation.chat_history_ids, model_name(model), deterministic)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                replies[index], reply_ids = cached
+                append_cached_reply(tokenizer, conversation, new_input_ids, reply_ids)
+                conversation.last_timing = {'time_to_first_token': None, 'total_latency': 0.0,
+                                            'new_tokens': 0, 'cached': True}
+                continue
+
+        if conversation.chat_history_ids is not None:
+            new_input_ids = torch.cat([conversation.chat_history_ids, new_input_ids], dim=-1)
+        pending.append((index, conversation, new_input_ids[0], cache_key))
+
+    if not pending:
+        return replies
+
+    pad_token_id = tokenizer.eos_token_id
+    prompt_length = max(len(prompt) for _, _, prompt, _ in pending)
+    input_ids = torch.full((len(pending), prompt_length), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(pending), prompt_length), dtype=torch.long)
+    for row, (_, _, prompt, _) in enumerate(pending):
+        input_ids[row, prompt_length - len(prompt):] = prompt
+        attention_mask[row, prompt_length - len(prompt):] = 1
+
+    out_of_time = deadline_criterion(deadline)
+    start = time.perf_counter()
+    with torch.no_grad():
+        sequences = model.generate(
+            input_ids,
+            attention_mask=attention_mask,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=pad_token_id,
+            stopping_criteria=stopping_criteria(out_of_time),
+            **generation_kwargs(deterministic)
+        )
+    elapsed = time.perf_counter() - start
+
+    eos = torch.tensor([tokenizer.eos_token_id], dtype=torch.long)
+    for row, (index, conversation, prompt, cache_key) in enumerate(pending):
+        reply_ids = sequences[row, prompt_length:]
+        # Finished rows are padded with EOS; keep the reply up to its first one
+        eos_positions = (reply_ids == tokenizer.eos_token_id).nonzero().flatten()
+        finished = len(eos_positions) > 0
+        if finished:
+            reply_ids = reply_ids[:eos_positions[0].item()]
+
+        conversation.chat_history_ids = torch.cat([prompt, reply_ids, eos]).unsqueeze(0)
+        conversation.past_key_values = None
+
+        decode_start = time.perf_counter()
+        replies[index] = tokenizer.decode(reply_ids, skip_special_tokens=True)
+        # The whole batch shares one generate call, so each turn reports all of it
+        conversation.last_timing = {
+            'time_to_first_token': None,
+            'total_latency': elapsed,
+            'generate': elapsed,
+            'decode': time.perf_counter() - decode_start,
+            'new_tokens': reply_ids.shape[-1],
+            'cached': False,
+            'deadline_hit': out_of_time is not None and out_of_time.triggered and not finished,
+        }
+        if cache_key is not None and replies[index] and not conversation.last_timing['deadline_hit']:
+            response_cache.put(cache_key, replies[index], reply_ids.tolist())
+
+    return replies
@@ -4,181 +4,96 @@ AI-powered chatbot using HuggingFace Transformers
 Optimized for CPU - No GPU required
 """
 
+import argparse
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+from batch_queries import DEFAULT_BATCH_WORKERS, DEFAULT_GENERATE_BATCH, BatchRunner
+from chat_engine import (
+    DEFAULT_MAX_HISTORY_TOKENS,
+    DEFAULT_MAX_NEW_TOKENS,
+    DEFAULT_REPLY_DEADLINE,
+    TRANSFORMERS_AVAILABLE,
+    Conversation,
+)
+from chatbot_core import ChatbotCore
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD
+from kb_store import DEFAULT_KB_PATH
+from metrics import build_metrics
+from model_loader import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_MODEL_SIZE,
+    DEFAULT_PRECISION,
+    DRAFT_MODEL_PATH_ENV,
+    MODEL_PATH_ENV,
+    MODEL_SIZES,
+    PRECISIONS,
+)
+from response_cache import ResponseCache
+
+if not TRANSFORMERS_AVAILABLE:
     print("⚠️ Transformers not available. Running in knowledge-base only mode.\n")
 
 
-class CollegeChatbotCLI:
-    def __init__(self, college_name="Amity University"):
+class CollegeChatbotCLI(ChatbotCore):
+    def __init__(self, college_name="Amity University",
+                 max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS,
+                 response_cache=None, deterministic=False,
+                 retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD,
+                 kb_only=False, model_size=DEFAULT_MODEL_SIZE, precision=DEFAULT_PRECISION,
+                 model_path=None, kb_path=DEFAULT_KB_PATH, watch_kb=True, metrics=None,
+                 reply_deadline=DEFAULT_REPLY_DEADLINE, inference_workers=0, threads_per_worker=None,
+                 draft_model_size=None, draft_model_path=None, backend=DEFAULT_BACKEND):
         print("🎓 Loading College Support Chatbot...")
-        print("(First run may take 2-5 minutes to download model)\n")
         
         self.college_name = college_name
         self.model = None
         self.tokenizer = None
-        self.chat_history_ids = None
+        self.max_new_tokens = max_new_tokens
+        self.response_cache = response_cache
+        self.deterministic = deterministic
+        self.retrieval_threshold = retrieval_threshold
+        self.model_size = model_size
+        self.precision = precision
+        self.model_path = model_path
+        self.conversation = Conversation(max_history_tokens)
+        self.model_thread = None
+        self.kb_path = kb_path
+        self.kb_watcher = None
+        self.metrics = metrics
+        self.reply_deadline = reply_deadline
+        self.deadline_hits = 0
+        self.inference_workers = inference_workers
+        self.threads_per_worker = threads_per_worker
+        self.inference_pool = None
+        self.draft_model_size = draft_model_size
+        self.draft_model_path = draft_model_path
+        self.draft_model = None
+        self.backend = backend
 
         self.load_knowledge_base()
+        if watch_kb:
+            self.watch_knowledge_base()
 
-        if TRANSFORMERS_AVAILABLE:
-            self.load_ai_model()
+        if TRANSFORMERS_AVAILABLE and not kb_only:
+            self.start_ai_model()
         
         print(f"✓ {college_name} Support Bot ready! Type 'quit' to exit.\n")
     
-    def load_knowledge_base(self):
-        """Load college knowledge base"""
-        self.knowledge_base = {
-            'greetings': {
-                'keywords': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'hii', 'helo', 'hy'],
-                'response': f"👋 Hello! Welcome to {self.college_name} Support!\n\nI can help you with:\n• 📚 Admissions & Courses\n• 💰 Fees & Scholarships\n• 🏢 Facilities\n• 💼 Placements\n• 📞 Contact Info\n\nWhat would you like to know?"
-            },
-            'about_college': {
-                'keywords': ['about college', 'about your college', 'tell me about', 'know about college', 'college info'],
-                'response': f"🎓 About {self.college_name}\n\n✨ Highlights:\n• 15+ Departments\n• 5000+ Students\n• 200+ Faculty Members\n• Modern Infrastructure\n• 100+ Companies for Placements\n• Active Sports & Cultural Activities\n\n📚 Programs: B.Tech, MBA, BBA, M.Tech, B.Sc, M.Sc\n\nWhat specific information would you like?"
-            },
-            'admission': {
-                'keywords': ['admission', 'admissions', 'apply', 'application', 'how to join', 'enroll'],
-                'response': "📝 Admission Information\n\n🎯 Programs: B.Tech, MBA, BBA, M.Tech, B.Sc, M.Sc\n\n✅ Eligibility:\n• UG: Min 60% in 12th\n• PG: Min 60% in Graduation\n\n📋 Entrance Exams: JEE Main, State CET\n📅 Deadline: June 30, 2025\n\n📧 Contact: admissions@amityuniversity.edu"
-            },
-            'courses': {
-                'keywords': ['courses', 'programs', 'what courses', 'degrees', 'branches'],
-                'response': "📚 Programs Offered\n\n🔧 Engineering:\n• CSE, ECE, Mechanical, Civil, EEE\n\n💼 Management:\n• MBA (Marketing, Finance, HR)\n• BBA\n\n💻 Computer Applications:\n• BCA\n\n🔬 Sciences:\n• B.Sc, M.Sc (Various streams)\n\n⏱️ Duration: 3-4 years (UG), 2 years (PG)"
-            },
-            'fees': {
-                'keywords': ['fees', 'fee', 'cost', 'price', 'tuition', 'charges'],
-                'response': "💰 Fee Structure\n\n💳 Annual Fees:\n• B.Tech: ₹75,000 - ₹1,20,000\n• MBA: ₹1,50,000 - ₹2,00,000\n• BBA/BCA: ₹60,000 - ₹80,000\n• B.Sc/M.Sc: ₹50,000 - ₹70,000\n\n🏠 Hostel: ₹40,000 - ₹60,000/year\n\n🎖️ Scholarships available!\n\n📞 accounts@amityuniversity.edu"
-            },
-            'facilities': {
-                'keywords': ['facilities', 'infrastructure', 'amenities', 'campus facilities'],
-                'response': "🏢 Campus Facilities\n\n📖 Library: 24/7 digital, 50,000+ books\n🔬 Labs: Computer & Engineering labs\n🏠 Hostel: Boys & Girls, 500+ capacity\n⚽ Sports: Cricket, Basketball, Gym\n🍽️ Cafeteria: 7 AM-10 PM\n📡 WiFi: Campus-wide"
-            },
-            'placement': {
-                'keywords': ['placement', 'placements', 'job', 'companies', 'recruitment', 'package'],
-                'response': "💼 Placement Record\n\n🎯 Statistics:\n• Rate: 85-90%\n• Companies: 100+ annually\n• Avg Package: ₹3.5-4.5 LPA\n• Highest: ₹15-18 LPA\n\n🏢 Top Recruiters:\n• TCS, Infosys, Wipro\n• Tech Mahindra, Cognizant\n\n📧 placements@amityuniversity.edu"
-            },
-            'scholarship': {
-                'keywords': ['scholarship', 'scholarships', 'financial aid'],
-                'response': "🎖️ Scholarships\n\n💡 Available:\n• Merit (Top 10%): 50% waiver\n• Sports: Up to 50%\n• Need-based: Up to 40%\n• Government scholarships\n\n📝 Apply during admission\n📞 scholarships@amityuniversity.edu"
-            },
-            'library': {
-                'keywords': ['library', 'books', 'reading'],
-                'response': "📖 Library\n\n📚 50,000+ Books, 5,000+ Journals\n⏰ Physical: 8 AM - 8 PM\n⏰ Digital: 24/7\n\n📱 Services:\n• Book Issue (3 books, 15 days)\n• Internet access\n• Study cubicles\n\n📧 library@amityuniversity.edu"
-            },
-            'hostel': {
-                'keywords': ['hostel', 'accommodation', 'room'],
-                'response': "🏠 Hostel Facilities\n\n🛏️ Separate Boys & Girls\n💰 Fees:\n• Non-AC: ₹40,000/year\n• AC: ₹60,000/year\n• Mess: ₹30,000-40,000/year\n\n✨ 24/7 Security, WiFi, Laundry\n\n📧 hostel@amityuniversity.edu"
-            },
-            'exam': {
-                'keywords': ['exam', 'examination', 'test'],
-                'response': "📝 Examination\n\n📅 Schedule:\n• Mid-term: Oct & March\n• End-term: Nov/Dec & Apr/May\n\n📊 Evaluation:\n• Mid: 30 marks\n• End: 50 marks\n• Internal: 20 marks\n\n📋 75% attendance mandatory"
-            },
-            'result': {
-                'keywords': ['result', 'marks', 'grade'],
-                'response': "🎓 Results\n\n📊 Published online within 30 days\n🔐 Check: www.amityuniversity.edu/results\n\n🔄 Revaluation:\n• Apply within 7 days\n• Fee: ₹500 per subject"
-            },
-            'contact': {
-                'keywords': ['contact', 'phone', 'email', 'address'],
-                'response': "📞 Contact\n\n📧 info@amityuniversity.edu\n📧 admissions@amityuniversity.edu\n📱 +91-141-XXXXXXX\n\n📍 Amity University\nCollege Road, Jaipur\n\n⏰ Mon-Fri: 9 AM - 5 PM"
-            },
-            'thanks': {
-                'keywords': ['thanks', 'thank you'],
-                'response': "😊 You're welcome! Happy to help! 🎓"
-            },
-            'help': {
-                'keywords': ['help', 'menu'],
-                'response': "📋 I can help with:\n\n🎓 Admissions & Eligibility\n📚 Courses & Programs\n💰 Fees & Scholarships\n🏢 Facilities (Library, Hostel, Labs)\n💼 Placements & Companies\n📝 Exams & Results\n🎉 Events & Activities\n📞 Contact Information\n\nJust type your question!"
-            }
-        }
-    
-    def load_ai_model(self):
-        """Load AI model"""
-        try:
-            print("⏳ Loading AI model (DialoGPT-medium)...")
-            
-            model_name = "microsoft/DialoGPT-medium"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-            self.model.config.pad_token_id = self.tokenizer.eos_token_id
-            
-            print("✓ AI model loaded successfully!\n")
-            
-        except Exception as e:
-            print(f"⚠️ Could not load AI model: {e}")
-            print("Running in knowledge-base only mode\n")
-    
-    def find_answer(self, user_input):
-        """Search knowledge base with better matching"""
-        user_lower = user_input.lower().strip()
-
-        for category, data in self.knowledge_base.items():
-            for keyword in data['keywords']:
-                if ' ' in keyword:
-                    if keyword in user_lower:
-                        return data['response']
-
-        words_in_query = user_lower.split()
-        for category, data in self.knowledge_base.items():
-            for keyword in data['keywords']:
-                if ' ' not in keyword and keyword in words_in_query:
-                    return data['response']
-        
-        return None
-    
-    def get_ai_response(self, user_input):
-        """Get AI-generated response using DialoGPT"""
-        if self.model is None or self.tokenizer is None:
-            return "I'm here to help with college queries! Ask about admissions, courses, facilities, placements, or type 'help'."
-        
-        try:
-            new_input_ids = self.tokenizer.encode(
-                user_input + self.tokenizer.eos_token,
-                return_tensors='pt'
-            )
-
-            attention_mask = torch.ones(new_input_ids.shape, dtype=torch.long)
-
-            if self.chat_history_ids is not None:
-                bot_input_ids = torch.cat([self.chat_history_ids, new_input_ids], dim=-1)
-                attention_mask = torch.ones(bot_input_ids.shape, dtype=torch.long)
-            else:
-                bot_input_ids = new_input_ids
-
-            with torch.no_grad():
-                self.chat_history_ids = self.model.generate(
-                    bot_input_ids,
-                    attention_mask=attention_mask,
-                    max_length=1000,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    temperature=0.8,
-                    top_k=50,
-                    top_p=0.9,
-                    do_sample=True,
-                    no_repeat_ngram_size=3
-                )
-
-            response = self.tokenizer.decode(
-                self.chat_history_ids[:, bot_input_ids.shape[-1]:][0],
-                skip_special_tokens=True
-            )
-            
-            return response if response else "Could you rephrase that? I'm here to help with college queries!"
-            
-        except Exception as e:
-            return "I'm here to help! Ask me about admissions, courses, facilities, or type 'help'."
+    def start_ai_model(self):
+        """Load AI model in background so knowledge-base answers work right away"""
+        print(f"⏳ Loading AI model (DialoGPT-{self.model_size}, {self.precision}) in the background...")
+        print("(First run may take 2-5 minutes to download model)\n")
+        self.model_thread = threading.Thread(target=self.load_ai_model, daemon=True)
+        self.model_thread.start()
     
     def reset_conversation(self):
-        """Reset chat history"""
-        self.chat_history_ids = None
+        """Reset chat history and KV cache"""
+        self.conversation.reset()
         print("\n💬 Conversation reset! Starting fresh.\n")
     
     def chat(self):
@@ -204,21 +119,114 @@ class CollegeChatbotCLI:
                 self.reset_conversation()
                 continue
 
-            response = self.find_answer(user_input)
+            turn = self.metrics.start_turn('cli') if self.metrics is not None else None
+            response = self.find_answer(user_input, turn)
             
             if response:
                 print(f"\n🤖 Bot: {response}\n")
             else:
                 print("\n🤖 Bot: ", end="", flush=True)
-                ai_response = self.get_ai_response(user_input)
-                print(f"{ai_response}\n")
+                streamed = []
+
+                def print_chunk(text):
+                    streamed.append(text)
+                    print(text, end="", flush=True)
+
+                ai_response = self.get_ai_response(user_input, on_text=print_chunk, turn=turn)
+                if not ''.join(streamed).strip():
+                    print(ai_response, end="")
+                print("\n")
+
+            if turn is not None:
+                turn.finish()
 
 
 def main():
     """Main function"""
-    college_name = "Amity University"
-    bot = CollegeChatbotCLI(college_name)
-    bot.chat()
+    parser = argparse.ArgumentParser(description="College Support Chatbot (CLI)")
+    parser.add_argument('--college', default="Amity University")
+    parser.add_argument('--kb-only', action='store_true', help="knowledge-base answers only; never loads torch")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default=DEFAULT_MODEL_SIZE)
+    parser.add_argument('--precision', choices=PRECISIONS, default=DEFAULT_PRECISION,
+                        help="fp32, bf16 (CPUs with native bf16) or int8 dynamic quantization")
+    parser.add_argument('--model-path',
+                        help=f"local snapshot from export_snapshot.py; no network needed (default: ${MODEL_PATH_ENV})")
+    parser.add_argument('--kb-file', default=DEFAULT_KB_PATH, help="knowledge base JSON/YAML file")
+    parser.add_argument('--no-kb-watch', action='store_true', help="do not reload the knowledge base when the file changes")
+    parser.add_argument('--metrics-log', help="append one JSON line of timings per message to this file ('-' for stderr)")
+    parser.add_argument('--metrics-file', help="keep Prometheus text-format metrics in this file")
+    parser.add_argument('--response-cache', action='store_true', help="reuse AI replies for repeated questions")
+    parser.add_argument('--cache-file', help="preload the response cache from, and save it to, this file")
+    parser.add_argument('--deterministic', action='store_true', help="greedy decoding so cached replies stay consistent")
+    parser.add_argument('--retrieval-threshold', type=float, default=DEFAULT_RETRIEVAL_THRESHOLD,
+                        help="minimum TF-IDF similarity for a KB answer when no keyword matches")
+    parser.add_argument('--max-history-tokens', type=int, default=DEFAULT_MAX_HISTORY_TOKENS,
+                        help="conversation tokens kept as context for the model")
+    parser.add_argument('--max-new-tokens', type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help="longest AI reply, in tokens")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="eager PyTorch, or onnx: the --model-path snapshot's ONNX export in ONNX Runtime")
+    parser.add_argument('--draft-model', choices=list(MODEL_SIZES),
+                        help="assisted decoding: this smaller DialoGPT proposes tokens the model verifies")
+    parser.add_argument('--draft-model-path',
+                        help=f"local snapshot of the draft model (default: ${DRAFT_MODEL_PATH_ENV})")
+    parser.add_argument('--inference-workers', type=int, default=0,
+                        help="generate in N worker processes sharing one copy of the model (0 = in this process)")
+    parser.add_argument('--threads-per-worker', type=int, help="torch threads per inference worker (default: CPUs / workers)")
+    parser.add_argument('--reply-deadline', type=float, default=DEFAULT_REPLY_DEADLINE,
+                        help="seconds an AI reply may take before it is cut short (0 = no limit)")
+    parser.add_argument('--batch', metavar='IN_JSONL',
+                        help="answer every query in this JSON-lines file instead of chatting (needs --out)")
+    parser.add_argument('--out', metavar='OUT_JSONL', help="batch results, one JSON line per query")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_GENERATE_BATCH,
+                        help="knowledge base misses per generate call in batch mode")
+    parser.add_argument('--batch-workers', type=int, default=DEFAULT_BATCH_WORKERS,
+                        help="concurrent generate calls in batch mode")
+    args = parser.parse_args()
+    if args.batch and not args.out:
+        parser.error("--batch needs --out")
+
+    response_cache = None
+    if args.response_cache or args.cache_file:
+        response_cache = ResponseCache()
+        if args.cache_file:
+            print(f"✓ Preloaded {response_cache.load(args.cache_file)} cached responses")
+
+    metrics = build_metrics(args.metrics_log, args.metrics_file)
+
+    bot = CollegeChatbotCLI(
+        args.college,
+        max_history_tokens=args.max_history_tokens,
+        max_new_tokens=args.max_new_tokens,
+        response_cache=response_cache,
+        deterministic=args.deterministic,
+        retrieval_threshold=args.retrieval_threshold,
+        kb_only=args.kb_only,
+        model_size=args.model_size,
+        precision=args.precision,
+        model_path=args.model_path,
+        kb_path=args.kb_file,
+        watch_kb=not (args.no_kb_watch or args.batch),
+        metrics=metrics,
+        reply_deadline=args.reply_deadline,
+        inference_workers=args.inference_workers,
+        threads_per_worker=args.threads_per_worker,
+        draft_model_size=args.draft_model,
+        draft_model_path=args.draft_model_path,
+        backend=args.backend,
+    )
+    try:
+        if args.batch:
+            BatchRunner(bot, generate_batch=args.batch_size, workers=args.batch_workers).run(args.batch, args.out)
+        else:
+            bot.chat()
+    finally:
+        if bot.inference_pool is not None:
+            bot.inference_pool.close()
+        if args.cache_file:
+            response_cache.save(args.cache_file)
+        if metrics is not None:
+            metrics.close()
 
 
 if __name__ == "__main__":
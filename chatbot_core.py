@@ -0,0 +1,125 @@
+"""
+Chatbot Core
+Knowledge base, model loading and reply generation shared by the CLI, GUI and server
+"""
+
+import time
+
+from chat_engine import degrade_reply, generate_reply
+from kb_store import KnowledgeBaseWatcher, load_index
+from model_loader import DEFAULT_BACKEND, load_draft_model, load_model
+
+NO_MODEL_REPLY = "I'm here to help with college queries! Ask about admissions, courses, facilities, placements, or type 'help'."
+EMPTY_REPLY = "Could you rephrase that? I'm here to help with college queries!"
+ERROR_REPLY = "I'm here to help! Ask me about admissions, courses, facilities, or type 'help'."
+
+
+class ChatbotCore:
+    """Mixin for the front ends. The front end sets the attributes these
+    methods read (kb_path, college_name, retrieval_threshold, the model
+    options, conversation, ...) and may override notify() to show
+    background events somewhere other than the console.
+    """
+
+    model_thread = None
+
+    def notify(self, text):
+        """Report something that happened in the background"""
+        print(f"\n{text}")
+
+    def load_knowledge_base(self):
+        """Load college knowledge base and its compiled index"""
+        self.kb_index = load_index(self.kb_path, self.college_name, self.retrieval_threshold)
+        print(f"✓ Knowledge base: {len(self.kb_index.knowledge_base)} topics in "
+              f"{self.kb_index.load_seconds * 1000:.0f} ms (index {self.kb_index.index_bytes / 1024:.0f} KB)")
+
+    def watch_knowledge_base(self):
+        """Reload the knowledge base whenever its file changes"""
+        self.kb_watcher = KnowledgeBaseWatcher(
+            self.kb_path, self.college_name, self.retrieval_threshold,
+            on_reload=self.swap_knowledge_base,
+            on_error=lambda e: self.notify(f"⚠️ Knowledge base not reloaded: {e}"),
+        ).start()
+
+    def swap_knowledge_base(self, index):
+        """Publish a freshly compiled index; lookups in flight keep the old one"""
+        self.kb_index = index
+        self.notify(f"🔄 Knowledge base reloaded: {len(index.knowledge_base)} topics in "
+                    f"{index.load_seconds * 1000:.0f} ms (index {index.index_bytes / 1024:.0f} KB)")
+
+    def load_ai_model(self):
+        """Load the AI model (in an inference pool if configured) and the draft model; False on failure"""
+        try:
+            if self.inference_workers:
+                from inference_pool import InferencePool
+                self.inference_pool = InferencePool(
+                    lambda: load_model(self.model_size, self.precision, model_path=self.model_path),
+                    self.inference_workers, self.threads_per_worker, self.max_new_tokens
+                )
+                tokenizer, model = self.inference_pool.tokenizer, self.inference_pool.model
+                if self.backend != DEFAULT_BACKEND:
+                    print(f"⚠️ --backend {self.backend} is not used with --inference-workers")
+            else:
+                tokenizer, model = load_model(self.model_size, self.precision, model_path=self.model_path,
+                                              backend=self.backend)
+
+            if self.draft_model_size:
+                if self.inference_pool is not None:
+                    print("⚠️ --draft-model is not used with --inference-workers")
+                else:
+                    self.draft_model = load_draft_model(self.draft_model_size, self.precision,
+                                                        self.draft_model_path, model.config.vocab_size)
+
+            self.tokenizer = tokenizer
+            self.model = model
+            return True
+
+        except Exception as e:
+            print(f"⚠️ Could not load AI model: {e}")
+            print("Running in knowledge-base only mode\n")
+            return False
+
+    def find_answer(self, user_input, turn=None):
+        """Search knowledge base: compiled keyword index, then TF-IDF retrieval"""
+        kb_index = self.kb_index
+        if turn is None:
+            return kb_index.find_answer(user_input)
+
+        with turn.span('find_answer'):
+            category = kb_index.find_category(user_input)
+        turn.set_category(category)
+        return None if category is None else kb_index.knowledge_base[category]['response']
+
+    def get_ai_response(self, user_input, on_text=None, turn=None, should_stop=None):
+        """Get AI-generated response using DialoGPT, streaming text to on_text"""
+        if self.model_thread is not None and self.model_thread.is_alive():
+            print("(AI model still loading, please wait...) ", end="", flush=True)
+            self.model_thread.join()
+
+        if self.model is None or self.tokenizer is None:
+            return NO_MODEL_REPLY
+
+        deadline = time.perf_counter() + self.reply_deadline if self.reply_deadline else None
+        try:
+            response = generate_reply(
+                self.model, self.tokenizer, self.conversation, user_input,
+                max_new_tokens=self.max_new_tokens,
+                on_text=on_text,
+                response_cache=self.response_cache,
+                deterministic=self.deterministic,
+                should_stop=should_stop,
+                deadline=deadline,
+                assistant_model=self.draft_model
+            )
+            if turn is not None:
+                turn.add_generation(self.conversation)
+
+            if self.conversation.last_timing.get('deadline_hit'):
+                self.deadline_hits += 1
+                return degrade_reply(response, lambda: self.kb_index.nearest_answer(user_input), on_text)
+
+            return response if response else EMPTY_REPLY
+
+        except Exception as e:
+            print(f"AI Error: {e}")
+            return ERROR_REPLY
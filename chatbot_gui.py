@@ -1,23 +1,53 @@
+import argparse
+import queue
 import tkinter as tk
 from tkinter import scrolledtext
 import threading
-from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+from chat_engine import (
+    DEFAULT_MAX_HISTORY_TOKENS,
+    DEFAULT_MAX_NEW_TOKENS,
+    DEFAULT_REPLY_DEADLINE,
+    TRANSFORMERS_AVAILABLE,
+    Conversation,
+)
+from chatbot_core import ChatbotCore
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD
+from kb_store import DEFAULT_KB_PATH
+from metrics import build_metrics
+from model_loader import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_MODEL_SIZE,
+    DEFAULT_PRECISION,
+    DRAFT_MODEL_PATH_ENV,
+    MODEL_PATH_ENV,
+    MODEL_SIZES,
+    PRECISIONS,
+)
+from response_cache import ResponseCache
+from transcript import DEFAULT_MAX_MESSAGES, Transcript
+
+if not TRANSFORMERS_AVAILABLE:
     print("⚠️ Transformers not available. Running in knowledge-base only mode.")
 
 
-class CollegeChatbotGUI:
-    def __init__(self, root):
+class CollegeChatbotGUI(ChatbotCore):
+    def __init__(self, root, college_name="Amity University",
+                 max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS,
+                 response_cache=None, deterministic=False,
+                 retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD,
+                 kb_only=False, model_size=DEFAULT_MODEL_SIZE, precision=DEFAULT_PRECISION,
+                 model_path=None, kb_path=DEFAULT_KB_PATH, watch_kb=True, metrics=None,
+                 max_messages=DEFAULT_MAX_MESSAGES, transcript_log=None,
+                 reply_deadline=DEFAULT_REPLY_DEADLINE, inference_workers=0, threads_per_worker=None,
+                 draft_model_size=None, draft_model_path=None, backend=DEFAULT_BACKEND):
         self.root = root
-        self.root.title("🎓 Amity University Support Chatbot")
+        self.college_name = college_name
+        self.root.title(f"🎓 {college_name} Support Chatbot")
         self.root.geometry("900x700")
         self.root.resizable(True, True)
         
@@ -27,18 +57,52 @@ class CollegeChatbotGUI:
         self.bot_msg_color = "#e4e6eb"
         self.text_color = "#000000"
         
-        self.college_name = "Amity University"
         self.model = None
         self.tokenizer = None
-        self.chat_history_ids = None
+        self.max_new_tokens = max_new_tokens
+        self.response_cache = response_cache
+        self.deterministic = deterministic
+        self.retrieval_threshold = retrieval_threshold
+        self.model_size = model_size
+        self.precision = precision
+        self.model_path = model_path
+        self.conversation = Conversation(max_history_tokens)
+        self.max_messages = max_messages
+        self.transcript_log = transcript_log
+        self.kb_path = kb_path
+        self.kb_watcher = None
+        self.metrics = metrics
+        self.reply_deadline = reply_deadline
+        self.deadline_hits = 0
+        self.inference_workers = inference_workers
+        self.threads_per_worker = threads_per_worker
+        self.inference_pool = None
+        self.draft_model_size = draft_model_size
+        self.draft_model_path = draft_model_path
+        self.draft_model = None
+        self.backend = backend
+
+        # One worker answers messages in the order they were sent. Reset and
+        # close bump the epoch, which cancels the reply being generated and
+        # drops everything queued before it.
+        self.inference_queue = queue.Queue()
+        self.queue_depth = 0
+        self.showing_queue_depth = False
+        self.epoch = 0
+        self.closing = False
         
         self.setup_gui()
         self.load_knowledge_base()
+        if watch_kb:
+            self.watch_knowledge_base()
         
-        self.show_bot_message("🎓 Welcome to Amity University Support Chatbot!\n\nI can help you with:\n• Admissions & Courses\n• Fees & Scholarships\n• Facilities & Campus\n• Placements & Events\n\nType your question or type 'help' for more options!")
+        self.show_bot_message(f"🎓 Welcome to {self.college_name} Support Chatbot!\n\nI can help you with:\n• Admissions & Courses\n• Fees & Scholarships\n• Facilities & Campus\n• Placements & Events\n\nType your question or type 'help' for more options!")
         
-        if TRANSFORMERS_AVAILABLE:
+        if TRANSFORMERS_AVAILABLE and not kb_only:
             threading.Thread(target=self.load_ai_model, daemon=True).start()
+
+        threading.Thread(target=self.inference_worker, daemon=True).start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_gui(self):
         """Setup the GUI components"""
@@ -50,7 +114,7 @@ class CollegeChatbotGUI:
         
         header_label = tk.Label(
             header_frame,
-            text="🎓 Amity University Support",
+            text=f"🎓 {self.college_name} Support",
             font=("Segoe UI", 20, "bold"),
             bg=self.primary_color,
             fg="white"
@@ -103,6 +167,8 @@ class CollegeChatbotGUI:
             foreground="#65676b", 
             font=("Segoe UI", 8))
 
+        self.transcript = Transcript(self.root, self.chat_display, self.max_messages, self.transcript_log)
+
         quick_frame = tk.Frame(main_frame, bg=self.bg_color)
         quick_frame.pack(fill=tk.X, pady=(10, 0))
         
@@ -179,150 +245,22 @@ class CollegeChatbotGUI:
         )
         footer_label.pack()
     
-    def load_knowledge_base(self):
-        """Load college knowledge base"""
-        self.knowledge_base = {
-            'greetings': {
-                'keywords': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'hii', 'helo', 'hy'],
-                'response': f"👋 Hello! Welcome to {self.college_name} Support!\n\nI can help you with:\n• 📚 Admissions & Courses\n• 💰 Fees & Scholarships\n• 🏢 Facilities\n• 💼 Placements\n• 📞 Contact Info\n\nWhat would you like to know?"
-            },
-            'about_college': {
-                'keywords': ['about college', 'about your college', 'tell me about', 'know about college', 'college info'],
-                'response': f"🎓 **About {self.college_name}**\n\n✨ Highlights:\n• 15+ Departments\n• 5000+ Students\n• 200+ Faculty Members\n• Modern Infrastructure\n• 100+ Companies for Placements\n• Active Sports & Cultural Activities\n\n📚 Programs: B.Tech, MBA, BBA, M.Tech, B.Sc, M.Sc\n\nWhat specific information would you like?"
-            },
-            'admission': {
-                'keywords': ['admission', 'admissions', 'apply', 'application', 'how to join', 'enroll'],
-                'response': "📝 **Admission Information**\n\n🎯 Programs: B.Tech, MBA, BBA, M.Tech, B.Sc, M.Sc\n\n✅ Eligibility:\n• UG: Min 60% in 12th\n• PG: Min 60% in Graduation\n\n📋 Entrance Exams: JEE Main, State CET\n📅 Deadline: June 30, 2025\n\n📧 Contact: admissions@amityuniversity.edu"
-            },
-            'courses': {
-                'keywords': ['courses', 'programs', 'what courses', 'degrees', 'branches'],
-                'response': "📚 **Programs Offered**\n\n🔧 Engineering:\n• CSE, ECE, Mechanical, Civil, EEE\n\n💼 Management:\n• MBA (Marketing, Finance, HR)\n• BBA\n\n💻 Computer Applications:\n• BCA\n\n🔬 Sciences:\n• B.Sc, M.Sc (Various streams)\n\n⏱️ Duration: 3-4 years (UG), 2 years (PG)"
-            },
-            'fees': {
-                'keywords': ['fees', 'fee', 'cost', 'price', 'tuition', 'charges'],
-                'response': "💰 **Fee Structure**\n\n💳 Annual Fees:\n• B.Tech: ₹75,000 - ₹1,20,000\n• MBA: ₹1,50,000 - ₹2,00,000\n• BBA/BCA: ₹60,000 - ₹80,000\n• B.Sc/M.Sc: ₹50,000 - ₹70,000\n\n🏠 Hostel: ₹40,000 - ₹60,000/year\n\n🎖️ Scholarships available!\n\n📞 accounts@amityuniversity.edu"
-            },
-            'facilities': {
-                'keywords': ['facilities', 'infrastructure', 'amenities', 'campus facilities'],
-                'response': "🏢 **Campus Facilities**\n\n📖 Library: 24/7 digital, 50,000+ books\n🔬 Labs: Computer & Engineering labs\n🏠 Hostel: Boys & Girls, 500+ capacity\n⚽ Sports: Cricket, Basketball, Gym\n🍽️ Cafeteria: 7 AM-10 PM\n📡 WiFi: Campus-wide\n\nWhat specific facility?"
-            },
-            'placement': {
-                'keywords': ['placement', 'placements', 'job', 'companies', 'recruitment', 'package'],
-                'response': "💼 **Placement Record**\n\n🎯 Statistics:\n• Rate: 85-90%\n• Companies: 100+ annually\n• Avg Package: ₹3.5-4.5 LPA\n• Highest: ₹15-18 LPA\n\n🏢 Top Recruiters:\n• TCS, Infosys, Wipro\n• Tech Mahindra, Cognizant\n\n📧 placements@amityuniversity.edu"
-            },
-            'scholarship': {
-                'keywords': ['scholarship', 'scholarships', 'financial aid'],
-                'response': "🎖️ **Scholarships**\n\n💡 Available:\n• Merit (Top 10%): 50% waiver\n• Sports: Up to 50%\n• Need-based: Up to 40%\n• Government scholarships\n\n📝 Apply during admission\n📞 scholarships@amityuniversity.edu"
-            },
-            'library': {
-                'keywords': ['library', 'books', 'reading'],
-                'response': "📖 **Library**\n\n📚 50,000+ Books, 5,000+ Journals\n⏰ Physical: 8 AM - 8 PM\n⏰ Digital: 24/7\n\n📱 Services:\n• Book Issue (3 books, 15 days)\n• Internet access\n• Study cubicles\n\n📧 library@amityuniversity.edu"
-            },
-            'hostel': {
-                'keywords': ['hostel', 'accommodation', 'room'],
-                'response': "🏠 **Hostel Facilities**\n\n🛏️ Separate Boys & Girls\n💰 Fees:\n• Non-AC: ₹40,000/year\n• AC: ₹60,000/year\n• Mess: ₹30,000-40,000/year\n\n✨ 24/7 Security, WiFi, Laundry\n\n📧 hostel@amityuniversity.edu"
-            },
-            'exam': {
-                'keywords': ['exam', 'examination', 'test'],
-                'response': "📝 **Examination**\n\n📅 Schedule:\n• Mid-term: Oct & March\n• End-term: Nov/Dec & Apr/May\n\n📊 Evaluation:\n• Mid: 30 marks\n• End: 50 marks\n• Internal: 20 marks\n\n📋 75% attendance mandatory"
-            },
-            'result': {
-                'keywords': ['result', 'marks', 'grade'],
-                'response': "🎓 **Results**\n\n📊 Published online within 30 days\n🔐 Check: www.amityuniversity.edu/results\n\n🔄 Revaluation:\n• Apply within 7 days\n• Fee: ₹500 per subject"
-            },
-            'contact': {
-                'keywords': ['contact', 'phone', 'email', 'address'],
-                'response': "📞 **Contact**\n\n📧 info@amityuniversity.edu\n📧 admissions@amityuniversity.edu\n📱 +91-141-XXXXXXX\n\n📍 Amity University\nCollege Road, Jaipur\n\n⏰ Mon-Fri: 9 AM - 5 PM"
-            },
-            'thanks': {
-                'keywords': ['thanks', 'thank you'],
-                'response': "😊 You're welcome! Happy to help! 🎓"
-            },
-            'help': {
-                'keywords': ['help', 'menu'],
-                'response': "📋 **I can help with:**\n\n🎓 Admissions\n📚 Courses\n💰 Fees\n🏢 Facilities\n💼 Placements\n📝 Exams\n📞 Contact\n\nJust ask!"
-            }
-        }
+    def notify(self, text):
+        self.root.after(0, lambda: self.show_status(text, 5000))
+    
+    def show_status(self, text, clear_after_ms):
+        self.status_label.config(text=text)
+        self.root.after(clear_after_ms, lambda: self.status_label.config(text=""))
     
     def load_ai_model(self):
         """Load AI model in background"""
-        try:
-            self.status_label.config(text="Loading AI model... (2-5 minutes first time)")
-            
-            model_name = "microsoft/DialoGPT-medium"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-            self.model.config.pad_token_id = self.tokenizer.eos_token_id
-            
+        self.status_label.config(text=f"Loading AI model (DialoGPT-{self.model_size}, {self.precision})... (2-5 minutes first time)")
+        if super().load_ai_model():
             self.status_label.config(text="✓ AI model loaded successfully!")
             self.root.after(3000, lambda: self.status_label.config(text=""))
-            
-        except Exception as e:
+        else:
             self.status_label.config(text="⚠️ Running in knowledge-base mode only")
             self.root.after(5000, lambda: self.status_label.config(text=""))
-            print(f"Error loading model: {e}")
-    
-    def find_answer(self, user_input):
-        """Search knowledge base with better matching"""
-        user_lower = user_input.lower().strip()
-        for category, data in self.knowledge_base.items():
-            for keyword in data['keywords']:
-                if ' ' in keyword:
-                    if keyword in user_lower:
-                        return data['response']
-
-        words_in_query = user_lower.split()
-        for category, data in self.knowledge_base.items():
-            for keyword in data['keywords']:
-                if ' ' not in keyword and keyword in words_in_query:
-                    return data['response']
-        
-        return None
-    
-    def get_ai_response(self, user_input):
-        """Get AI-generated response using DialoGPT"""
-        if self.model is None or self.tokenizer is None:
-            return "I'm here to help with college queries! Ask about admissions, courses, facilities, placements, or type 'help'."
-        
-        try:
-            new_input_ids = self.tokenizer.encode(
-                user_input + self.tokenizer.eos_token,
-                return_tensors='pt'
-            )
-            
-            attention_mask = torch.ones(new_input_ids.shape, dtype=torch.long)
-            
-            if self.chat_history_ids is not None:
-                bot_input_ids = torch.cat([self.chat_history_ids, new_input_ids], dim=-1)
-                attention_mask = torch.ones(bot_input_ids.shape, dtype=torch.long)
-            else:
-                bot_input_ids = new_input_ids
-            
-            with torch.no_grad():
-                self.chat_history_ids = self.model.generate(
-                    bot_input_ids,
-                    attention_mask=attention_mask,
-                    max_length=1000,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    temperature=0.8,
-                    top_k=50,
-                    top_p=0.9,
-                    do_sample=True,
-                    no_repeat_ngram_size=3
-                )
-            
-            response = self.tokenizer.decode(
-                self.chat_history_ids[:, bot_input_ids.shape[-1]:][0],
-                skip_special_tokens=True
-            )
-            
-            return response if response else "Could you rephrase that? I'm here to help with college queries!"
-            
-        except Exception as e:
-            print(f"AI Error: {e}")
-            return "I'm here to help! Ask me about admissions, courses, facilities, or type 'help'."
     
     def quick_action(self, query):
         self.input_field.delete(0, tk.END)
@@ -343,44 +281,176 @@ class CollegeChatbotGUI:
             return
         
         if message.lower() == 'reset':
-            self.chat_history_ids = None
-            self.show_bot_message("Conversation reset! 💬")
+            # The worker resets the history once the cancelled reply has stopped
+            self.epoch += 1
+            self.inference_queue.put((self.epoch, None))
             return
         
-        threading.Thread(target=self.process_message, args=(message,), daemon=True).start()
+        self.queue_depth += 1
+        self.show_queue_depth()
+        self.inference_queue.put((self.epoch, message))
+    
+    def inference_worker(self):
+        """Answer queued messages one at a time, in the order they were sent"""
+        while True:
+            epoch, message = self.inference_queue.get()
+            if self.closing:
+                return
+            try:
+                if message is None:
+                    self.conversation.reset()
+                    self.show_bot_message("Conversation reset! 💬")
+                    continue
+                if epoch == self.epoch:
+                    self.process_message(message, epoch)
+                self.root.after(0, self.message_done)
+            except (RuntimeError, tk.TclError):
+                # The window was destroyed while this message was in flight
+                if self.closing:
+                    return
+                raise
+    
+    def message_done(self):
+        self.queue_depth -= 1
+        self.show_queue_depth()
+    
+    def show_queue_depth(self):
+        """Show how many messages are waiting behind the one being answered"""
+        waiting = self.queue_depth - 1
+        if waiting > 0:
+            self.status_label.config(text=f"⏳ Answering... {waiting} more in queue")
+            self.showing_queue_depth = True
+        elif self.showing_queue_depth:
+            self.status_label.config(text="")
+            self.showing_queue_depth = False
     
-    def process_message(self, message):
-        response = self.find_answer(message)
+    def on_close(self):
+        """Cancel the reply in progress and stop the worker before closing"""
+        self.closing = True
+        self.epoch += 1
+        self.inference_queue.put((self.epoch, None))
+        if self.kb_watcher is not None:
+            self.kb_watcher.stop()
+        self.root.destroy()
+        self.transcript.close()
+    
+    def process_message(self, message, epoch):
+        turn = self.metrics.start_turn('gui') if self.metrics is not None else None
+        response = self.find_answer(message, turn)
         
-        if response is None:
-            response = self.get_ai_response(message)
-        self.root.after(0, lambda: self.show_bot_message(response))
+        if response is not None:
+            if turn is not None:
+                turn.finish()
+            self.show_bot_message(response)
+            return
+
+        self.start_bot_stream()
+        streamed = []
+
+        def queue_chunk(text):
+            streamed.append(text)
+            self.transcript.stream_text(text)
+
+        response = self.get_ai_response(
+            message, on_text=queue_chunk, turn=turn,
+            should_stop=lambda: self.closing or epoch != self.epoch,
+        )
+        if turn is not None:
+            turn.finish()
+        if epoch != self.epoch:
+            self.finish_bot_stream(" ⏹️ (stopped)", None)
+            return
+        leftover = None if ''.join(streamed).strip() else response
+        timing = self.conversation.last_timing if streamed else None
+        self.finish_bot_stream(leftover, timing)
+    
+    def start_bot_stream(self):
+        self.transcript.start_stream()
+    
+    def finish_bot_stream(self, text, timing):
+        self.transcript.finish_stream(text)
+        if timing and timing.get('deadline_hit'):
+            status = f"⏱️ Reply cut short at the {self.reply_deadline:g}s deadline ({self.deadline_hits} so far)"
+            self.root.after(0, lambda: self.show_status(status, 5000))
+        elif timing:
+            status = f"⏱️ First token {timing['time_to_first_token']:.2f}s · Total {timing['total_latency']:.2f}s"
+            self.root.after(0, lambda: self.show_status(status, 3000))
     
     def show_user_message(self, message):
-        self.chat_display.config(state=tk.NORMAL)
-        
-        time_str = datetime.now().strftime("%I:%M %p")
-        self.chat_display.insert(tk.END, f"\n{time_str}\n", "time")
-        self.chat_display.insert(tk.END, f"You: {message}\n", "user")
-        
-        self.chat_display.config(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
+        self.transcript.add_message('user', message)
     
     def show_bot_message(self, message):
-        self.chat_display.config(state=tk.NORMAL)
-        
-        time_str = datetime.now().strftime("%I:%M %p")
-        self.chat_display.insert(tk.END, f"\n{time_str}\n", "time")
-        self.chat_display.insert(tk.END, f"🤖 Bot: {message}\n", "bot")
-        
-        self.chat_display.config(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
+        self.transcript.add_message('bot', message)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="College Support Chatbot (GUI)")
+    parser.add_argument('--college', default="Amity University")
+    parser.add_argument('--kb-only', action='store_true', help="knowledge-base answers only; never loads torch")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default=DEFAULT_MODEL_SIZE)
+    parser.add_argument('--precision', choices=PRECISIONS, default=DEFAULT_PRECISION,
+                        help="fp32, bf16 (CPUs with native bf16) or int8 dynamic quantization")
+    parser.add_argument('--model-path',
+                        help=f"local snapshot from export_snapshot.py; no network needed (default: ${MODEL_PATH_ENV})")
+    parser.add_argument('--kb-file', default=DEFAULT_KB_PATH, help="knowledge base JSON/YAML file")
+    parser.add_argument('--no-kb-watch', action='store_true', help="do not reload the knowledge base when the file changes")
+    parser.add_argument('--metrics-log', help="append one JSON line of timings per message to this file ('-' for stderr)")
+    parser.add_argument('--metrics-file', help="keep Prometheus text-format metrics in this file")
+    parser.add_argument('--response-cache', action='store_true', help="reuse AI replies for repeated questions")
+    parser.add_argument('--cache-file', help="preload the response cache from, and save it to, this file")
+    parser.add_argument('--deterministic', action='store_true', help="greedy decoding so cached replies stay consistent")
+    parser.add_argument('--retrieval-threshold', type=float, default=DEFAULT_RETRIEVAL_THRESHOLD,
+                        help="minimum TF-IDF similarity for a KB answer when no keyword matches")
+    parser.add_argument('--max-history-tokens', type=int, default=DEFAULT_MAX_HISTORY_TOKENS,
+                        help="conversation tokens kept as context for the model")
+    parser.add_argument('--max-new-tokens', type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help="longest AI reply, in tokens")
+    parser.add_argument('--max-messages', type=int, default=DEFAULT_MAX_MESSAGES,
+                        help="messages kept on screen; older ones are read back from the transcript log on scroll-up")
+    parser.add_argument('--transcript-log', help="keep the transcript log in this file (default: a temporary file)")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="eager PyTorch, or onnx: the --model-path snapshot's ONNX export in ONNX Runtime")
+    parser.add_argument('--draft-model', choices=list(MODEL_SIZES),
+                        help="assisted decoding: this smaller DialoGPT proposes tokens the model verifies")
+    parser.add_argument('--draft-model-path',
+                        help=f"local snapshot of the draft model (default: ${DRAFT_MODEL_PATH_ENV})")
+    parser.add_argument('--inference-workers', type=int, default=0,
+                        help="generate in N worker processes sharing one copy of the model (0 = in this process)")
+    parser.add_argument('--threads-per-worker', type=int, help="torch threads per inference worker (default: CPUs / workers)")
+    parser.add_argument('--reply-deadline', type=float, default=DEFAULT_REPLY_DEADLINE,
+                        help="seconds an AI reply may take before it is cut short (0 = no limit)")
+    args = parser.parse_args()
+    if args.max_messages < 1:
+        parser.error("--max-messages must be at least 1")
+
+    response_cache = None
+    if args.response_cache or args.cache_file:
+        response_cache = ResponseCache()
+        if args.cache_file:
+            print(f"✓ Preloaded {response_cache.load(args.cache_file)} cached responses")
+
+    metrics = build_metrics(args.metrics_log, args.metrics_file)
+
     root = tk.Tk()
-    app = CollegeChatbotGUI(root)
-    root.mainloop()
+    app = CollegeChatbotGUI(root, args.college, max_history_tokens=args.max_history_tokens,
+                            max_new_tokens=args.max_new_tokens, response_cache=response_cache,
+                            deterministic=args.deterministic, retrieval_threshold=args.retrieval_threshold,
+                            kb_only=args.kb_only, model_size=args.model_size,
+                            precision=args.precision, model_path=args.model_path,
+                            kb_path=args.kb_file, watch_kb=not args.no_kb_watch, metrics=metrics,
+                            max_messages=args.max_messages, transcript_log=args.transcript_log,
+                            reply_deadline=args.reply_deadline, inference_workers=args.inference_workers,
+                            threads_per_worker=args.threads_per_worker, draft_model_size=args.draft_model,
+                            draft_model_path=args.draft_model_path, backend=args.backend)
+    try:
+        root.mainloop()
+    finally:
+        if app.inference_pool is not None:
+            app.inference_pool.close()
+        if args.cache_file:
+            response_cache.save(args.cache_file)
+        if metrics is not None:
+            metrics.close()
 
 
 if __name__ == "__main__":
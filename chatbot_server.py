@@ -0,0 +1,537 @@
+"""
+College Support Chatbot - Server Version
+One asyncio HTTP server, one shared DialoGPT model, many student sessions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_scheduler import BatchScheduler
+from chat_engine import (
+    DEFAULT_MAX_HISTORY_TOKENS,
+    DEFAULT_MAX_NEW_TOKENS,
+    DEFAULT_REPLY_DEADLINE,
+    TRANSFORMERS_AVAILABLE,
+    Conversation,
+    degrade_reply,
+    generate_reply,
+)
+from chatbot_core import EMPTY_REPLY, ERROR_REPLY, NO_MODEL_REPLY, ChatbotCore
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD
+from kb_store import DEFAULT_KB_PATH
+from metrics import build_metrics
+from model_loader import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_MODEL_SIZE,
+    DEFAULT_PRECISION,
+    DRAFT_MODEL_PATH_ENV,
+    MODEL_PATH_ENV,
+    MODEL_SIZES,
+    PRECISIONS,
+)
+from response_cache import ResponseCache
+from session_store import DEFAULT_SESSION_IDLE_SECONDS, DEFAULT_SESSION_MEMORY_BYTES, SessionStore
+from tenants import TenantRegistry
+
+
+MAX_BODY_BYTES = 64 * 1024
+SESSION_SWEEP_SECONDS = 60
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class Session:
+    """Per-student state: conversation history and a lock keeping turns in order"""
+
+    def __init__(self, max_history_tokens):
+        self.conversation = Conversation(max_history_tokens)
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+
+class ChatServer(ChatbotCore):
+    def __init__(self, college_name="Amity University", max_workers=4, max_pending=64,
+                 session_ttl=1800, batch_size=1, batch_wait_ms=10,
+                 response_cache=None, deterministic=False,
+                 retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD, kb_only=False,
+                 model_size=DEFAULT_MODEL_SIZE, precision=DEFAULT_PRECISION, model_path=None,
+                 kb_path=DEFAULT_KB_PATH, watch_kb=True, metrics=None,
+                 max_history_tokens=DEFAULT_MAX_HISTORY_TOKENS,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS, reply_deadline=DEFAULT_REPLY_DEADLINE,
+                 inference_workers=0, threads_per_worker=None, session_store=None,
+                 session_idle=DEFAULT_SESSION_IDLE_SECONDS, draft_model_size=None, draft_model_path=None,
+                 tenants=None, tenant_admin=False, backend=DEFAULT_BACKEND):
+        print("🎓 Loading College Support Chatbot server...")
+
+        self.college_name = college_name
+        self.model = None
+        self.tokenizer = None
+        self.max_history_tokens = max_history_tokens
+        self.max_new_tokens = max_new_tokens
+        self.reply_deadline = reply_deadline
+        self.deadline_hits = 0
+        self.inference_workers = inference_workers
+        self.threads_per_worker = threads_per_worker
+        self.inference_pool = None
+        self.draft_model_size = draft_model_size
+        self.draft_model_path = draft_model_path
+        self.draft_model = None
+        self.backend = backend
+        self.response_cache = response_cache
+        self.deterministic = deterministic
+        self.retrieval_threshold = retrieval_threshold
+        self.model_size = model_size
+        self.precision = precision
+        self.model_path = model_path
+
+        self.sessions = {}
+        self.session_ttl = session_ttl
+        self.session_store = session_store
+        self.session_idle = session_idle
+        self.tenants = tenants
+        self.tenant_admin = tenant_admin
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generate")
+        self.scheduler = None
+        self.kb_path = kb_path
+        self.kb_watcher = None
+        self.metrics = metrics
+
+        self.load_knowledge_base()
+        if watch_kb:
+            self.watch_knowledge_base()
+            if tenants is not None:
+                tenants.watch()
+
+        if TRANSFORMERS_AVAILABLE and not kb_only:
+            print(f"⏳ Loading AI model (DialoGPT-{model_size}, {precision})...")
+            self.load_ai_model()
+            if self.model is not None:
+                print("✓ AI model loaded successfully!\n")
+
+        if self.model is not None and batch_size > 1:
+            self.scheduler = BatchScheduler(
+                self.model, self.tokenizer,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_wait_ms,
+                max_new_tokens=max_new_tokens,
+                response_cache=response_cache,
+                deterministic=deterministic,
+            )
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(self.max_history_tokens)
+            if self.session_store is not None and self.model is not None:
+                # The KV cache is rebuilt from the history on the next generate
+                session.conversation.chat_history_ids = self.session_store.get(session_id)
+        session.last_active = time.monotonic()
+        return session
+
+    def get_ai_response(self, conversation, user_input, turn=None, deadline=None, tenant=None):
+        """Get AI-generated response for one session (runs on the executor).
+
+        Replaces the shared single-conversation version: each session brings
+        its own conversation, deadline and tenant knowledge base.
+        """
+        if self.model is None or self.tokenizer is None:
+            return NO_MODEL_REPLY
+
+        try:
+            response = generate_reply(
+                self.model, self.tokenizer, conversation, user_input,
+                max_new_tokens=self.max_new_tokens,
+                response_cache=self.response_cache,
+                deterministic=self.deterministic,
+                deadline=deadline,
+                assistant_model=self.draft_model
+            )
+            if turn is not None:
+                turn.add_generation(conversation)
+
+            if conversation.last_timing.get('deadline_hit'):
+                kb = self.kb_index if tenant is None else tenant
+                return degrade_reply(response, lambda: kb.nearest_answer(user_input))
+            return response if response else EMPTY_REPLY
+
+        except Exception as e:
+            print(f"AI Error: {e}")
+            return ERROR_REPLY
+
+    async def get_batched_ai_response(self, conversation, user_input, turn=None, deadline=None, tenant=None):
+        """Get AI-generated response through the batch scheduler"""
+        try:
+            response = await asyncio.wrap_future(self.scheduler.submit(conversation, user_input, deadline))
+            if turn is not None:
+                turn.add_generation(conversation)
+
+            if conversation.last_timing.get('deadline_hit'):
+                kb = self.kb_index if tenant is None else tenant
+                return degrade_reply(response, lambda: kb.nearest_answer(user_input))
+            return response if response else EMPTY_REPLY
+
+        except Exception as e:
+            print(f"AI Error: {e}")
+            return ERROR_REPLY
+
+    async def handle_message(self, session_id, message, tenant=None):
+        """Answer one message: KB hits on the event loop, AI fallback on the executor"""
+        # The reply deadline counts from arrival, so time spent queued uses it up too
+        start = time.perf_counter()
+        deadline = start + self.reply_deadline if self.reply_deadline else None
+        if tenant is not None:
+            # Tenants may reuse session ids; their conversations stay apart.
+            # Tenant ids cannot contain ':', so the key is unambiguous
+            session_id = f"{tenant.tenant_id}:{session_id}"
+        session = self.get_session(session_id)
+
+        if message.lower() == 'reset':
+            async with session.lock:
+                session.conversation.reset()
+                if self.session_store is not None:
+                    self.session_store.delete(session_id)
+            return 200, {'response': "Conversation reset! 💬", 'source': 'command'}
+
+        turn = self.metrics.start_turn('server') if self.metrics is not None else None
+        if tenant is None:
+            response = self.find_answer(message, turn)
+        else:
+            response = tenant.find_answer(message, turn)
+        if response is not None:
+            if turn is not None:
+                turn.finish()
+            if tenant is not None:
+                tenant.record('kb', time.perf_counter() - start)
+            return 200, {'response': response, 'source': 'kb'}
+
+        if self.pending >= self.max_pending:
+            if turn is not None:
+                turn.source = 'rejected'
+                turn.finish()
+            return 503, {'error': "Server busy, please try again shortly"}
+
+        self.pending += 1
+        try:
+            async with session.lock:
+                if self.scheduler is not None:
+                    response = await self.get_batched_ai_response(session.conversation, message, turn, deadline,
+                                                                  tenant)
+                else:
+                    loop = asyncio.get_running_loop()
+                    response = await loop.run_in_executor(
+                        self.executor, self.get_ai_response, session.conversation, message, turn, deadline, tenant
+                    )
+                timing = session.conversation.last_timing
+                deadline_hit = bool(timing and timing.get('deadline_hit'))
+                if self.session_store is not None:
+                    self.session_store.put(session_id, session.conversation.chat_history_ids)
+        finally:
+            self.pending -= 1
+            if turn is not None:
+                turn.finish()
+        if tenant is not None:
+            tenant.record('ai', time.perf_counter() - start)
+
+        if deadline_hit:
+            self.deadline_hits += 1
+            return 200, {'response': response, 'source': 'ai', 'deadline_hit': True}
+        return 200, {'response': response, 'source': 'ai'}
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            health = {'status': 'ok', 'sessions': len(self.sessions), 'pending': self.pending,
+                      'model_loaded': self.model is not None, 'deadline_hits': self.deadline_hits}
+            kb_index = self.kb_index
+            health['knowledge_base'] = {
+                'topics': len(kb_index.knowledge_base),
+                'index_bytes': kb_index.index_bytes,
+                'reloads': self.kb_watcher.reloads if self.kb_watcher is not None else 0,
+            }
+            if self.response_cache is not None:
+                health['response_cache'] = self.response_cache.stats()
+            if self.session_store is not None:
+                health['session_store'] = self.session_store.stats()
+            if self.tenants is not None:
+                health['tenants'] = len(self.tenants)
+            return 200, health
+
+        if path == '/tenants' and self.tenants is not None:
+            return 200, self.tenants.stats()
+
+        if path == '/metrics' and self.metrics is not None:
+            return 200, self.metrics.prometheus_text()
+
+        tenant_admin = self.tenant_admin and self.tenants is not None and path in ('/tenants/load', '/tenants/unload')
+        if path not in ('/chat', '/reset') and not tenant_admin:
+            return 404, {'error': "Not found"}
+        if method != 'POST':
+            return 405, {'error': "Use POST"}
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': "Body must be JSON"}
+        if not isinstance(payload, dict):
+            return 400, {'error': "Body must be a JSON object"}
+        if tenant_admin:
+            return await self.manage_tenant(path, payload)
+
+        tenant = None
+        if self.tenants is not None:
+            tenant = self.tenants.get(payload.get('tenant_id'))
+            if tenant is None:
+                return 404, {'error': "Unknown tenant"}
+
+        session_id = str(payload.get('session_id') or uuid.uuid4().hex)
+        message = 'reset' if path == '/reset' else str(payload.get('message', '')).strip()
+        if not message:
+            return 400, {'error': "Missing 'message'"}
+
+        status, result = await self.handle_message(session_id, message, tenant)
+        result['session_id'] = session_id
+        return status, result
+
+    async def manage_tenant(self, path, payload):
+        """Load or unload one tenant; compiling its knowledge base runs off the event loop"""
+        tenant_id = payload.get('tenant_id')
+        if not isinstance(tenant_id, str) or not tenant_id:
+            return 400, {'error': "Missing 'tenant_id'"}
+
+        if path == '/tenants/unload':
+            if not self.tenants.unload(tenant_id):
+                return 404, {'error': "Unknown tenant"}
+            return 200, {'unloaded': tenant_id}
+
+        college_name = payload.get('college_name')
+        if not isinstance(college_name, str) or not college_name:
+            return 400, {'error': "Missing 'college_name'"}
+        loop = asyncio.get_running_loop()
+        try:
+            tenant = await loop.run_in_executor(
+                None, self.tenants.load, tenant_id, college_name, str(payload.get('kb_file', DEFAULT_KB_PATH))
+            )
+        except (OSError, ValueError) as e:
+            return 400, {'error': f"Could not load tenant: {e}"}
+        return 200, {'loaded': tenant_id, 'topics': len(tenant.index.knowledge_base)}
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive and JSON bodies"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self.write_response(writer, 400, {'error': "Bad request line"}, close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self.write_response(writer, 400, {'error': "Bad Content-Length"}, close=True)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self.write_response(writer, 413, {'error': "Body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, result = await self.route(method.upper(), path.split('?', 1)[0], body)
+                close = headers.get('connection', '').lower() == 'close'
+                await self.write_response(writer, status, result, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def write_response(self, writer, status, result, close=False):
+        if isinstance(result, str):
+            body = result.encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def sweep_sessions(self):
+        """Drop sessions idle for longer than session_ttl.
+
+        With a session store, live sessions (and their KV caches) are
+        dropped after session_idle instead: their histories are in the
+        store, which spills them to disk and expires them after session_ttl.
+        """
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_SECONDS)
+            idle = self.session_ttl if self.session_store is None else self.session_idle
+            cutoff = time.monotonic() - idle
+            for session_id, session in list(self.sessions.items()):
+                if session.last_active < cutoff and not session.lock.locked():
+                    del self.sessions[session_id]
+            if self.session_store is not None:
+                self.session_store.spill_idle(self.session_idle)
+                self.session_store.expire(self.session_ttl)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        sweeper = asyncio.create_task(self.sweep_sessions())
+        print(f"✓ {self.college_name} Support server listening on http://{host}:{port}\n")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.executor.shutdown(wait=False)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="College Support Chatbot server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--college', default="Amity University")
+    parser.add_argument('--kb-only', action='store_true', help="knowledge-base answers only; never loads torch")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default=DEFAULT_MODEL_SIZE)
+    parser.add_argument('--precision', choices=PRECISIONS, default=DEFAULT_PRECISION,
+                        help="fp32, bf16 (CPUs with native bf16) or int8 dynamic quantization")
+    parser.add_argument('--model-path',
+                        help=f"local snapshot from export_snapshot.py; no network needed (default: ${MODEL_PATH_ENV})")
+    parser.add_argument('--kb-file', default=DEFAULT_KB_PATH, help="knowledge base JSON/YAML file")
+    parser.add_argument('--no-kb-watch', action='store_true', help="do not reload the knowledge base when the file changes")
+    parser.add_argument('--metrics', action='store_true', help="serve Prometheus metrics on GET /metrics")
+    parser.add_argument('--metrics-log', help="append one JSON line of timings per message to this file ('-' for stderr)")
+    parser.add_argument('--metrics-file', help="keep Prometheus text-format metrics in this file")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent generate calls")
+    parser.add_argument('--max-pending', type=int, default=64, help="queued AI requests before answering 503")
+    parser.add_argument('--session-ttl', type=int, default=1800, help="seconds before an idle session is dropped")
+    parser.add_argument('--tenants', help="JSON file of tenants (college name and knowledge base) to serve")
+    parser.add_argument('--tenant-admin', action='store_true',
+                        help="allow POST /tenants/load and /tenants/unload (KB files next to --tenants only)")
+    parser.add_argument('--session-file', help="keep conversation histories in this file across restarts")
+    parser.add_argument('--session-memory-mb', type=float, default=DEFAULT_SESSION_MEMORY_BYTES / (1024 * 1024),
+                        help="memory for idle conversation histories before they spill to disk")
+    parser.add_argument('--session-idle', type=int, default=DEFAULT_SESSION_IDLE_SECONDS,
+                        help="seconds before an idle session's history moves to disk")
+    parser.add_argument('--batch-size', type=int, default=1, help="generate up to N pending replies together (1 disables batching)")
+    parser.add_argument('--batch-wait-ms', type=int, default=10, help="how long to collect a batch before dispatching")
+    parser.add_argument('--response-cache', action='store_true', help="reuse AI replies for repeated questions")
+    parser.add_argument('--cache-file', help="preload the response cache from, and save it to, this file")
+    parser.add_argument('--deterministic', action='store_true', help="greedy decoding so cached replies stay consistent")
+    parser.add_argument('--retrieval-threshold', type=float, default=DEFAULT_RETRIEVAL_THRESHOLD,
+                        help="minimum TF-IDF similarity for a KB answer when no keyword matches")
+    parser.add_argument('--max-history-tokens', type=int, default=DEFAULT_MAX_HISTORY_TOKENS,
+                        help="conversation tokens kept as context for the model")
+    parser.add_argument('--max-new-tokens', type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help="longest AI reply, in tokens")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="eager PyTorch, or onnx: the --model-path snapshot's ONNX export in ONNX Runtime")
+    parser.add_argument('--draft-model', choices=list(MODEL_SIZES),
+                        help="assisted decoding: this smaller DialoGPT proposes tokens the model verifies")
+    parser.add_argument('--draft-model-path',
+                        help=f"local snapshot of the draft model (default: ${DRAFT_MODEL_PATH_ENV})")
+    parser.add_argument('--inference-workers', type=int, default=0,
+                        help="generate in N worker processes sharing one copy of the model (0 = in this process)")
+    parser.add_argument('--threads-per-worker', type=int, help="torch threads per inference worker (default: CPUs / workers)")
+    parser.add_argument('--reply-deadline', type=float, default=DEFAULT_REPLY_DEADLINE,
+                        help="seconds from arrival an AI reply may take before it is cut short (0 = no limit)")
+    args = parser.parse_args()
+
+    response_cache = None
+    if args.response_cache or args.cache_file:
+        response_cache = ResponseCache()
+        if args.cache_file:
+            print(f"✓ Preloaded {response_cache.load(args.cache_file)} cached responses")
+
+    metrics = build_metrics(args.metrics_log, args.metrics_file, enabled=args.metrics)
+
+    tenants = None
+    if args.tenants:
+        tenants = TenantRegistry(os.path.dirname(os.path.abspath(args.tenants)), args.retrieval_threshold)
+        print(f"✓ Loaded {tenants.load_config(args.tenants)} tenants from {args.tenants}")
+
+    session_store = None
+    if not args.kb_only:
+        session_store = SessionStore(args.session_file, int(args.session_memory_mb * 1024 * 1024))
+        if args.session_file:
+            print(f"✓ Restored {session_store.stats()['sessions_on_disk']} sessions from {args.session_file} "
+                  f"in {session_store.open_seconds * 1000:.0f} ms")
+
+    server = ChatServer(
+        args.college,
+        max_workers=args.workers,
+        max_pending=args.max_pending,
+        session_ttl=args.session_ttl,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        response_cache=response_cache,
+        deterministic=args.deterministic,
+        retrieval_threshold=args.retrieval_threshold,
+        kb_only=args.kb_only,
+        model_size=args.model_size,
+        precision=args.precision,
+        model_path=args.model_path,
+        kb_path=args.kb_file,
+        watch_kb=not args.no_kb_watch,
+        metrics=metrics,
+        max_history_tokens=args.max_history_tokens,
+        max_new_tokens=args.max_new_tokens,
+        reply_deadline=args.reply_deadline,
+        inference_workers=args.inference_workers,
+        threads_per_worker=args.threads_per_worker,
+        session_store=session_store,
+        session_idle=args.session_idle,
+        draft_model_size=args.draft_model,
+        draft_model_path=args.draft_model_path,
+        tenants=tenants,
+        tenant_admin=args.tenant_admin,
+        backend=args.backend,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n🎓 Server stopped. 👋\n")
+    finally:
+        if args.cache_file:
+            response_cache.save(args.cache_file)
+        if session_store is not None:
+            session_store.close()
+        if metrics is not None:
+            metrics.close()
+        if server.inference_pool is not None:
+            server.inference_pool.close()
+
+
+if __name__ == "__main__":
+    main()
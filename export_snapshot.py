@@ -0,0 +1,43 @@
+"""
+Export Snapshot
+Downloads DialoGPT once and writes a self-contained local snapshot
+(safetensors weights, config and tokenizer) for offline startup, and
+optionally its ONNX export for --backend onnx
+"""
+
+import argparse
+import os
+
+from model_loader import DEFAULT_MODEL_SIZE, MODEL_PATH_ENV, MODEL_SIZES, export_onnx_snapshot, export_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a local DialoGPT snapshot")
+    parser.add_argument('--model-size', choices=list(MODEL_SIZES), default=DEFAULT_MODEL_SIZE)
+    parser.add_argument('--output', help="directory to write the snapshot to (default: models/dialogpt-<size>)")
+    parser.add_argument('--onnx', action='store_true',
+                        help="also write model.onnx for --backend onnx (reuses a snapshot already in --output)")
+    args = parser.parse_args()
+    args.output = args.output or os.path.join('models', f"dialogpt-{args.model_size}")
+
+    if args.onnx and os.path.exists(os.path.join(args.output, 'config.json')):
+        print(f"✓ Using the snapshot in {args.output}")
+    else:
+        print(f"⏳ Exporting DialoGPT-{args.model_size} to {args.output}...")
+        export_snapshot(args.output, args.model_size)
+        print(f"✓ Snapshot ready. Start with --model-path {args.output} or set {MODEL_PATH_ENV}={args.output}")
+
+    if args.onnx:
+        print("⏳ Exporting to ONNX...")
+        mismatches = export_onnx_snapshot(args.output)
+        if mismatches is None:
+            print("⚠️ onnxruntime is not installed, so the export was not checked against PyTorch")
+        elif mismatches:
+            print(f"⚠️ Greedy replies differ from PyTorch for: {', '.join(mismatches)}")
+        else:
+            print("✓ model.onnx decodes the same tokens as PyTorch (greedy)")
+        print(f"✓ Start with --backend onnx --model-path {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Fuzzy Index
+SymSpell-style deletion dictionary for typo-tolerant keyword lookup
+"""
+
+# Tokens shorter than this are never corrected: too many real words are
+# one edit away from a short keyword ("feel" -> "fees", "text" -> "test")
+MIN_FUZZY_LENGTH = 5
+
+# Tokens at least this long may be two edits away (at most one edit per
+# five letters, so "regarding" is not two edits from "reading")
+TWO_EDIT_LENGTH = 10
+
+# Tokens shorter than this are only corrected for the slips a typist makes
+# (a dropped, doubled or swapped letter); replacing or adding a letter
+# mostly turns a short word into another real word ("prime" -> "price")
+SUBSTITUTION_LENGTH = 8
+
+
+def max_distance_for(token):
+    if len(token) < MIN_FUZZY_LENGTH:
+        return 0
+    if len(token) < TWO_EDIT_LENGTH:
+        return 1
+    return 2
+
+
+def deletes(word, max_distance):
+    """All strings reachable from word by deleting up to max_distance characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for variant in frontier:
+            for i in range(len(variant)):
+                next_frontier.add(variant[:i] + variant[i + 1:])
+        variants |= next_frontier
+        frontier = next_frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps cost 1), or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def is_slip(token, word):
+    """True if token is word with one letter dropped, doubled or swapped with its neighbour"""
+    if len(token) == len(word) - 1:
+        return any(word[:i] + word[i + 1:] == token for i in range(len(word)))
+    if len(token) == len(word) + 1:
+        return any(token[:i] + token[i + 1:] == word
+                   and token[i] in (token[i - 1:i] + token[i + 1:i + 2])
+                   for i in range(len(token)))
+    if len(token) == len(word):
+        diffs = [i for i in range(len(token)) if token[i] != word[i]]
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and token[diffs[0]] == word[diffs[1]] and token[diffs[1]] == word[diffs[0]])
+    return False
+
+
+class FuzzyIndex:
+    """Maps misspelled tokens to known words in near-constant time.
+
+    Every known word is stored under each string reachable by deleting up
+    to two of its characters. A token is looked up under its own deletion
+    variants, and candidates are confirmed with an edit-distance check, so
+    lookup cost depends on the token's length and not on how many words are
+    indexed. `words` maps each word to a rank (its target, e.g. a category);
+    candidates must share the token's first letter, and if the closest
+    candidates have different ranks the token is ambiguous and not
+    corrected. Tokens in `known` are correctly spelled words and never
+    corrected.
+    """
+
+    def __init__(self, words, known=()):
+        self.ranks = dict(words)
+        self.known = frozenset(known)
+        self.variants = {}
+        for word in self.ranks:
+            for variant in deletes(word, 2):
+                self.variants.setdefault(variant, []).append(word)
+
+    def lookup(self, token):
+        """Return (distance, rank, word) of the unique best correction, or None"""
+        max_distance = max_distance_for(token)
+        if max_distance == 0 or token in self.known:
+            return None
+
+        best = None
+        seen = set()
+        for variant in deletes(token, max_distance):
+            for word in self.variants.get(variant, ()):
+                if word in seen or word[0] != token[0]:
+                    continue
+                seen.add(word)
+
+                distance = edit_distance(token, word, max_distance)
+                if distance > max_distance:
+                    continue
+                if len(token) < SUBSTITUTION_LENGTH and not is_slip(token, word):
+                    continue
+                candidate = (distance, self.ranks[word], word)
+                if best is None or distance < best[0]:
+                    best = candidate
+                    tied_ranks = {candidate[1]}
+                elif distance == best[0]:
+                    tied_ranks.add(candidate[1])
+                    best = min(best, candidate)
+        if best is None or len(tied_ranks) > 1:
+            return None
+        return best
@@ -0,0 +1,336 @@
+"""
+Inference Pool
+Runs DialoGPT's generate() in worker processes, so token generation never
+holds the front end's GIL (the Tk main loop keeps drawing) and several
+replies can be generated in parallel
+
+The model is loaded once, moved to shared memory and handed to every
+worker read-only. Prompts and generated token ids travel through
+per-worker shared-memory buffers; the pipe only carries small control
+messages. PooledModel stands in for the model object, so chat_engine's
+generate_reply and generate_replies, and with them every get_ai_response,
+work unchanged.
+"""
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from chat_engine import DEFAULT_MAX_NEW_TOKENS
+
+DEFAULT_INFERENCE_WORKERS = 2
+
+# Rows the worker buffers hold; larger batches are generated in parts
+MAX_BATCH_ROWS = 8
+
+# KV caches each worker keeps, one per recently seen conversation
+WORKER_CACHED_CONVERSATIONS = 4
+
+# Prompts starting with the same tokens go to the same worker, so the
+# conversation's KV cache is usually already there
+ROUTING_PREFIX_TOKENS = 16
+
+# How often the front end re-checks stopping criteria while no token arrives
+STOP_POLL_SECONDS = 0.02
+
+
+def worker_cpus(index, threads, workers):
+    """CPUs to pin worker `index` to, or None if there are too few to give each its own"""
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < threads * workers:
+        return None
+    return set(cpus[index * threads:(index + 1) * threads])
+
+
+class TokenSink:
+    """Streamer for the worker's generate(): copies each new token into the reply buffer and notifies the front end"""
+
+    def __init__(self, reply, conn):
+        self.reply = reply
+        self.conn = conn
+        self.count = 0
+        self.prompt_seen = False
+
+    def put(self, value):
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        self.reply[self.count] = int(value.reshape(-1)[0])
+        self.count += 1
+        self.conn.send(('token', self.count))
+
+    def end(self):
+        pass
+
+
+class WorkerCaches:
+    """KV caches of the last few conversations, matched by token prefix"""
+
+    def __init__(self, size=WORKER_CACHED_CONVERSATIONS):
+        self.size = size
+        self.entries = []
+
+    def take(self, input_ids):
+        """Remove and return a cache covering a prefix of input_ids, or None"""
+        import torch
+
+        for i, (covered, past_key_values) in enumerate(self.entries):
+            if len(covered) < input_ids.shape[-1] and torch.equal(input_ids[0, :len(covered)], covered):
+                del self.entries[i]
+                return past_key_values
+        return None
+
+    def put(self, sequence, past_key_values):
+        length = past_key_values[0][0].shape[2]
+        self.entries.insert(0, (sequence[:length].clone(), past_key_values))
+        del self.entries[self.size:]
+
+
+def worker_main(model, conn, prompt, mask, reply, stop_event, threads, cpus):
+    """Worker process: answer generate requests from the front end until told to stop"""
+    import torch
+
+    from chat_engine import StopWhen, stopping_criteria
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+    caches = WorkerCaches()
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        rows, length, use_cache, stream, max_new_tokens, pad_token_id, kwargs = request
+        try:
+            input_ids = prompt[:rows * length].view(rows, length).long()
+            attention_mask = mask[:rows * length].view(rows, length).long()
+            past_key_values = caches.take(input_ids) if use_cache else None
+            sink = TokenSink(reply, conn) if stream else None
+
+            with torch.no_grad():
+                output = model.generate(
+                    input_ids,
+                    attention_mask=attention_mask,
+                    past_key_values=past_key_values,
+                    max_new_tokens=max_new_tokens,
+                    pad_token_id=pad_token_id,
+                    use_cache=True,
+                    return_dict_in_generate=True,
+                    streamer=sink,
+                    stopping_criteria=stopping_criteria(StopWhen(stop_event.is_set)),
+                    **kwargs
+                )
+
+            new_tokens = output.sequences[:, length:]
+            reply[:new_tokens.numel()] = new_tokens.reshape(-1)
+            if use_cache:
+                caches.put(output.sequences[0], output.past_key_values)
+            conn.send(('done', new_tokens.shape[-1]))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class WorkerSlot:
+    """Front-end side of one worker: its process, pipe, buffers and a lock held per request"""
+
+    def __init__(self, process, conn, prompt, mask, reply, stop_event):
+        self.process = process
+        self.conn = conn
+        self.prompt = prompt
+        self.mask = mask
+        self.reply = reply
+        self.stop_event = stop_event
+        self.lock = threading.Lock()
+        self.pid = None
+
+
+class PooledModel:
+    """Drop-in for the model in generate_reply/generate_replies, generating in a worker.
+
+    Stopping criteria (cancellation, deadlines) are evaluated here in the
+    front end, on every token and every STOP_POLL_SECONDS while waiting,
+    and stop the worker through a shared event. The worker keeps the KV
+    cache itself, so the returned past_key_values is always None.
+    """
+
+    def __init__(self, pool, config):
+        self.pool = pool
+        self.config = config
+
+    def generate(self, input_ids, attention_mask=None, past_key_values=None,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS, pad_token_id=None, use_cache=True,
+                 return_dict_in_generate=False, streamer=None, stopping_criteria=None, **kwargs):
+        import torch
+
+        rows, length = input_ids.shape
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        if rows > MAX_BATCH_ROWS:
+            return self.generate_in_parts(input_ids, attention_mask, max_new_tokens, pad_token_id,
+                                          return_dict_in_generate, stopping_criteria, kwargs)
+        if rows * length > len(self.pool.slots[0].prompt):
+            raise ValueError(f"Prompt of {rows}x{length} tokens does not fit the worker buffers")
+        if rows * max_new_tokens > len(self.pool.slots[0].reply):
+            raise ValueError(f"max_new_tokens={max_new_tokens} is larger than the pool was started with")
+
+        slot = self.pool.acquire(input_ids)
+        in_flight = False
+        try:
+            slot.prompt[:rows * length] = input_ids.reshape(-1)
+            slot.mask[:rows * length] = attention_mask.reshape(-1)
+            slot.stop_event.clear()
+            stream = streamer is not None and rows == 1
+            slot.conn.send((rows, length, use_cache and rows == 1, stream, max_new_tokens, pad_token_id, kwargs))
+            in_flight = True
+            if stream:
+                streamer.put(input_ids)
+
+            received = 0
+            while True:
+                while not slot.conn.poll(STOP_POLL_SECONDS):
+                    self.check_stop(slot, stopping_criteria)
+                kind, value = slot.conn.recv()
+                if kind == 'token':
+                    streamer.put(slot.reply[received:value].long())
+                    received = value
+                    self.check_stop(slot, stopping_criteria)
+                elif kind == 'done':
+                    in_flight = False
+                    new_tokens = slot.reply[:rows * value].long().view(rows, value).clone()
+                    break
+                else:
+                    in_flight = False
+                    raise RuntimeError(f"Inference worker {slot.pid} failed: {value}")
+        finally:
+            # Left mid-request (the streamer raised, Ctrl+C): the worker is
+            # still generating, so stop it and read what it still sends, or
+            # the next request on this slot would receive those messages
+            if in_flight:
+                self.drain(slot)
+            slot.lock.release()
+
+        if stream:
+            streamer.end()
+        sequences = torch.cat([input_ids, new_tokens], dim=-1)
+        if return_dict_in_generate:
+            return SimpleNamespace(sequences=sequences, past_key_values=None)
+        return sequences
+
+    def generate_in_parts(self, input_ids, attention_mask, max_new_tokens, pad_token_id,
+                          return_dict_in_generate, stopping_criteria, kwargs):
+        """Generate a batch larger than the worker buffers MAX_BATCH_ROWS rows at a time"""
+        import torch
+
+        parts = [
+            self.generate(input_ids[first:first + MAX_BATCH_ROWS],
+                          attention_mask=attention_mask[first:first + MAX_BATCH_ROWS],
+                          max_new_tokens=max_new_tokens, pad_token_id=pad_token_id, use_cache=False,
+                          stopping_criteria=stopping_criteria, **kwargs)
+            for first in range(0, input_ids.shape[0], MAX_BATCH_ROWS)
+        ]
+        # Parts stop independently; pad the shorter ones as generate() pads finished rows
+        width = max(part.shape[-1] for part in parts)
+        pad = pad_token_id if pad_token_id is not None else self.config.eos_token_id
+        sequences = torch.cat([torch.nn.functional.pad(part, (0, width - part.shape[-1]), value=pad)
+                               for part in parts])
+        if return_dict_in_generate:
+            return SimpleNamespace(sequences=sequences, past_key_values=None)
+        return sequences
+
+    @staticmethod
+    def drain(slot):
+        """Stop the worker's current request and discard its remaining messages"""
+        slot.stop_event.set()
+        try:
+            while True:
+                kind, _ = slot.conn.recv()
+                if kind in ('done', 'error'):
+                    return
+        except (EOFError, OSError):
+            pass
+
+    @staticmethod
+    def check_stop(slot, stopping_criteria):
+        if not stopping_criteria or slot.stop_event.is_set():
+            return
+        if any(criterion(None, None) for criterion in stopping_criteria):
+            slot.stop_event.set()
+
+
+class InferencePool:
+    """N worker processes sharing one read-only copy of the model.
+
+    `load` runs once in this process and returns (tokenizer, model); the
+    model's weights are then moved to shared memory and every worker maps
+    the same pages (int8 models are the exception: their packed weights
+    are copied into each worker). Each worker runs `threads_per_worker`
+    torch threads, pinned to its own CPUs when there are enough of them.
+    Use `tokenizer` and `model` exactly like the ones load_model returns.
+    """
+
+    def __init__(self, load, workers=DEFAULT_INFERENCE_WORKERS, threads_per_worker=None,
+                 max_new_tokens=DEFAULT_MAX_NEW_TOKENS):
+        import torch
+        import torch.multiprocessing as mp
+
+        tokenizer, model = load()
+        model.share_memory()
+        self.tokenizer = tokenizer
+        self.model = PooledModel(self, model.config)
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+        # Spawned, not forked: the parent may already run Tk and torch threads
+        context = mp.get_context('spawn')
+        prompt_capacity = MAX_BATCH_ROWS * getattr(model.config, 'n_positions', 1024)
+        self.slots = []
+        for index in range(workers):
+            conn, worker_conn = context.Pipe()
+            prompt = torch.zeros(prompt_capacity, dtype=torch.int32).share_memory_()
+            mask = torch.zeros(prompt_capacity, dtype=torch.int32).share_memory_()
+            reply = torch.zeros(MAX_BATCH_ROWS * max_new_tokens, dtype=torch.int32).share_memory_()
+            stop_event = context.Event()
+            process = context.Process(
+                target=worker_main,
+                args=(model, worker_conn, prompt, mask, reply, stop_event, self.threads_per_worker,
+                      worker_cpus(index, self.threads_per_worker, workers)),
+                name=f"inference-{index}",
+                daemon=True,
+            )
+            process.start()
+            self.slots.append(WorkerSlot(process, conn, prompt, mask, reply, stop_event))
+
+        for slot in self.slots:
+            kind, slot.pid = slot.conn.recv()
+
+    def acquire(self, input_ids):
+        """Lock a worker for one request: the conversation's usual one if free, else any free one"""
+        rows = input_ids.shape[0]
+        preferred = self.slots[0]
+        if rows == 1:
+            prefix = tuple(input_ids[0, :ROUTING_PREFIX_TOKENS].tolist())
+            preferred = self.slots[hash(prefix) % len(self.slots)]
+        for slot in [preferred] + [slot for slot in self.slots if slot is not preferred]:
+            if slot.lock.acquire(blocking=False):
+                return slot
+        preferred.lock.acquire()
+        return preferred
+
+    def close(self, timeout=5.0):
+        """Stop every worker; requests in flight are cut short"""
+        for slot in self.slots:
+            slot.stop_event.set()
+            try:
+                slot.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + timeout
+        for slot in self.slots:
+            slot.process.join(max(0.0, deadline - time.monotonic()))
+            if slot.process.is_alive():
+                slot.process.terminate()
@@ -0,0 +1,165 @@
+"""
+Knowledge Base Matcher
+Compiles the knowledge base keywords once so lookups scale with the query, not the KB
+"""
+
+import re
+
+from fuzzy_index import FuzzyIndex
+
+WORD = re.compile(r"[a-z]+")
+
+
+class KeywordMatcher:
+    """Compiled keyword index for a knowledge base.
+
+    Single-word keywords go into a token hash index and multi-word phrases
+    into an Aho-Corasick automaton. The category returned is the same one
+    the original two-pass scan picked: the first category (in KB order)
+    with a phrase found in the query, otherwise the first category with a
+    keyword equal to one of the query's words.
+
+    Only if both miss, query words are corrected against the single-word
+    keywords with a fuzzy index (closest correction, then KB order), so
+    "hostle" or "scholarshp" still find their category. A plural or
+    singular of a keyword counts as exact. Words the knowledge base itself
+    uses (in any keyword or response) are never corrected, and neither is a
+    word whose closest keywords belong to different categories.
+    """
+
+    def __init__(self, knowledge_base, fuzzy=True):
+        self.categories = list(knowledge_base)
+        self.token_index = {}
+
+        # Automaton: goto transitions, failure links and, per state, the
+        # lowest category index of any phrase ending there
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]
+
+        for index, category in enumerate(self.categories):
+            for keyword in knowledge_base[category]['keywords']:
+                if ' ' in keyword:
+                    self._add_phrase(keyword, index)
+                elif keyword not in self.token_index:
+                    self.token_index[keyword] = index
+
+        self._build_failure_links()
+        self.fuzzy_index = None
+        if fuzzy:
+            known = set()
+            for entry in knowledge_base.values():
+                known.update(WORD.findall(' '.join(entry['keywords'])))
+                known.update(WORD.findall(entry['response'].lower()))
+            self.fuzzy_index = FuzzyIndex(self.token_index, known)
+
+    def _add_phrase(self, phrase, index):
+        """Insert a phrase into the trie"""
+        state = 0
+        for char in phrase:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.goto[state][char] = next_state
+            state = next_state
+
+        if self.output[state] is None or index < self.output[state]:
+            self.output[state] = index
+
+    def _build_failure_links(self):
+        """Breadth-first pass computing failure links and merged outputs"""
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, child in self.goto[state].items():
+                queue.append(child)
+
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+
+                inherited = self.output[self.fail[child]]
+                if inherited is not None and (self.output[child] is None or inherited < self.output[child]):
+                    self.output[child] = inherited
+
+    def _match_phrases(self, text):
+        """Lowest category index of any phrase occurring in text"""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+
+        best = None
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            found = output[state]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return best
+
+    def _match_tokens(self, text):
+        """Lowest category index of any single-word keyword in text"""
+        token_index = self.token_index
+
+        best = None
+        for word in text.split():
+            found = token_index.get(word)
+            if found is not None and (best is None or found < best):
+                best = found
+        return best
+
+    def _match_inflection(self, word):
+        """Category index of the keyword this word is the plural or singular of"""
+        if len(word) < 4:
+            return None
+        variants = [word + 's', word + 'es']
+        if word.endswith('s'):
+            variants.append(word[:-1])
+        if word.endswith('es'):
+            variants.append(word[:-2])
+
+        best = None
+        for variant in variants:
+            found = self.token_index.get(variant)
+            if found is not None and (best is None or found < best):
+                best = found
+        return best
+
+    def _match_fuzzy(self, text):
+        """Category index of the closest correction of any query word"""
+        best = None
+        for word in text.split():
+            if word in self.token_index:
+                continue
+            found = self._match_inflection(word)
+            if found is not None:
+                found = (0, found)
+            else:
+                found = self.fuzzy_index.lookup(word)
+            if found is not None and (best is None or found < best):
+                best = found
+        return None if best is None else best[1]
+
+    def match(self, user_input):
+        """Return the matching category name, or None"""
+        user_lower = user_input.lower().strip()
+
+        index = self._match_phrases(user_lower)
+        if index is None:
+            index = self._match_tokens(user_lower)
+        if index is None and self.fuzzy_index is not None:
+            index = self._match_fuzzy(user_lower)
+
+        return None if index is None else self.categories[index]
@@ -0,0 +1,166 @@
+"""
+Knowledge Base Retriever
+TF-IDF second tier for queries the keyword matcher misses
+"""
+
+import re
+from collections import Counter
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Lowest score at which 90% of the queries the tier answers are answered
+# correctly on benchmarks/data/labelled_queries.jsonl (off-topic queries
+# included); recalibrate with benchmarks/replay_kb_coverage.py after KB edits
+DEFAULT_RETRIEVAL_THRESHOLD = 0.42
+
+# Keywords describe a category more sharply than its response text
+KEYWORD_WEIGHT = 3
+
+CHAR_NGRAM_SIZES = (3, 4)
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for',
+    'from', 'get', 'have', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of',
+    'on', 'or', 'so', 'the', 'there', 'this', 'to', 'what', 'when', 'where',
+    'which', 'who', 'will', 'with', 'you', 'your',
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def extract_features(text):
+    """Content words plus their character n-grams (for partial and misspelled words)"""
+    features = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        features.append(word)
+        padded = f"<{word}>"
+        for size in CHAR_NGRAM_SIZES:
+            for start in range(len(padded) - size + 1):
+                features.append('#' + padded[start:start + size])
+    return features
+
+
+class TfidfRetriever:
+    """Sparse TF-IDF index over each category's keywords and response text.
+
+    Document rows are L2-normalised and stored column by column (CSC):
+    for every feature, the categories containing it and its weight there.
+    Scoring a query only visits the postings of the features it shares
+    with the knowledge base, so memory and lookup time grow with the
+    number of non-zero weights, not categories x vocabulary. The best
+    category is returned only if its cosine similarity reaches `threshold`.
+    """
+
+    def __init__(self, knowledge_base, threshold=DEFAULT_RETRIEVAL_THRESHOLD):
+        self.categories = list(knowledge_base)
+        self.threshold = threshold
+
+        documents = []
+        for category in self.categories:
+            data = knowledge_base[category]
+            features = extract_features(data['response'])
+            for keyword in data['keywords']:
+                features.extend(extract_features(keyword) * KEYWORD_WEIGHT)
+            documents.append(Counter(features))
+
+        self.vocabulary = {}
+        for counts in documents:
+            for feature in counts:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        # One (column, row, count) triple per non-zero entry
+        columns = np.fromiter((self.vocabulary[feature] for counts in documents for feature in counts),
+                              dtype=np.int64)
+        rows = np.repeat(np.arange(len(documents)), [len(counts) for counts in documents])
+        counts = np.fromiter((count for doc in documents for count in doc.values()), dtype=np.float32)
+
+        num_documents = len(documents)
+        document_frequency = np.bincount(columns, minlength=len(self.vocabulary))
+        self.idf = (np.log((1 + num_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        weights = self.sublinear_tf(counts) * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=num_documents))
+        weights = (weights / np.maximum(norms, 1e-12)[rows]).astype(np.float32)
+
+        order = np.argsort(columns, kind='stable')
+        self.rows = rows[order].astype(np.int32)
+        self.weights = weights[order]
+        self.column_starts = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.column_starts[1:])
+
+    @staticmethod
+    def sublinear_tf(counts):
+        return (1 + np.log(counts)).astype(np.float32)
+
+    def vectorize(self, query):
+        """Query text -> (columns, weights) of its normalised TF-IDF row over the KB vocabulary"""
+        counts = Counter(column for column in map(self.vocabulary.get, extract_features(query))
+                         if column is not None)
+        columns = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        weights = self.sublinear_tf(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        weights *= self.idf[columns]
+        norm = np.sqrt(np.dot(weights, weights))
+        return columns, weights / max(norm, 1e-12)
+
+    def score(self, query):
+        """Cosine similarity of one query to each category"""
+        return self.scores([query])[0]
+
+    def scores(self, queries):
+        """Cosine similarity of each query to each category, shape (queries, categories).
+
+        The queries are stacked into one CSR matrix and multiplied by the
+        CSC category matrix in a single sparse product: every (query,
+        feature) entry is expanded into the feature's postings and the
+        products are summed per (query, category) cell with one bincount.
+        """
+        num_categories = len(self.categories)
+        if not queries:
+            return np.zeros((0, num_categories), dtype=np.float32)
+
+        vectors = [self.vectorize(query) for query in queries]
+        query_rows = np.repeat(np.arange(len(queries)), [len(columns) for columns, _ in vectors])
+        columns = np.concatenate([columns for columns, _ in vectors])
+        query_weights = np.concatenate([weights for _, weights in vectors])
+
+        # Postings of each query entry's feature, laid end to end
+        starts = self.column_starts[columns]
+        lengths = self.column_starts[columns + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+
+        cells = np.repeat(query_rows, lengths) * num_categories + self.rows[positions]
+        products = np.repeat(query_weights, lengths) * self.weights[positions]
+        scores = np.bincount(cells, weights=products, minlength=len(queries) * num_categories)
+        return scores.reshape(len(queries), num_categories).astype(np.float32)
+
+    def match_many(self, queries):
+        """Best category (or None) and its score for each query, in one batch"""
+        if not queries:
+            return []
+
+        scores = self.scores(queries)
+        best = scores.argmax(axis=1)
+        results = []
+        for row, column in enumerate(best):
+            score = float(scores[row, column])
+            category = self.categories[column] if score >= self.threshold else None
+            results.append((category, score))
+        return results
+
+    def nearest(self, user_input):
+        """Best category and its score, whatever the threshold"""
+        scores = self.score(user_input)
+        column = int(scores.argmax())
+        return self.categories[column], float(scores[column])
+
+    def match(self, user_input):
+        """Return the best category above the threshold, or None"""
+        return self.match_many([user_input])[0][0]
@@ -0,0 +1,283 @@
+"""
+Knowledge Base Store
+Loads the knowledge base from a JSON/YAML file, caches its compiled index in a
+binary artifact and hot-swaps it when the file changes
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+
+from kb_matcher import KeywordMatcher
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD, NUMPY_AVAILABLE, TfidfRetriever
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+
+DEFAULT_KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')
+
+# Responses may mention the college by this placeholder
+COLLEGE_PLACEHOLDER = '{college_name}'
+
+# Artifact of an index whose responses keep the placeholder (see tenants.py)
+TEMPLATE_INDEX_SUFFIX = '.template.idx'
+
+# Artifact layout: magic, 32-byte digest of (source, college, format), then
+# the zlib-compressed pickle of the index. Bump the version whenever the
+# matcher or retriever internals change so stale artifacts get rebuilt.
+INDEX_MAGIC = b'CBKBIDX1'
+INDEX_FORMAT_VERSION = 4
+INDEX_SUFFIX = '.idx'
+
+DEFAULT_WATCH_INTERVAL = 1.0
+
+# When the model runs out of time, the nearest answer may score this share
+# of the retrieval threshold; below that the help menu is shown instead
+NEAREST_THRESHOLD_RATIO = 0.5
+HELP_CATEGORY = 'help'
+HELP_MENU_FALLBACK = "I'm here to help with college queries! Ask about admissions, courses, facilities, placements, or type 'help'."
+
+
+def index_path_for(kb_path, templates=False):
+    """Default artifact path: the KB path with an .idx (or .template.idx) extension"""
+    return os.path.splitext(kb_path)[0] + (TEMPLATE_INDEX_SUFFIX if templates else INDEX_SUFFIX)
+
+
+def source_digest(raw, college_name):
+    """Key identifying the index built from these file bytes"""
+    digest = hashlib.sha256(raw)
+    digest.update(b'\0' if college_name is None else college_name.encode('utf-8'))
+    digest.update(str(INDEX_FORMAT_VERSION).encode('ascii'))
+    return digest.digest()
+
+
+def parse_knowledge_base(raw, path, college_name):
+    """File bytes -> {category: {'keywords': [...], 'response': str}}
+
+    With college_name None the responses keep their placeholder.
+    """
+    if path.endswith(('.yaml', '.yml')):
+        if not YAML_AVAILABLE:
+            raise ValueError(f"{path}: reading YAML needs PyYAML (pip install pyyaml)")
+        data = yaml.safe_load(raw)
+    else:
+        data = json.loads(raw)
+
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"{path}: expected a mapping of categories")
+
+    knowledge_base = {}
+    for category, entry in data.items():
+        keywords = entry.get('keywords') if isinstance(entry, dict) else None
+        response = entry.get('response') if isinstance(entry, dict) else None
+        if not isinstance(keywords, list) or not isinstance(response, str):
+            raise ValueError(f"{path}: category '{category}' needs a 'keywords' list and a 'response' string")
+        knowledge_base[str(category)] = {
+            'keywords': [str(keyword).lower().strip() for keyword in keywords],
+            'response': response if college_name is None else response.replace(COLLEGE_PLACEHOLDER, college_name),
+        }
+    return knowledge_base
+
+
+class KnowledgeBaseIndex:
+    """One version of the knowledge base together with its compiled matchers.
+
+    It is never changed after it is built: a reload builds a new index and
+    swaps the reference, so a lookup that already picked up the old one
+    finishes against the old keywords and the old responses.
+    """
+
+    def __init__(self, knowledge_base, retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD):
+        self.knowledge_base = knowledge_base
+        self.matcher = KeywordMatcher(knowledge_base)
+        self.retriever = None
+        if NUMPY_AVAILABLE:
+            self.retriever = TfidfRetriever(knowledge_base, retrieval_threshold)
+
+        # Filled in by load_index, not stored in the artifact
+        self.index_bytes = 0
+        self.load_seconds = 0.0
+        self.from_artifact = False
+
+    def __getstate__(self):
+        return {
+            'knowledge_base': self.knowledge_base,
+            'matcher': self.matcher,
+            'retriever': self.retriever,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index_bytes = 0
+        self.load_seconds = 0.0
+        self.from_artifact = True
+
+    def find_category(self, user_input):
+        """Compiled keyword index, then TF-IDF retrieval"""
+        category = self.matcher.match(user_input)
+        if category is None and self.retriever is not None:
+            category = self.retriever.match(user_input)
+        return category
+
+    def find_categories(self, queries):
+        """find_category for many queries: keyword matcher per query, then one sparse TF-IDF product over all the misses"""
+        categories = [self.matcher.match(query) for query in queries]
+        if self.retriever is not None:
+            misses = [row for row, category in enumerate(categories) if category is None]
+            matches = self.retriever.match_many([queries[row] for row in misses])
+            for row, (category, score) in zip(misses, matches):
+                categories[row] = category
+        return categories
+
+    def find_answer(self, user_input):
+        category = self.find_category(user_input)
+        if category is None:
+            return None
+        return self.knowledge_base[category]['response']
+
+    def nearest_answer(self, user_input):
+        """Answer for a query the model ran out of time on: a looser TF-IDF match, else the help menu"""
+        if self.retriever is not None:
+            category, score = self.retriever.nearest(user_input)
+            if score >= self.retriever.threshold * NEAREST_THRESHOLD_RATIO:
+                return self.knowledge_base[category]['response']
+        help_entry = self.knowledge_base.get(HELP_CATEGORY)
+        return help_entry['response'] if help_entry else HELP_MENU_FALLBACK
+
+
+def write_index(index, digest, index_path):
+    """Write the artifact next to the KB; replaced atomically so readers never see half a file.
+
+    os.devnull means no artifact and writes nothing; any other target that
+    exists but is not a regular file (a device, a FIFO) is refused rather
+    than replaced.
+    """
+    if index_path == os.devnull:
+        return 0
+    if os.path.lexists(index_path) and not os.path.isfile(index_path):
+        raise OSError(f"{index_path} is not a regular file")
+    payload = zlib.compress(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+    temp_path = f"{index_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(digest)
+        f.write(payload)
+    os.replace(temp_path, index_path)
+    return len(INDEX_MAGIC) + len(digest) + len(payload)
+
+
+def read_index(digest, index_path):
+    """Index from the artifact, or None if it is missing or was built from other sources"""
+    if not os.path.isfile(index_path):
+        return None
+    try:
+        with open(index_path, 'rb') as f:
+            header = f.read(len(INDEX_MAGIC) + len(digest))
+            if header != INDEX_MAGIC + digest:
+                return None
+            payload = f.read()
+    except OSError:
+        return None
+    index = pickle.loads(zlib.decompress(payload))
+    index.index_bytes = len(header) + len(payload)
+    return index
+
+
+def load_index(kb_path=DEFAULT_KB_PATH, college_name="Amity University",
+               retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD, index_path=None, rebuild=False):
+    """Return the KnowledgeBaseIndex for kb_path.
+
+    The compiled artifact is used when it was built from the current file
+    contents; otherwise the index is compiled and the artifact rewritten.
+    The artifact is a local build product, so only load ones you built.
+    With college_name None the responses are left as templates.
+    """
+    start = time.perf_counter()
+    index_path = index_path or index_path_for(kb_path, templates=college_name is None)
+
+    with open(kb_path, 'rb') as f:
+        raw = f.read()
+    digest = source_digest(raw, college_name)
+
+    index = None if rebuild else read_index(digest, index_path)
+    if index is None:
+        index = KnowledgeBaseIndex(parse_knowledge_base(raw, kb_path, college_name), retrieval_threshold)
+        try:
+            index.index_bytes = write_index(index, digest, index_path)
+        except OSError as e:
+            print(f"⚠️ Could not write knowledge base index {index_path}: {e}")
+
+    # The threshold is a runtime setting, not part of the compiled index
+    if index.retriever is not None:
+        index.retriever.threshold = retrieval_threshold
+    index.load_seconds = time.perf_counter() - start
+    return index
+
+
+class KnowledgeBaseWatcher:
+    """Polls the knowledge base file and hands each new index to on_reload.
+
+    The new index is compiled on the watcher thread and the caller only
+    swaps one reference, so lookups never wait for a rebuild and the
+    loaded model is left alone. A file that fails to parse (for example
+    mid-save) keeps the current index and is retried on the next change.
+    """
+
+    def __init__(self, kb_path, college_name, retrieval_threshold, on_reload,
+                 interval=DEFAULT_WATCH_INTERVAL, index_path=None, on_error=None):
+        self.kb_path = kb_path
+        self.college_name = college_name
+        self.retrieval_threshold = retrieval_threshold
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.interval = interval
+        self.index_path = index_path
+        self.signature = self.file_signature()
+        self.reloads = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.kb_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self):
+        """Reload if the file changed since the last check; True if a new index was published"""
+        signature = self.file_signature()
+        if signature is None or signature == self.signature:
+            return False
+        self.signature = signature
+
+        try:
+            index = load_index(self.kb_path, self.college_name, self.retrieval_threshold, self.index_path)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+            return False
+
+        self.reloads += 1
+        self.on_reload(index)
+        return True
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="kb-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,276 @@
+"""
+Metrics
+Per-turn timing spans and counters for the message path, exported through
+pluggable sinks (JSON log lines, Prometheus text format)
+
+Nothing here runs unless a Metrics object is created: the entry points keep
+`metrics = None` by default and then skip instrumentation entirely.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stage timings chat_engine leaves on conversation.last_timing
+ENGINE_STAGES = ('encode', 'generate', 'decode')
+
+DEFAULT_PROMETHEUS_INTERVAL = 1.0
+
+
+class Turn:
+    """Spans and facts for one message, folded into Metrics by finish().
+
+    A turn belongs to one message, so the server can hand it from the
+    event loop to an executor thread without any locking.
+    """
+
+    def __init__(self, metrics, entry_point):
+        self.metrics = metrics
+        self.entry_point = entry_point
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.source = None
+        self.category = None
+        self.new_tokens = 0
+        self.history_tokens = None
+        self.deadline_hit = False
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def set_category(self, category):
+        """Knowledge base outcome; a miss counts as a fallback until the model answers"""
+        self.category = category
+        self.source = 'kb' if category is not None else 'fallback'
+
+    def add_generation(self, conversation):
+        """Copy the engine's stage timings and token counts for this turn"""
+        timing = conversation.last_timing or {}
+        self.stages['get_ai_response'] = timing.get('total_latency', 0.0)
+        for stage in ENGINE_STAGES:
+            if timing.get(stage) is not None:
+                self.stages[stage] = timing[stage]
+        self.new_tokens = timing.get('new_tokens', 0)
+        self.source = 'cache' if timing.get('cached') else 'ai'
+        self.deadline_hit = bool(timing.get('deadline_hit'))
+        if conversation.chat_history_ids is not None:
+            self.history_tokens = conversation.chat_history_ids.shape[-1]
+
+    def tokens_per_second(self):
+        generate = self.stages.get('generate')
+        return self.new_tokens / generate if generate else None
+
+    def finish(self):
+        self.stages['total'] = time.perf_counter() - self.started
+        self.metrics.record(self)
+
+
+class Metrics:
+    """Counters and stage histograms aggregated over all turns"""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.lock = threading.Lock()
+        self.turns = Counter()
+        self.kb_hits = Counter()
+        self.deadline_hits = Counter()
+        self.stage_buckets = {}
+        self.stage_sums = Counter()
+        self.stage_counts = Counter()
+        self.generated_tokens = 0
+        self.last_tokens_per_second = None
+        self.last_history_tokens = None
+
+    def start_turn(self, entry_point):
+        return Turn(self, entry_point)
+
+    def fallback_rate(self):
+        """Share of turns the knowledge base could not answer"""
+        total = sum(self.turns.values())
+        if not total:
+            return 0.0
+        kb = sum(count for (_, source), count in self.turns.items() if source == 'kb')
+        return 1 - kb / total
+
+    def record(self, turn):
+        tokens_per_second = turn.tokens_per_second()
+        with self.lock:
+            self.turns[(turn.entry_point, turn.source)] += 1
+            if turn.category is not None:
+                self.kb_hits[turn.category] += 1
+            if turn.deadline_hit:
+                self.deadline_hits[turn.entry_point] += 1
+            for stage, seconds in turn.stages.items():
+                buckets = self.stage_buckets.setdefault(stage, [0] * len(STAGE_BUCKETS))
+                for i, bound in enumerate(STAGE_BUCKETS):
+                    if seconds <= bound:
+                        buckets[i] += 1
+                self.stage_sums[stage] += seconds
+                self.stage_counts[stage] += 1
+            self.generated_tokens += turn.new_tokens
+            if tokens_per_second is not None:
+                self.last_tokens_per_second = tokens_per_second
+            if turn.history_tokens is not None:
+                self.last_history_tokens = turn.history_tokens
+
+        if not self.sinks:
+            return
+        event = {
+            'time': time.time(),
+            'entry_point': turn.entry_point,
+            'source': turn.source,
+            'category': turn.category,
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in turn.stages.items()},
+            'new_tokens': turn.new_tokens,
+            'tokens_per_second': tokens_per_second,
+            'history_tokens': turn.history_tokens,
+            'deadline_hit': turn.deadline_hit,
+        }
+        for sink in self.sinks:
+            sink.emit(event, self)
+
+    def close(self):
+        """Flush and close every sink"""
+        for sink in self.sinks:
+            sink.close(self)
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            lines.append("# HELP chatbot_turns_total Messages answered, by entry point and source (kb, ai, cache, fallback).")
+            lines.append("# TYPE chatbot_turns_total counter")
+            for (entry_point, source), count in sorted(self.turns.items(), key=str):
+                lines.append(f'chatbot_turns_total{{entry_point="{escape_label(entry_point)}",'
+                             f'source="{source}"}} {count}')
+
+            lines.append("# HELP chatbot_kb_hits_total Knowledge base answers, by category.")
+            lines.append("# TYPE chatbot_kb_hits_total counter")
+            for category, count in sorted(self.kb_hits.items()):
+                lines.append(f'chatbot_kb_hits_total{{category="{escape_label(category)}"}} {count}')
+
+            lines.append("# HELP chatbot_deadline_hits_total Model replies cut short by the reply deadline, by entry point.")
+            lines.append("# TYPE chatbot_deadline_hits_total counter")
+            for entry_point, count in sorted(self.deadline_hits.items()):
+                lines.append(f'chatbot_deadline_hits_total{{entry_point="{escape_label(entry_point)}"}} {count}')
+
+            lines.append("# HELP chatbot_fallback_ratio Share of messages the knowledge base could not answer.")
+            lines.append("# TYPE chatbot_fallback_ratio gauge")
+            lines.append(f"chatbot_fallback_ratio {self.fallback_rate():.6f}")
+
+            lines.append("# HELP chatbot_generated_tokens_total Tokens generated by the model.")
+            lines.append("# TYPE chatbot_generated_tokens_total counter")
+            lines.append(f"chatbot_generated_tokens_total {self.generated_tokens}")
+
+            if self.last_tokens_per_second is not None:
+                lines.append("# HELP chatbot_tokens_per_second Generation speed of the latest model reply.")
+                lines.append("# TYPE chatbot_tokens_per_second gauge")
+                lines.append(f"chatbot_tokens_per_second {self.last_tokens_per_second:.3f}")
+
+            if self.last_history_tokens is not None:
+                lines.append("# HELP chatbot_history_tokens Conversation history length after the latest model reply.")
+                lines.append("# TYPE chatbot_history_tokens gauge")
+                lines.append(f"chatbot_history_tokens {self.last_history_tokens}")
+
+            lines.append("# HELP chatbot_stage_seconds Time spent in each stage of the message path.")
+            lines.append("# TYPE chatbot_stage_seconds histogram")
+            for stage in sorted(self.stage_buckets):
+                for bound, count in zip(STAGE_BUCKETS, self.stage_buckets[stage]):
+                    lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {self.stage_counts[stage]}')
+                lines.append(f'chatbot_stage_seconds_sum{{stage="{stage}"}} {self.stage_sums[stage]:.6f}')
+                lines.append(f'chatbot_stage_seconds_count{{stage="{stage}"}} {self.stage_counts[stage]}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class JsonLogSink:
+    """One JSON object per turn, appended to a file ('-' for stderr)"""
+
+    def __init__(self, path):
+        self.stream = sys.stderr if path == '-' else open(path, 'a', encoding='utf-8', buffering=1)
+        self.lock = threading.Lock()
+
+    def emit(self, event, metrics):
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.stream.write(line)
+
+    def close(self, metrics):
+        if self.stream is not sys.stderr:
+            self.stream.close()
+
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text file (e.g. for node_exporter's textfile collector).
+
+    The file is replaced atomically at most once per `interval` seconds.
+    A turn that arrives sooner schedules one catch-up write for the end of
+    the interval, so the file always ends up showing the last turn.
+    """
+
+    def __init__(self, path, interval=DEFAULT_PROMETHEUS_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.last_write = 0.0
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def emit(self, event, metrics):
+        now = time.monotonic()
+        with self.lock:
+            wait = self.last_write + self.interval - now
+            if wait <= 0:
+                self.last_write = now
+                self.write(metrics)
+            elif self.pending is None:
+                self.pending = threading.Timer(wait, self.flush, args=(metrics,))
+                self.pending.daemon = True
+                self.pending.start()
+
+    def flush(self, metrics):
+        """Catch-up write for turns throttled since the last one"""
+        with self.lock:
+            self.pending = None
+            self.last_write = time.monotonic()
+            self.write(metrics)
+
+    def write(self, metrics):
+        temp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(metrics.prometheus_text())
+        os.replace(temp_path, self.path)
+
+    def close(self, metrics):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.cancel()
+                self.pending = None
+            self.write(metrics)
+
+
+def build_metrics(log_path=None, prometheus_path=None, enabled=False):
+    """Metrics with the sinks asked for on the command line, or None if none were"""
+    sinks = []
+    if log_path:
+        sinks.append(JsonLogSink(log_path))
+    if prometheus_path:
+        sinks.append(PrometheusFileSink(prometheus_path))
+    if not sinks and not enabled:
+        return None
+    return Metrics(sinks)
@@ -0,0 +1,272 @@
+"""
+Model Loader
+Loads DialoGPT in a selectable size and CPU inference precision, from the
+hub cache or from a local snapshot whose weights are memory-mapped
+"""
+
+import json
+import os
+import struct
+
+MODEL_SIZES = {
+    'small': "microsoft/DialoGPT-small",
+    'medium': "microsoft/DialoGPT-medium",
+    'large': "microsoft/DialoGPT-large",
+}
+
+# fp32: full precision (default)
+# bf16: bfloat16 weights and activations, only on CPUs with native bf16 support
+# int8: dynamic int8 quantization of every linear layer
+PRECISIONS = ('fp32', 'bf16', 'int8')
+
+# What runs the forward pass under generate():
+# eager: the PyTorch model (default)
+# onnx: the snapshot's model.onnx export in ONNX Runtime (see onnx_backend)
+BACKENDS = ('eager', 'onnx')
+
+DEFAULT_MODEL_SIZE = 'medium'
+DEFAULT_PRECISION = 'fp32'
+DEFAULT_BACKEND = 'eager'
+
+# Snapshot directory used when --model-path is not given
+MODEL_PATH_ENV = 'CHATBOT_MODEL_PATH'
+
+# Same for the assisted decoding draft model and --draft-model-path
+DRAFT_MODEL_PATH_ENV = 'CHATBOT_DRAFT_MODEL_PATH'
+
+SAFETENSORS_FILE = 'model.safetensors'
+SAFETENSORS_INDEX_FILE = 'model.safetensors.index.json'
+
+SAFETENSORS_DTYPES = {
+    'F64': 'float64',
+    'F32': 'float32',
+    'F16': 'float16',
+    'BF16': 'bfloat16',
+    'I64': 'int64',
+    'I32': 'int32',
+    'I16': 'int16',
+    'I8': 'int8',
+    'U8': 'uint8',
+    'BOOL': 'bool',
+}
+
+
+def cpu_supports_bf16():
+    """True if the CPU has native bf16 matmul (AVX512-BF16 or AMX)"""
+    import torch
+
+    checks = ('_is_avx512_bf16_supported', '_is_amx_tile_supported')
+    return any(getattr(torch.cpu, name, lambda: False)() for name in checks)
+
+
+def conv1d_to_linear(model):
+    """Swap GPT-2's Conv1D projections for equivalent nn.Linear layers.
+
+    GPT-2 stores its attention and MLP weights in transformers' Conv1D
+    (a transposed Linear), which dynamic quantization does not recognise.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if not isinstance(child, Conv1D):
+                continue
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(parent, name, linear)
+    return model
+
+
+def export_snapshot(output_dir, model_size=DEFAULT_MODEL_SIZE, model_name=None):
+    """Write a self-contained snapshot (safetensors weights, config, tokenizer) to output_dir"""
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    model_name = model_name or MODEL_SIZES[model_size]
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(model_name, low_cpu_mem_usage=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def export_onnx_snapshot(model_path):
+    """Add model.onnx to a snapshot and check it greedy-decodes the same tokens as PyTorch.
+
+    Returns the test prompts whose token ids differ (empty when the export
+    matches), or None when onnxruntime is not installed to check.
+    """
+    from transformers import AutoTokenizer
+
+    from onnx_backend import ONNXRUNTIME_AVAILABLE, export_onnx, greedy_parity, load_onnx_model
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    tokenizer.pad_token = tokenizer.eos_token
+    model = load_snapshot_model(model_path)
+    export_onnx(model, model_path)
+    if not ONNXRUNTIME_AVAILABLE:
+        return None
+    return greedy_parity(model, load_onnx_model(model_path), tokenizer)
+
+
+def mmap_safetensors(path):
+    """Map a .safetensors file and return its tensors as views of the mapping.
+
+    The file is mapped copy-on-write and never written, so every process
+    loading the same snapshot shares one set of page-cache pages for the
+    weights instead of holding a private copy.
+    """
+    import torch
+
+    with open(path, 'rb') as f:
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size))
+    file_size = os.path.getsize(path)
+
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=file_size)
+    data = torch.empty(0, dtype=torch.uint8).set_(storage)
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        begin, end = info['data_offsets']
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info['dtype']])
+        raw = data[data_start + begin:data_start + end]
+        tensors[name] = raw.view(dtype).reshape(info['shape'])
+    return tensors
+
+
+def load_snapshot_model(model_path):
+    """Build the model from a local snapshot with memory-mapped weights"""
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM
+    from transformers.modeling_utils import no_init_weights
+
+    index_path = os.path.join(model_path, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            shard_files = sorted(set(json.load(f)['weight_map'].values()))
+    else:
+        shard_files = [SAFETENSORS_FILE]
+
+    state_dict = {}
+    for shard_file in shard_files:
+        state_dict.update(mmap_safetensors(os.path.join(model_path, shard_file)))
+
+    # Parameters are allocated but never initialised or touched, then
+    # replaced by the mapped tensors, so they never become resident
+    config = AutoConfig.from_pretrained(model_path, local_files_only=True)
+    with no_init_weights():
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=torch.float32)
+
+    prefix = model.base_model_prefix
+    if not any(key.startswith(prefix + '.') for key in state_dict) and hasattr(model, prefix):
+        state_dict = {f"{prefix}.{key}": value for key, value in state_dict.items()}
+
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    tied_keys = model._tied_weights_keys or []
+    missing = [key for key in missing if key not in tied_keys]
+    if missing or unexpected:
+        raise ValueError(f"Snapshot does not match {config.model_type}: missing {missing}, unexpected {unexpected}")
+
+    model.eval()
+    return model
+
+
+def load_model(model_size=DEFAULT_MODEL_SIZE, precision=DEFAULT_PRECISION, model_name=None, model_path=None,
+               path_env=MODEL_PATH_ENV, backend=DEFAULT_BACKEND):
+    """Return (tokenizer, model) ready for generation.
+
+    `model_name` overrides the hub id picked by `model_size`. With a
+    `model_path` (or CHATBOT_MODEL_PATH) the model comes from a snapshot
+    written by export_snapshot, with no network access and memory-mapped
+    weights. Asking for bf16 on a CPU without native support falls back to
+    fp32 with a warning, since emulated bf16 is slower than fp32.
+
+    The onnx backend needs a snapshot exported with --onnx; the returned
+    model generates exactly like the eager one, in fp32.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    model_path = model_path or os.environ.get(path_env)
+
+    if model_size not in MODEL_SIZES:
+        raise ValueError(f"Unknown model size '{model_size}', expected one of {', '.join(MODEL_SIZES)}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+    if backend == 'onnx':
+        return load_onnx_snapshot(model_path, precision)
+
+    if precision == 'bf16' and not cpu_supports_bf16():
+        print("⚠️ This CPU has no native bf16 support, using fp32 instead")
+        precision = 'fp32'
+
+    if model_path:
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        model = load_snapshot_model(model_path)
+        # Converting copies the weights, so only fp32 keeps the shared mapping
+        if precision == 'bf16':
+            model = model.to(torch.bfloat16)
+    else:
+        model_name = model_name or MODEL_SIZES[model_size]
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            low_cpu_mem_usage=True,
+            torch_dtype=torch.bfloat16 if precision == 'bf16' else torch.float32,
+        )
+        model.eval()
+
+    if precision == 'int8':
+        model = torch.ao.quantization.quantize_dynamic(
+            conv1d_to_linear(model), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    tokenizer.pad_token = tokenizer.eos_token
+    model.config.pad_token_id = tokenizer.eos_token_id
+
+    return tokenizer, model
+
+
+def load_onnx_snapshot(model_path, precision=DEFAULT_PRECISION):
+    """(tokenizer, model) for the onnx backend, from a snapshot's model.onnx"""
+    from transformers import AutoTokenizer
+
+    from onnx_backend import ONNXRUNTIME_AVAILABLE, load_onnx_model
+
+    if not model_path:
+        raise ValueError(f"The onnx backend needs --model-path or {MODEL_PATH_ENV} (a snapshot exported with --onnx)")
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ValueError("The onnx backend needs onnxruntime (pip install onnxruntime)")
+    if precision != 'fp32':
+        print(f"⚠️ The onnx backend runs the fp32 export, ignoring precision {precision}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    model = load_onnx_model(model_path)
+    tokenizer.pad_token = tokenizer.eos_token
+    model.config.pad_token_id = tokenizer.eos_token_id
+    return tokenizer, model
+
+
+def load_draft_model(model_size, precision=DEFAULT_PRECISION, model_path=None, vocab_size=None):
+    """Return the draft model for assisted decoding.
+
+    It is loaded like the main model, but from --draft-model-path or
+    CHATBOT_DRAFT_MODEL_PATH. Assisted decoding compares token ids, so a
+    draft whose vocabulary differs from `vocab_size` is refused.
+    """
+    _, model = load_model(model_size, precision, model_path=model_path, path_env=DRAFT_MODEL_PATH_ENV)
+    if vocab_size is not None and model.config.vocab_size != vocab_size:
+        raise ValueError(f"Draft model vocabulary ({model.config.vocab_size}) does not match the model's ({vocab_size})")
+    return model
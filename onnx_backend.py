@@ -0,0 +1,186 @@
+"""
+ONNX Backend
+DialoGPT exported to ONNX with past key/value inputs and outputs, and a
+model object that runs it in ONNX Runtime on CPU
+
+OnnxCausalLM keeps transformers' generate() loop (sampling settings,
+streamer, stopping criteria, KV cache reuse) and only swaps the eager
+forward pass, which dispatches every layer's ops from Python, for one
+call into the exported graph. chat_engine uses it unchanged.
+"""
+
+import importlib.util
+import inspect
+import os
+
+import torch
+from transformers import GPT2LMHeadModel, GPT2PreTrainedModel
+from transformers.modeling_outputs import CausalLMOutputWithPast
+
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+
+# Written next to the snapshot's config and tokenizer
+ONNX_FILE = 'model.onnx'
+
+ONNX_OPSET = 17
+
+# Prompts checked by greedy_parity after an export
+PARITY_PROMPTS = ("What are the hostel fees?", "Tell me about placements", "hello there")
+
+
+def past_names(n_layer, prefix):
+    return [f"{prefix}.{layer}.{kind}" for layer in range(n_layer) for kind in ('key', 'value')]
+
+
+class PastKeyValuesWrapper(torch.nn.Module):
+    """Flat-argument forward for export: ids, mask, positions and one tensor per past key/value"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, position_ids, *past):
+        past_key_values = tuple(zip(past[0::2], past[1::2]))
+        output = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids,
+                            past_key_values=past_key_values, use_cache=True, return_dict=True)
+        return (output.logits,) + tuple(tensor for layer in output.past_key_values for tensor in layer)
+
+
+def export_onnx(model, output_dir, opset=ONNX_OPSET):
+    """Write the fp32 model to output_dir/model.onnx; returns the file's path.
+
+    Sequence and past lengths are dynamic axes, so one graph serves the
+    prompt (empty past) and every decoding step after it.
+    """
+    config = model.config
+    head_dim = config.n_embd // config.n_head
+    past = tuple(torch.zeros(1, config.n_head, 2, head_dim) for _ in range(2 * config.n_layer))
+    input_ids = torch.ones(1, 3, dtype=torch.long)
+    attention_mask = torch.ones(1, 5, dtype=torch.long)
+    position_ids = torch.arange(2, 5, dtype=torch.long).unsqueeze(0)
+
+    past_inputs = past_names(config.n_layer, 'past')
+    present_outputs = past_names(config.n_layer, 'present')
+    dynamic_axes = {
+        'input_ids': {0: 'batch', 1: 'sequence'},
+        'attention_mask': {0: 'batch', 1: 'total_sequence'},
+        'position_ids': {0: 'batch', 1: 'sequence'},
+        'logits': {0: 'batch', 1: 'sequence'},
+    }
+    dynamic_axes.update({name: {0: 'batch', 2: 'past_sequence'} for name in past_inputs})
+    dynamic_axes.update({name: {0: 'batch', 2: 'total_sequence'} for name in present_outputs})
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, ONNX_FILE)
+    # The exporter puts the wrapper back in the mode it found it, children
+    # included, so it has to start in eval mode too
+    wrapper = PastKeyValuesWrapper(model.float().eval()).eval()
+    # torch 2.9 made the dynamo exporter the default; releases before 2.5
+    # (such as the pinned 2.1) only have the TorchScript one and no switch
+    options = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        options['dynamo'] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (input_ids, attention_mask, position_ids) + past,
+            path,
+            input_names=['input_ids', 'attention_mask', 'position_ids'] + past_inputs,
+            output_names=['logits'] + present_outputs,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **options
+        )
+    return path
+
+
+class OnnxCausalLM(GPT2PreTrainedModel):
+    """GPT-2 whose forward pass runs an ONNX Runtime session.
+
+    It has no parameters of its own; past_key_values are the usual tuple
+    of (key, value) tensors per layer, so conversations keep their KV
+    cache between turns exactly as with the eager model.
+    """
+
+    prepare_inputs_for_generation = GPT2LMHeadModel.prepare_inputs_for_generation
+    _reorder_cache = staticmethod(GPT2LMHeadModel._reorder_cache)
+
+    def __init__(self, config, session):
+        super().__init__(config)
+        self.session = session
+        self.past_inputs = past_names(config.n_layer, 'past')
+
+    # With no parameters to read them from, generate() is told directly
+    @property
+    def device(self):
+        return torch.device('cpu')
+
+    @property
+    def dtype(self):
+        return torch.float32
+
+    def get_output_embeddings(self):
+        return None
+
+    def forward(self, input_ids=None, past_key_values=None, attention_mask=None, position_ids=None,
+                use_cache=None, return_dict=None, **kwargs):
+        config = self.config
+        batch, length = input_ids.shape
+        if past_key_values is None:
+            empty = torch.zeros(batch, config.n_head, 0, config.n_embd // config.n_head)
+            past_key_values = ((empty, empty),) * config.n_layer
+        past_length = past_key_values[0][0].shape[2]
+        if attention_mask is None:
+            attention_mask = torch.ones(batch, past_length + length, dtype=torch.long)
+        if position_ids is None:
+            position_ids = torch.arange(past_length, past_length + length, dtype=torch.long).expand(batch, length)
+
+        feeds = {
+            'input_ids': input_ids.numpy(),
+            'attention_mask': attention_mask.long().numpy(),
+            'position_ids': position_ids.contiguous().numpy(),
+        }
+        for name, tensor in zip(self.past_inputs, (t for layer in past_key_values for t in layer)):
+            feeds[name] = tensor.contiguous().numpy()
+        outputs = [torch.from_numpy(array) for array in self.session.run(None, feeds)]
+
+        return CausalLMOutputWithPast(
+            logits=outputs[0],
+            past_key_values=tuple(zip(outputs[1::2], outputs[2::2])),
+        )
+
+
+def load_onnx_model(model_path, threads=None):
+    """OnnxCausalLM for the model.onnx export in a snapshot directory"""
+    import onnxruntime
+    from transformers import AutoConfig
+
+    path = os.path.join(model_path, ONNX_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {ONNX_FILE} in {model_path}; export it with export_snapshot.py --onnx")
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads or torch.get_num_threads()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    config = AutoConfig.from_pretrained(model_path, local_files_only=True)
+    return OnnxCausalLM(config, session).eval()
+
+
+def greedy_parity(reference, candidate, tokenizer, prompts=PARITY_PROMPTS, max_new_tokens=32):
+    """Greedy-decode each prompt with both models; returns the prompts whose token ids differ"""
+    from chat_engine import Conversation, generate_reply
+
+    mismatches = []
+    for prompt in prompts:
+        sequences = []
+        for model in (reference, candidate):
+            conversation = Conversation()
+            # Two turns, so the second reuses the first's KV cache
+            generate_reply(model, tokenizer, conversation, prompt, max_new_tokens=max_new_tokens, deterministic=True)
+            generate_reply(model, tokenizer, conversation, prompt, max_new_tokens=max_new_tokens, deterministic=True)
+            sequences.append(conversation.chat_history_ids[0].tolist())
+        if sequences[0] != sequences[1]:
+            mismatches.append(prompt)
+    return mismatches
@@ -0,0 +1,158 @@
+"""
+Response Cache
+LRU cache of AI fallback replies keyed on the model, the decoding mode,
+the conversation history and normalized query text
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_query(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return ' '.join(text.split())
+
+
+def history_hash(history_ids):
+    """Stable digest of a history tensor, or '' for a fresh conversation"""
+    if history_ids is None:
+        return ''
+    ids = array('q', history_ids[0].tolist())
+    return hashlib.sha1(ids.tobytes()).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL and an approximate memory limit.
+
+    Entries are keyed on (model, mode, history hash, normalized query), so
+    a reply is only reused by the model and decoding mode (greedy or
+    sampled) that produced it, for a fresh conversation or one whose token
+    history is identical. Each entry keeps the reply text and its token
+    ids so a hit can extend the conversation exactly as a generated reply
+    would.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, user_input, history_ids, model_name='', deterministic=False):
+        mode = 'greedy' if deterministic else 'sampled'
+        return (model_name, mode, history_hash(history_ids), normalize_query(user_input))
+
+    @staticmethod
+    def entry_size(key, text, token_ids):
+        return sum(len(part) for part in key) + len(text.encode('utf-8')) + 8 * len(token_ids) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, key):
+        """Return (text, token_ids) for a live entry, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            text, token_ids, stored_at, size = entry
+            if time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                self.current_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return text, token_ids
+
+    def put(self, key, text, token_ids, stored_at=None):
+        token_ids = list(token_ids)
+        size = self.entry_size(key, text, token_ids)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[3]
+
+            self.entries[key] = (text, token_ids, stored_at or time.time(), size)
+            self.current_bytes += size
+
+            while len(self.entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= evicted[3]
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def save(self, path):
+        """Write live entries to a JSON file, oldest first"""
+        now = time.time()
+        with self.lock:
+            records = [
+                {'model': key[0], 'mode': key[1], 'history': key[2], 'query': key[3],
+                 'text': text, 'token_ids': token_ids, 'stored_at': stored_at}
+                for key, (text, token_ids, stored_at, _) in self.entries.items()
+                if now - stored_at <= self.ttl
+            ]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Preload entries saved by `save`; returns how many were loaded.
+
+        Entries from files written before the model and mode were part of
+        the key are skipped, since there is no telling which produced them.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+
+        now = time.time()
+        loaded = 0
+        for record in records:
+            if now - record['stored_at'] > self.ttl or 'model' not in record:
+                continue
+            key = (record['model'], record['mode'], record['history'], record['query'])
+            self.put(key, record['text'], record['token_ids'], stored_at=record['stored_at'])
+            loaded += 1
+        return loaded
@@ -0,0 +1,306 @@
+"""
+Session Store
+Conversation histories of many sessions kept as compact token arrays:
+recently active ones in an LRU memory tier bounded in bytes, the rest
+spilled to a memory-mapped file that survives restarts
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+
+DEFAULT_SESSION_MEMORY_BYTES = 32 * 1024 * 1024
+
+# Sessions idle this long are spilled to disk even when memory is not full
+DEFAULT_SESSION_IDLE_SECONDS = 300
+
+# Dictionary slot, array header and bookkeeping per in-memory session
+ENTRY_OVERHEAD_BYTES = 200
+
+# The file is rewritten once dead records outweigh live ones (and this much)
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# Rehydration times kept for the latency percentiles
+LATENCY_SAMPLES = 1024
+
+# Record: last active (unix time), token count, session id length, typecode;
+# then the UTF-8 session id and the tokens. A '-' typecode deletes the session.
+RECORD_HEADER = struct.Struct('<dIHc')
+DELETED = '-'
+
+
+def to_array(history_ids):
+    """(1, n) history tensor -> token array: uint16 when every id fits (DialoGPT's 50k vocabulary does), else int32"""
+    import torch
+
+    ids = history_ids[0]
+    if ids.numel() and int(ids.max()) < 65536:
+        # int16 keeps the low 16 bits, which read back as uint16 are the ids
+        return array('H', ids.to(torch.int16).numpy().tobytes())
+    return array('i', ids.to(torch.int32).numpy().tobytes())
+
+
+def to_tensor(tokens):
+    """Compact token array -> (1, n) int64 history tensor"""
+    import torch
+
+    if tokens.typecode == 'H':
+        ids = torch.frombuffer(bytearray(tokens.tobytes()), dtype=torch.int16).long() & 0xFFFF
+    else:
+        ids = torch.frombuffer(bytearray(tokens.tobytes()), dtype=torch.int32).long()
+    return ids.unsqueeze(0)
+
+
+def write_record(f, offset, session_id, typecode, tokens, last_active):
+    """Write one record at offset; returns the new end and its (offset, count, typecode, last active, size)"""
+    encoded = session_id.encode('utf-8')
+    header = RECORD_HEADER.pack(last_active, len(tokens), len(encoded), typecode.encode())
+    f.seek(offset)
+    f.write(header + encoded + tokens.tobytes())
+    size = len(header) + len(encoded) + len(tokens) * tokens.itemsize
+    return offset + size, (offset + len(header) + len(encoded), len(tokens), typecode, last_active, size)
+
+
+class SessionStore:
+    """Thread-safe two-tier store of session histories.
+
+    The memory tier is an LRU of token arrays (2 bytes a token for
+    DialoGPT) kept within max_memory_bytes; the least recently used
+    sessions are written to an append-only file and read back through
+    mmap when their next message arrives. Sessions only in memory are
+    written out by `flush` and `close`, so a clean shutdown keeps every
+    history. Without a path the file is temporary and nothing persists.
+    """
+
+    def __init__(self, path=None, max_memory_bytes=DEFAULT_SESSION_MEMORY_BYTES):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        if path is None:
+            self.file = tempfile.TemporaryFile()
+        else:
+            self.file = open(path, 'a+b')
+        self.map = None
+
+        self.memory = OrderedDict()    # session id -> [tokens, last active, dirty]
+        self.memory_bytes = 0
+        self.disk = {}                 # session id -> (offset, count, typecode, last active, record size)
+        self.live_disk_bytes = 0
+        self.lock = threading.Lock()
+
+        self.spills = 0
+        self.rehydrations = deque(maxlen=LATENCY_SAMPLES)
+        self.compactions = 0
+
+        start = time.perf_counter()
+        self.end = self.scan()
+        self.open_seconds = time.perf_counter() - start
+
+    def scan(self):
+        """Index the records already in the file; a torn last record is cut off"""
+        size = self.file.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+
+        data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = 0
+        try:
+            while offset + RECORD_HEADER.size <= size:
+                last_active, count, id_length, typecode = RECORD_HEADER.unpack_from(data, offset)
+                typecode = typecode.decode('latin-1')
+                if typecode not in ('H', 'i', DELETED):
+                    break
+                id_end = offset + RECORD_HEADER.size + id_length
+                item_size = 0 if typecode == DELETED else array(typecode).itemsize
+                record_end = id_end + count * item_size
+                if record_end > size:
+                    break
+                session_id = data[offset + RECORD_HEADER.size:id_end].decode('utf-8')
+                self.forget_disk(session_id)
+                if typecode != DELETED:
+                    self.disk[session_id] = (id_end, count, typecode, last_active, record_end - offset)
+                    self.live_disk_bytes += record_end - offset
+                offset = record_end
+        finally:
+            data.close()
+
+        if offset < size:
+            self.file.truncate(offset)
+        return offset
+
+    @staticmethod
+    def entry_size(tokens):
+        return len(tokens) * tokens.itemsize + ENTRY_OVERHEAD_BYTES
+
+    def get(self, session_id):
+        """The session's history as a (1, n) tensor, or None for a new or reset session"""
+        with self.lock:
+            entry = self.memory.get(session_id)
+            if entry is not None:
+                self.memory.move_to_end(session_id)
+                entry[1] = time.time()
+                return to_tensor(entry[0])
+
+            record = self.disk.get(session_id)
+            if record is None:
+                return None
+            start = time.perf_counter()
+            tokens = self.read(record)
+            history = to_tensor(tokens)
+            self.rehydrations.append(time.perf_counter() - start)
+            self.remember(session_id, tokens, time.time(), dirty=False)
+            return history
+
+    def put(self, session_id, history_ids):
+        """Store the session's history after a turn (None forgets it)"""
+        if history_ids is None or history_ids.shape[-1] == 0:
+            self.delete(session_id)
+            return
+        tokens = to_array(history_ids)
+        with self.lock:
+            self.remember(session_id, tokens, time.time(), dirty=True)
+
+    def delete(self, session_id):
+        with self.lock:
+            entry = self.memory.pop(session_id, None)
+            if entry is not None:
+                self.memory_bytes -= self.entry_size(entry[0])
+            if session_id in self.disk:
+                self.append(session_id, DELETED, array('H'), time.time())
+                self.forget_disk(session_id)
+
+    def remember(self, session_id, tokens, last_active, dirty):
+        """Put a history in the memory tier, spilling the least recently used past the limit"""
+        old = self.memory.pop(session_id, None)
+        if old is not None:
+            self.memory_bytes -= self.entry_size(old[0])
+        self.memory[session_id] = [tokens, last_active, dirty]
+        self.memory_bytes += self.entry_size(tokens)
+
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            self.spill_entry(next(iter(self.memory)))
+
+    def spill_entry(self, session_id):
+        tokens, last_active, dirty = self.memory.pop(session_id)
+        self.memory_bytes -= self.entry_size(tokens)
+        if dirty or session_id not in self.disk:
+            self.forget_disk(session_id)
+            self.append(session_id, tokens.typecode, tokens, last_active)
+        self.spills += 1
+
+    def spill_idle(self, idle_seconds=DEFAULT_SESSION_IDLE_SECONDS):
+        """Move sessions idle longer than idle_seconds to disk; returns how many"""
+        cutoff = time.time() - idle_seconds
+        with self.lock:
+            idle = [session_id for session_id, entry in self.memory.items() if entry[1] < cutoff]
+            for session_id in idle:
+                self.spill_entry(session_id)
+            self.maybe_compact()
+        return len(idle)
+
+    def expire(self, ttl):
+        """Forget sessions, in memory or on disk, idle longer than ttl seconds"""
+        cutoff = time.time() - ttl
+        with self.lock:
+            for session_id in [s for s, entry in self.memory.items() if entry[1] < cutoff]:
+                self.memory_bytes -= self.entry_size(self.memory.pop(session_id)[0])
+            for session_id in [s for s, record in self.disk.items() if record[3] < cutoff]:
+                if session_id not in self.memory:
+                    self.append(session_id, DELETED, array('H'), time.time())
+                    self.forget_disk(session_id)
+
+    def flush(self):
+        """Write every history changed in memory to the file"""
+        with self.lock:
+            for session_id, entry in self.memory.items():
+                tokens, last_active, dirty = entry
+                if dirty:
+                    self.forget_disk(session_id)
+                    self.append(session_id, tokens.typecode, tokens, last_active)
+                    entry[2] = False
+            self.file.flush()
+            self.maybe_compact()
+
+    def append(self, session_id, typecode, tokens, last_active):
+        self.end, record = write_record(self.file, self.end, session_id, typecode, tokens, last_active)
+        if typecode != DELETED:
+            self.disk[session_id] = record
+            self.live_disk_bytes += record[4]
+
+    def forget_disk(self, session_id):
+        record = self.disk.pop(session_id, None)
+        if record is not None:
+            self.live_disk_bytes -= record[4]
+
+    def read(self, record):
+        offset, count, typecode, _, _ = record
+        tokens = array(typecode)
+        end = offset + count * tokens.itemsize
+        if self.map is None or len(self.map) < end:
+            self.file.flush()
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        tokens.frombytes(self.map[offset:end])
+        return tokens
+
+    def maybe_compact(self):
+        """Rewrite the file with only live records once dead ones dominate it"""
+        dead = self.end - self.live_disk_bytes
+        if dead < max(self.live_disk_bytes, COMPACT_MIN_BYTES):
+            return
+
+        tmp_path = None if self.path is None else f"{self.path}.tmp"
+        compacted = tempfile.TemporaryFile() if tmp_path is None else open(tmp_path, 'w+b')
+        disk = {}
+        end = 0
+        for session_id, record in self.disk.items():
+            end, disk[session_id] = write_record(compacted, end, session_id, record[2], self.read(record), record[3])
+        compacted.flush()
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+        if tmp_path is not None:
+            os.replace(tmp_path, self.path)
+        self.file = compacted
+        self.disk = disk
+        self.end = end
+        self.live_disk_bytes = end
+        self.compactions += 1
+
+    def stats(self):
+        with self.lock:
+            on_disk = [session_id for session_id in self.disk if session_id not in self.memory]
+            rehydrations = sorted(self.rehydrations)
+            stats = {
+                'sessions_in_memory': len(self.memory),
+                'sessions_on_disk': len(on_disk),
+                'memory_bytes': self.memory_bytes,
+                'memory_limit_bytes': self.max_memory_bytes,
+                'bytes_per_session': self.memory_bytes / len(self.memory) if self.memory else 0,
+                'disk_bytes': self.end,
+                'spills': self.spills,
+                'compactions': self.compactions,
+                'rehydrations': len(rehydrations),
+            }
+            if rehydrations:
+                stats['rehydrate_ms'] = {
+                    'p50': rehydrations[len(rehydrations) // 2] * 1000,
+                    'p95': rehydrations[int((len(rehydrations) - 1) * 0.95)] * 1000,
+                }
+            return stats
+
+    def close(self):
+        """Flush and close; the file keeps every session for the next start"""
+        self.flush()
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.file.close()
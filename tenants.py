@@ -0,0 +1,231 @@
+"""
+Tenants
+Many colleges behind one loaded model: each tenant has its own knowledge
+base index and college name, requests are routed by tenant id, and tenants
+can be loaded and unloaded while the server runs
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from collections import deque
+
+from kb_retriever import DEFAULT_RETRIEVAL_THRESHOLD
+from kb_store import (COLLEGE_PLACEHOLDER, DEFAULT_KB_PATH, DEFAULT_WATCH_INTERVAL, KnowledgeBaseWatcher,
+                      load_index, source_digest)
+
+# Requests without a tenant id go to the tenant with this id, if there is one
+DEFAULT_TENANT = 'default'
+
+# Tenant ids prefix session ids as "<tenant_id>:<session_id>", so they
+# may not contain ':' themselves
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+# Latencies kept per tenant and source for the percentiles
+LATENCY_SAMPLES = 1024
+
+
+def render(template, college_name):
+    return template.replace(COLLEGE_PLACEHOLDER, college_name)
+
+
+class Tenant:
+    """One college: its knowledge base index, its rendered responses and its stats.
+
+    The index holds response templates; a category's response is rendered
+    for this college the first time it is served and then reused. The
+    index and its rendered responses are swapped together as one tuple on
+    a reload, so a lookup never renders a category from the other index.
+    """
+
+    def __init__(self, tenant_id, college_name, kb_path, index):
+        self.tenant_id = tenant_id
+        self.college_name = college_name
+        self.kb_path = kb_path
+        self.state = (index, {})
+        self.loaded_at = time.time()
+
+        self.lock = threading.Lock()
+        self.counts = {'kb': 0, 'ai': 0}
+        self.latencies = {source: deque(maxlen=LATENCY_SAMPLES) for source in self.counts}
+
+    @property
+    def index(self):
+        return self.state[0]
+
+    def swap_index(self, index):
+        """Publish a reloaded index; lookups in flight finish against the old one"""
+        self.state = (index, {})
+
+    def response(self, category, state=None):
+        index, rendered = state or self.state
+        text = rendered.get(category)
+        if text is None:
+            text = rendered[category] = render(index.knowledge_base[category]['response'], self.college_name)
+        return text
+
+    def find_answer(self, user_input, turn=None):
+        """Search this tenant's knowledge base: compiled keyword index, then TF-IDF retrieval"""
+        state = self.state
+        if turn is None:
+            category = state[0].find_category(user_input)
+        else:
+            with turn.span('find_answer'):
+                category = state[0].find_category(user_input)
+            turn.set_category(category)
+        return None if category is None else self.response(category, state)
+
+    def nearest_answer(self, user_input):
+        return render(self.index.nearest_answer(user_input), self.college_name)
+
+    def record(self, source, seconds):
+        """Count one answered message from 'kb' or 'ai' and its latency"""
+        with self.lock:
+            self.counts[source] += 1
+            self.latencies[source].append(seconds)
+
+    def stats(self):
+        with self.lock:
+            stats = {
+                'college_name': self.college_name,
+                'topics': len(self.index.knowledge_base),
+                'loaded_at': self.loaded_at,
+                'kb_hits': self.counts['kb'],
+                'ai_replies': self.counts['ai'],
+            }
+            for source, samples in self.latencies.items():
+                if samples:
+                    ordered = sorted(samples)
+                    stats[f'{source}_latency_ms'] = {
+                        'p50': ordered[len(ordered) // 2] * 1000,
+                        'p95': ordered[int((len(ordered) - 1) * 0.95)] * 1000,
+                    }
+            return stats
+
+
+class TenantRegistry:
+    """Tenants by id, loadable and unloadable at runtime.
+
+    Each tenant gets the compiled index of its own knowledge base file,
+    built with templates so it does not depend on the college name;
+    tenants whose files have identical contents share one index.
+    Knowledge base files must be the bundled one or live under kb_dir.
+
+    Each file in use has a KnowledgeBaseWatcher; `watch` polls them all
+    from one thread and a changed file is recompiled and swapped into
+    every tenant using it, as the single-college server does.
+    """
+
+    def __init__(self, kb_dir=None, retrieval_threshold=DEFAULT_RETRIEVAL_THRESHOLD):
+        self.kb_dir = os.path.realpath(kb_dir or os.path.dirname(DEFAULT_KB_PATH))
+        self.retrieval_threshold = retrieval_threshold
+        self.tenants = {}
+        self.indexes = weakref.WeakValueDictionary()
+        self.watchers = {}
+        self.reloads = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __len__(self):
+        return len(self.tenants)
+
+    def resolve(self, kb_file):
+        """Path of a knowledge base file: the bundled one or one under kb_dir"""
+        path = os.path.realpath(os.path.join(self.kb_dir, kb_file))
+        if path != os.path.realpath(DEFAULT_KB_PATH) and os.path.commonpath([path, self.kb_dir]) != self.kb_dir:
+            raise ValueError(f"Knowledge base '{kb_file}' is outside {self.kb_dir}")
+        return path
+
+    def load(self, tenant_id, college_name, kb_file=DEFAULT_KB_PATH):
+        """Compile (or share) the tenant's index and publish it, replacing any tenant with that id"""
+        if not TENANT_ID_PATTERN.fullmatch(tenant_id):
+            raise ValueError(f"Tenant id '{tenant_id}' must be 1-64 letters, digits, '.', '_' or '-'")
+        kb_path = self.resolve(kb_file)
+        with open(kb_path, 'rb') as f:
+            digest = source_digest(f.read(), None)
+
+        index = self.indexes.get(digest)
+        if index is None:
+            index = load_index(kb_path, None, self.retrieval_threshold)
+            self.indexes[digest] = index
+
+        tenant = Tenant(tenant_id, college_name, kb_path, index)
+        with self.lock:
+            self.tenants[tenant_id] = tenant
+            if kb_path not in self.watchers:
+                self.watchers[kb_path] = KnowledgeBaseWatcher(
+                    kb_path, None, self.retrieval_threshold,
+                    on_reload=lambda new_index: self.swap_index(kb_path, new_index),
+                    on_error=lambda e: print(f"\n⚠️ Knowledge base {kb_path} not reloaded: {e}"),
+                )
+            self.drop_unused_watchers()
+        return tenant
+
+    def unload(self, tenant_id):
+        """Remove a tenant; its index is freed once no other tenant shares it. False if unknown"""
+        with self.lock:
+            unloaded = self.tenants.pop(tenant_id, None) is not None
+            self.drop_unused_watchers()
+            return unloaded
+
+    def drop_unused_watchers(self):
+        in_use = {tenant.kb_path for tenant in self.tenants.values()}
+        for kb_path in [path for path in self.watchers if path not in in_use]:
+            del self.watchers[kb_path]
+
+    def swap_index(self, kb_path, index):
+        """Give every tenant of this knowledge base file its reloaded index"""
+        with self.lock:
+            tenants = [tenant for tenant in self.tenants.values() if tenant.kb_path == kb_path]
+            self.reloads += 1
+        for tenant in tenants:
+            tenant.swap_index(index)
+        print(f"\n🔄 Knowledge base {os.path.basename(kb_path)} reloaded for {len(tenants)} tenants: "
+              f"{len(index.knowledge_base)} topics in {index.load_seconds * 1000:.0f} ms")
+
+    def check(self):
+        """Reload every knowledge base file that changed; the number reloaded"""
+        with self.lock:
+            watchers = list(self.watchers.values())
+        return sum(watcher.check() for watcher in watchers)
+
+    def run(self, interval):
+        while not self.stop_event.wait(interval):
+            self.check()
+
+    def watch(self, interval=DEFAULT_WATCH_INTERVAL):
+        """Poll the tenants' knowledge base files on a background thread"""
+        self.thread = threading.Thread(target=self.run, args=(interval,), name="tenant-kb-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get(self, tenant_id):
+        return self.tenants.get(tenant_id or DEFAULT_TENANT)
+
+    def load_config(self, path):
+        """Load every tenant in a JSON file of {tenant_id: {"college_name": ..., "kb_file": ...}}"""
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError(f"{path}: expected a mapping of tenant ids")
+        for tenant_id, entry in config.items():
+            if not isinstance(entry, dict) or not isinstance(entry.get('college_name'), str):
+                raise ValueError(f"{path}: tenant '{tenant_id}' needs a 'college_name'")
+            self.load(str(tenant_id), entry['college_name'], entry.get('kb_file', DEFAULT_KB_PATH))
+        return len(config)
+
+    def stats(self):
+        with self.lock:
+            tenants = list(self.tenants.values())
+        return {
+            'tenants': {tenant.tenant_id: tenant.stats() for tenant in tenants},
+            'indexes': len(self.indexes),
+            'reloads': self.reloads,
+        }
@@ -0,0 +1,59 @@
+"""Batch mode: a failed generate call only loses its own batch"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_queries import BatchRunner
+from kb_store import load_index
+
+
+class FakeBot:
+    model_thread = None
+    reply_deadline = None
+    model = object()
+
+    def __init__(self, index_path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.kb_index = load_index(index_path=index_path)
+
+
+class FailingRunner(BatchRunner):
+    def generate(self, batch):
+        if any(record['message'] == "break the model" for record in batch):
+            raise RuntimeError("CUDA out of memory")
+        for record in batch:
+            record.update(source='ai', response=f"echo: {record['message']}")
+
+
+class BatchErrorTest(unittest.TestCase):
+    def test_failed_batch_is_reported_and_the_run_continues(self):
+        lines = ["what are the hostel fees", "tell me a joke", "break the model", "recommend a movie",
+                 "what courses do you offer"]
+        with tempfile.TemporaryDirectory() as directory:
+            in_path = os.path.join(directory, 'in.jsonl')
+            out_path = os.path.join(directory, 'out.jsonl')
+            with open(in_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(line) + '\n' for line in lines)
+
+            runner = FailingRunner(FakeBot(os.path.join(directory, 'kb.idx')), chunk_size=2, generate_batch=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                counts = runner.run(in_path, out_path)
+            with open(out_path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual([record['message'] for record in records], lines)
+        self.assertEqual([record['source'] for record in records], ['kb', 'ai', 'error', 'ai', 'kb'])
+        self.assertIn("CUDA out of memory", records[2]['error'])
+        self.assertIsNone(records[2]['response'])
+        self.assertEqual(counts, {'kb': 2, 'ai': 2, 'miss': 0, 'error': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Inference pool: a slot is clean after an interrupted request, and large batches are split"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from chat_engine import TRANSFORMERS_AVAILABLE
+
+
+class StopReading(Exception):
+    pass
+
+
+class RaisingStreamer:
+    """Streamer whose consumer gives up after a few tokens, like a client that disconnects"""
+
+    def __init__(self, after_tokens):
+        self.after_tokens = after_tokens
+        self.calls = 0
+
+    def put(self, value):
+        self.calls += 1
+        # The first call is the prompt
+        if self.calls > self.after_tokens:
+            raise StopReading()
+
+    def end(self):
+        pass
+
+
+@unittest.skipUnless(TRANSFORMERS_AVAILABLE, "transformers is not installed")
+class InferencePoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from inference_pool import InferencePool
+        from stand_in_model import load_stand_in_model
+
+        cls.tokenizer, cls.model = load_stand_in_model()
+        # One worker, so every request lands on the same slot
+        cls.pool = InferencePool(load_stand_in_model, workers=1, threads_per_worker=1, max_new_tokens=24)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def generate(self, model, user_input, streamer=None):
+        input_ids = self.tokenizer.encode(user_input + self.tokenizer.eos_token, return_tensors='pt')
+        # The stand-in's greedy reply would otherwise end at once
+        return model.generate(input_ids, max_new_tokens=24, min_new_tokens=24, do_sample=False,
+                              pad_token_id=self.tokenizer.eos_token_id, streamer=streamer)
+
+    def test_next_request_is_clean_after_the_streamer_raises(self):
+        with self.assertRaises(StopReading):
+            self.generate(self.pool.model, "tell me about the hostel", RaisingStreamer(after_tokens=3))
+
+        expected = self.generate(self.model, "what are the library timings")
+        self.assertTrue(self.generate(self.pool.model, "what are the library timings").equal(expected))
+
+    def test_batch_larger_than_the_worker_buffers(self):
+        import torch
+        from inference_pool import MAX_BATCH_ROWS
+
+        prompts = [self.tokenizer.encode(f"question {'number ' * i}{i} about fees" + self.tokenizer.eos_token)
+                   for i in range(MAX_BATCH_ROWS + 3)]
+        length = max(len(prompt) for prompt in prompts)
+        input_ids = torch.full((len(prompts), length), self.tokenizer.eos_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(prompts), length), dtype=torch.long)
+        for row, prompt in enumerate(prompts):
+            input_ids[row, length - len(prompt):] = torch.tensor(prompt)
+            attention_mask[row, length - len(prompt):] = 1
+
+        outputs = [model.generate(input_ids, attention_mask=attention_mask, max_new_tokens=24, min_new_tokens=4,
+                                  do_sample=False, pad_token_id=self.tokenizer.eos_token_id)
+                   for model in (self.model, self.pool.model)]
+        self.assertEqual(outputs[1].shape[0], len(prompts))
+        self.assertTrue(outputs[1].equal(outputs[0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Keyword matching: exact keywords, inflections and typo correction"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_matcher import KeywordMatcher
+from kb_store import DEFAULT_KB_PATH, parse_knowledge_base
+
+
+def bundled_matcher():
+    with open(DEFAULT_KB_PATH, 'rb') as f:
+        return KeywordMatcher(parse_knowledge_base(f.read(), DEFAULT_KB_PATH, "Amity University"))
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = bundled_matcher()
+
+    def test_misspelled_keywords_are_corrected(self):
+        cases = {
+            "hostle rooms": 'hostel',
+            "scholarshp": 'scholarship',
+            "placemnt details": 'placement',
+            "libary hours": 'library',
+            "examinaton schedule": 'exam',
+        }
+        for query, category in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.matcher.match(query), category)
+
+    def test_inflections_of_keywords_match(self):
+        cases = {
+            "when do results come out": 'result',
+            "are there any jobs": 'placement',
+            "hostel rooms": 'hostel',
+            "what are the costs": 'fees',
+        }
+        for query, category in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.matcher.match(query), category)
+
+    def test_removed_misspellings_still_match(self):
+        cases = {
+            "helo": 'greetings',
+            "this is a test": 'exam',
+            "when is my test": 'exam',
+        }
+        for query, category in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.matcher.match(query), category)
+
+    def test_real_words_are_not_corrected_into_keywords(self):
+        for query in ("how do you feel", "feed me", "text me later", "regarding the weather",
+                      "the coast is clear", "his car", "prime time", "the pride of the team",
+                      "boots and shoes", "grave mistake"):
+            with self.subTest(query=query):
+                self.assertIsNone(self.matcher.match(query))
+
+    def test_ambiguous_corrections_are_dropped(self):
+        knowledge_base = {
+            'timetable': {'keywords': ['lecture'], 'response': "Classes run 9 to 4."},
+            'faculty': {'keywords': ['lecturer'], 'response': "Office hours are weekly."},
+        }
+        matcher = KeywordMatcher(knowledge_base)
+        self.assertIsNone(matcher.match("lecturre"))
+        self.assertEqual(matcher.match("lecturrer"), 'faculty')
+
+    def test_words_from_the_responses_are_not_corrected(self):
+        knowledge_base = {
+            'timetable': {'keywords': ['lecture', 'timetable'], 'response': "Lectures run 9 to 4."},
+            'faculty': {'keywords': ['faculty'], 'response': "Every lecturer has weekly office hours."},
+        }
+        matcher = KeywordMatcher(knowledge_base)
+        self.assertIsNone(matcher.match("who is my lecturer"))
+        self.assertEqual(matcher.match("lectre timings"), 'timetable')
+
+
+if __name__ == '__main__':
+    unittest.main()
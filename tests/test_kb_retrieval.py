@@ -0,0 +1,76 @@
+"""TF-IDF retrieval tier: off-topic queries are left to the model"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_retriever import NUMPY_AVAILABLE
+from kb_store import load_index
+
+LABELLED_QUERIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'benchmarks', 'data', 'labelled_queries.jsonl')
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy is not installed")
+class RetrievalThresholdTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.kb_index = load_index(index_path=os.path.join(cls.directory, 'kb.idx'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_off_topic_queries_are_not_routed(self):
+        for query in ("what do you think about life", "feeling good", "is there a bus to the campus",
+                      "how big is the campus", "good night"):
+            with self.subTest(query=query):
+                self.assertIsNone(self.kb_index.find_category(query))
+
+    def test_close_paraphrase_is_still_routed(self):
+        self.assertEqual(self.kb_index.find_category("infra of the campus"), 'facilities')
+
+    def test_precision_on_labelled_queries(self):
+        with open(LABELLED_QUERIES, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        answered = [(record['category'], self.kb_index.retriever.match(record['query']))
+                    for record in records if self.kb_index.matcher.match(record['query']) is None]
+        answered = [(expected, category) for expected, category in answered if category is not None]
+        correct = sum(expected == category for expected, category in answered)
+        self.assertGreaterEqual(correct, 0.9 * len(answered))
+
+    def test_find_categories_matches_find_category(self):
+        with open(LABELLED_QUERIES, encoding='utf-8') as f:
+            queries = [json.loads(line)['query'] for line in f if line.strip()]
+        self.assertEqual(self.kb_index.find_categories(queries),
+                         [self.kb_index.find_category(query) for query in queries])
+
+    def test_batch_scores_match_a_dense_product(self):
+        import numpy as np
+
+        retriever = self.kb_index.retriever
+        documents = np.zeros((len(retriever.categories), len(retriever.vocabulary)), dtype=np.float32)
+        for column in range(len(retriever.vocabulary)):
+            start, end = retriever.column_starts[column], retriever.column_starts[column + 1]
+            documents[retriever.rows[start:end], column] = retriever.weights[start:end]
+
+        queries = ["hostel fees", "", "zzzz", "library timings and books", "infra of the campus"]
+        expected = np.zeros((len(queries), len(retriever.vocabulary)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            columns, weights = retriever.vectorize(query)
+            expected[row, columns] = weights
+
+        np.testing.assert_allclose(retriever.scores(queries), expected @ documents.T, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Compiled knowledge base artifacts"""
+
+import contextlib
+import io
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_store import load_index, write_index
+
+
+class WriteIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.index = load_index(index_path=os.path.join(self.directory, 'kb.idx'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_devnull_writes_nothing(self):
+        before = os.stat(os.devnull)
+        self.assertEqual(write_index(self.index, b'\0' * 32, os.devnull), 0)
+        after = os.stat(os.devnull)
+        self.assertEqual(stat.S_IFMT(after.st_mode), stat.S_IFMT(before.st_mode))
+        self.assertEqual(after.st_ino, before.st_ino)
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), "needs os.mkfifo")
+    def test_special_files_are_not_replaced(self):
+        path = os.path.join(self.directory, 'pipe.idx')
+        os.mkfifo(path)
+        with self.assertRaises(OSError):
+            write_index(self.index, b'\0' * 32, path)
+        self.assertTrue(stat.S_ISFIFO(os.stat(path).st_mode))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['kb.idx', 'pipe.idx'])
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), "needs os.mkfifo")
+    def test_load_index_keeps_going_when_the_artifact_cannot_be_written(self):
+        path = os.path.join(self.directory, 'pipe.idx')
+        os.mkfifo(path)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            index = load_index(index_path=path)
+        self.assertIsNotNone(index.find_category("hostel fees"))
+        self.assertIn("Could not write", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Prometheus file sink throttling"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Metrics, PrometheusFileSink
+
+
+def kb_hits_in(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('chatbot_kb_hits_total{category="fees"}'):
+                return int(line.split()[-1])
+    return 0
+
+
+class PrometheusFileSinkTest(unittest.TestCase):
+    def test_turns_after_a_burst_reach_the_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chatbot.prom')
+            sink = PrometheusFileSink(path, interval=0.2)
+            metrics = Metrics([sink])
+            for _ in range(5):
+                turn = metrics.start_turn('server')
+                turn.set_category('fees')
+                turn.finish()
+
+            # Only the first turn of the burst is written straight away
+            self.assertEqual(kb_hits_in(path), 1)
+            time.sleep(0.5)
+            self.assertEqual(kb_hits_in(path), 5)
+            self.assertIsNone(sink.pending)
+            metrics.close()
+
+    def test_close_writes_and_cancels_the_catch_up(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chatbot.prom')
+            sink = PrometheusFileSink(path, interval=60)
+            metrics = Metrics([sink])
+            for _ in range(2):
+                turn = metrics.start_turn('cli')
+                turn.set_category('fees')
+                turn.finish()
+            self.assertIsNotNone(sink.pending)
+
+            metrics.close()
+            self.assertIsNone(sink.pending)
+            self.assertEqual(kb_hits_in(path), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""ONNX export parity with the eager model (runs when onnxruntime is installed)"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from chat_engine import TRANSFORMERS_AVAILABLE
+
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+
+
+@unittest.skipUnless(TRANSFORMERS_AVAILABLE and ONNXRUNTIME_AVAILABLE, "needs transformers and onnxruntime")
+class OnnxParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from onnx_backend import export_onnx, load_onnx_model
+        from stand_in_model import load_stand_in_model
+
+        cls.tokenizer, cls.eager = load_stand_in_model()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.eager.config.save_pretrained(cls.directory.name)
+        export_onnx(cls.eager, cls.directory.name)
+        cls.onnx = load_onnx_model(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def encode(self, text):
+        return self.tokenizer.encode(text + self.tokenizer.eos_token, return_tensors='pt')
+
+    def test_logits_match_with_and_without_a_kv_cache(self):
+        import torch
+
+        input_ids = self.encode("what are the hostel fees")
+        with torch.no_grad():
+            eager = self.eager(input_ids, use_cache=True)
+            onnx = self.onnx(input_ids, use_cache=True)
+            torch.testing.assert_close(onnx.logits, eager.logits, atol=1e-4, rtol=1e-4)
+
+            step = input_ids[:, -1:]
+            eager_step = self.eager(step, past_key_values=eager.past_key_values, use_cache=True)
+            onnx_step = self.onnx(step, past_key_values=onnx.past_key_values, use_cache=True)
+            torch.testing.assert_close(onnx_step.logits, eager_step.logits, atol=1e-4, rtol=1e-4)
+
+    def test_greedy_tokens_match(self):
+        from onnx_backend import greedy_parity
+
+        for prompt in ("tell me about placements", "hello there"):
+            input_ids = self.encode(prompt)
+            # The stand-in's greedy reply would otherwise end at once
+            sequences = [model.generate(input_ids, max_new_tokens=16, min_new_tokens=16, do_sample=False,
+                                        pad_token_id=self.tokenizer.eos_token_id)
+                         for model in (self.eager, self.onnx)]
+            self.assertTrue(sequences[1].equal(sequences[0]), prompt)
+        self.assertEqual(greedy_parity(self.eager, self.onnx, self.tokenizer), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Response cache keys and persistence"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+    def test_mode_and_model_are_part_of_the_key(self):
+        cache = ResponseCache()
+        cache.put(cache.key("Hostel fees?", None, 'microsoft/DialoGPT-medium', deterministic=False), "sampled", [1])
+
+        self.assertIsNone(cache.get(cache.key("hostel fees", None, 'microsoft/DialoGPT-medium', deterministic=True)))
+        self.assertIsNone(cache.get(cache.key("hostel fees", None, 'microsoft/DialoGPT-small', deterministic=False)))
+        self.assertEqual(cache.get(cache.key("hostel fees", None, 'microsoft/DialoGPT-medium')), ("sampled", [1]))
+
+    def test_saved_keys_round_trip(self):
+        cache = ResponseCache()
+        key = cache.key("library timings", None, 'models/dialogpt-small', deterministic=True)
+        cache.put(key, "9 to 5", [4, 5])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.json')
+            cache.save(path)
+            reloaded = ResponseCache()
+            self.assertEqual(reloaded.load(path), 1)
+        self.assertEqual(reloaded.get(key), ("9 to 5", [4, 5]))
+        self.assertIsNone(reloaded.get(cache.key("library timings", None, 'models/dialogpt-small')))
+
+    def test_files_without_model_and_mode_are_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.json')
+            with open(path, 'w') as f:
+                json.dump([{'history': '', 'query': "hi", 'text': "hello", 'token_ids': [1],
+                            'stored_at': 4102444800}], f)
+            cache = ResponseCache()
+            self.assertEqual(cache.load(path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""HTTP request parsing of the chat server"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_server import MAX_BODY_BYTES, ChatServer
+
+
+class ContentLengthTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = ChatServer(kb_only=True, watch_kb=False)
+        self.listener = await asyncio.start_server(self.server.handle_connection, '127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.executor.shutdown()
+
+    async def request(self, content_length, body=b''):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(f"POST /chat HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        response = await reader.read()
+        writer.close()
+        return int(status_line.split()[1]), json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+    async def test_malformed_length_is_rejected(self):
+        for value in ('abc', '-5', '1.5', '²'):
+            status, result = await self.request(value)
+            self.assertEqual(status, 400, value)
+            self.assertIn('error', result)
+
+    async def test_oversized_length_is_rejected(self):
+        status, _ = await self.request(str(MAX_BODY_BYTES + 1))
+        self.assertEqual(status, 413)
+
+    async def test_valid_length_is_served(self):
+        body = json.dumps({'message': "hostel fees"}).encode('utf-8')
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(f"POST /chat HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        self.assertIn(b' 200 ', await reader.readline())
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Tenant ids and knowledge base reloads"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_store import DEFAULT_KB_PATH
+from tenants import TenantRegistry
+
+
+class TenantRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.kb_path = os.path.join(self.directory, 'kb.json')
+        shutil.copy(DEFAULT_KB_PATH, self.kb_path)
+        self.registry = TenantRegistry(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self, tenant_id, college_name, kb_file):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.registry.load(tenant_id, college_name, kb_file)
+
+    def test_tenant_ids_cannot_contain_the_session_separator(self):
+        for tenant_id in ("a:b", "", "delhi campus", "x" * 65):
+            with self.subTest(tenant_id=tenant_id):
+                with self.assertRaises(ValueError):
+                    self.load(tenant_id, "Delhi College", 'kb.json')
+        self.assertEqual(len(self.registry), 0)
+
+    def test_changed_file_is_reloaded_for_its_tenants(self):
+        delhi = self.load('delhi', "Delhi College", 'kb.json')
+        pune = self.load('pune', "Pune College", 'kb.json')
+        bundled = self.load('bundled', "Bundled College", DEFAULT_KB_PATH)
+        self.assertIsNone(delhi.find_answer("canteen"))
+
+        with open(self.kb_path, encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+        knowledge_base['canteen'] = {'keywords': ['canteen'], 'response': "🍽️ The {college_name} canteen opens at 8."}
+        with open(self.kb_path, 'w', encoding='utf-8') as f:
+            json.dump(knowledge_base, f)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(self.kb_path)
+        os.utime(self.kb_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.registry.check(), 1)
+        self.assertEqual(delhi.find_answer("canteen"), "🍽️ The Delhi College canteen opens at 8.")
+        self.assertEqual(pune.find_answer("canteen"), "🍽️ The Pune College canteen opens at 8.")
+        self.assertIsNone(bundled.find_answer("canteen"))
+        self.assertEqual(self.registry.stats()['reloads'], 1)
+
+    def test_unloading_the_last_tenant_of_a_file_stops_watching_it(self):
+        self.load('delhi', "Delhi College", 'kb.json')
+        self.assertIn(self.kb_path, self.registry.watchers)
+        self.registry.unload('delhi')
+        self.assertEqual(self.registry.watchers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
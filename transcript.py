@@ -0,0 +1,245 @@
+"""
+Transcript
+Bounded chat transcript for the GUI: the Text widget keeps only the most
+recent messages, older ones are paged out to an on-disk log and read back
+when the user scrolls to the top, and bursts of updates are drawn together
+once per frame
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import tkinter as tk
+from array import array
+from datetime import datetime
+
+DEFAULT_MAX_MESSAGES = 200
+
+# Older messages read back from the log per scroll to the top
+PAGE_MESSAGES = 50
+
+# Queued updates are drawn at most once per frame (~60 fps)
+FRAME_MS = 16
+
+SENDER_LABELS = {'user': "You: ", 'bot': "🤖 Bot: "}
+
+
+class TranscriptLog:
+    """Append-only JSON-lines log of finished messages, readable by message number.
+
+    Only the byte offset of each line is kept in memory (8 bytes a message).
+    Without a path the log is a temporary file removed on close; with one,
+    this session's messages are appended after whatever the file holds.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            self.file = tempfile.TemporaryFile()
+        else:
+            self.file = open(path, 'a+b')
+        self.end = self.file.seek(0, os.SEEK_END)
+        self.offsets = array('q')
+        self.reading = False
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        if self.reading:
+            self.file.seek(self.end)
+            self.reading = False
+        self.offsets.append(self.end)
+        self.file.write(line)
+        self.end += len(line)
+
+    def read(self, start, stop):
+        """Records start..stop-1, oldest first"""
+        self.reading = True
+        self.file.seek(self.offsets[start])
+        return [json.loads(self.file.readline()) for _ in range(start, stop)]
+
+    def close(self):
+        self.file.close()
+
+
+class Transcript:
+    """Chat messages drawn into a Text widget, at most max_messages at a time.
+
+    add_message, start_stream, stream_text and finish_stream can be called
+    from any thread: they only queue the change, and everything queued is
+    drawn on the Tk thread in one redraw per frame. Each message starts at
+    a mark named m<number>, so trimming and paging are single deletes and
+    inserts however long the session gets.
+    """
+
+    def __init__(self, root, text, max_messages=DEFAULT_MAX_MESSAGES, log_path=None, frame_ms=FRAME_MS):
+        self.root = root
+        self.text = text
+        self.max_messages = max_messages
+        self.frame_ms = frame_ms
+        self.log = TranscriptLog(log_path)
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.redraw_scheduled = False
+        self.page_scheduled = False
+
+        self.count = 0        # messages started so far
+        self.first = 0        # number of the oldest message in the widget
+        self.unlogged = []    # finished messages waiting for the streamed reply before them
+        self.stream = None    # (number, time, parts) of the reply being streamed
+
+        self.redraws = 0
+        self.redraw_seconds = 0.0
+
+        # ScrolledText wires its scrollbar through yscrollcommand; keep it
+        # updated and watch for the view reaching the top
+        self.scrollbar = getattr(text, 'vbar', None)
+        self.text.configure(yscrollcommand=self.on_scroll)
+
+    def add_message(self, sender, message):
+        self.queue(('message', sender, timestamp(), message))
+
+    def start_stream(self):
+        """Open a bot reply whose text arrives through stream_text"""
+        self.queue(('start', timestamp()))
+
+    def stream_text(self, text):
+        self.queue(('text', text))
+
+    def finish_stream(self, text=None):
+        """Close the streamed reply, appending text (if any) to it"""
+        self.queue(('finish', text))
+
+    def queue(self, update):
+        with self.lock:
+            self.pending.append(update)
+            if self.redraw_scheduled:
+                return
+            self.redraw_scheduled = True
+        self.root.after(self.frame_ms, self.redraw)
+
+    def redraw(self):
+        """Draw everything queued since the last frame, then trim the oldest messages"""
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+            self.redraw_scheduled = False
+        if not pending:
+            return
+
+        start = time.perf_counter()
+        self.text.config(state=tk.NORMAL)
+        for update in pending:
+            kind = update[0]
+            if kind == 'message':
+                self.draw_message(*update[1:])
+            elif kind == 'start':
+                self.draw_stream_start(update[1])
+            elif kind == 'text':
+                if self.stream is not None:
+                    self.stream[2].append(update[1])
+                    self.text.insert('stream', update[1], 'bot')
+            else:
+                self.draw_stream_finish(update[1])
+        self.trim()
+        self.text.config(state=tk.DISABLED)
+        self.text.see(tk.END)
+        self.redraws += 1
+        self.redraw_seconds += time.perf_counter() - start
+
+    def insert_message(self, number, sender, time_str, message, index):
+        name = f"m{number}"
+        self.text.mark_set(name, index)
+        self.text.mark_gravity(name, tk.LEFT)
+        self.text.insert(index, f"\n{time_str}\n", "time", f"{SENDER_LABELS[sender]}{message}\n", sender)
+
+    def draw_message(self, sender, time_str, message):
+        number = self.count
+        self.count += 1
+        self.insert_message(number, sender, time_str, message, 'end-1c')
+        self.log_message(number, {'sender': sender, 'time': time_str, 'text': message})
+
+    def draw_stream_start(self, time_str):
+        if self.stream is not None:
+            self.draw_stream_finish(None)
+        number = self.count
+        self.count += 1
+        self.insert_message(number, 'bot', time_str, "", 'end-1c')
+        # Streamed text goes in front of the bubble's closing newline, so
+        # messages sent meanwhile are drawn after the whole reply
+        self.text.mark_set('stream', 'end-2c')
+        self.stream = (number, time_str, [])
+
+    def draw_stream_finish(self, text):
+        if self.stream is None:
+            return
+        number, time_str, parts = self.stream
+        if text:
+            parts.append(text)
+            self.text.insert('stream', text, 'bot')
+        self.text.mark_unset('stream')
+        self.stream = None
+
+        self.log.append({'sender': 'bot', 'time': time_str, 'text': ''.join(parts)})
+        for record in self.unlogged:
+            self.log.append(record)
+        self.unlogged = []
+
+    def log_message(self, number, record):
+        """Log in widget order: messages drawn after an open stream wait for it"""
+        if self.stream is not None and self.stream[0] < number:
+            self.unlogged.append(record)
+        else:
+            self.log.append(record)
+
+    def trim(self):
+        """Drop the oldest messages from the widget; they stay in the log"""
+        drop = min(self.count - self.first - self.max_messages, len(self.log) - self.first)
+        if drop <= 0:
+            return
+        self.text.delete('1.0', f"m{self.first + drop}")
+        for number in range(self.first, self.first + drop):
+            self.text.mark_unset(f"m{number}")
+        self.first += drop
+
+    def on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if float(first) <= 0.0 and float(last) < 1.0 and self.first > 0 and not self.page_scheduled:
+            self.page_scheduled = True
+            self.root.after_idle(self.page_in)
+
+    def page_in(self):
+        """Read the page of messages before the oldest one shown back from the log"""
+        self.page_scheduled = False
+        start = max(0, self.first - PAGE_MESSAGES)
+        if start == self.first:
+            return
+        records = self.log.read(start, self.first)
+
+        top = f"m{self.first}"
+        self.text.config(state=tk.NORMAL)
+        self.text.mark_gravity(top, tk.RIGHT)
+        self.text.mark_set('page', '1.0')
+        self.text.mark_gravity('page', tk.RIGHT)
+        for number, record in enumerate(records, start):
+            self.insert_message(number, record['sender'], record['time'], record['text'], 'page')
+        self.text.mark_unset('page')
+        self.text.mark_gravity(top, tk.LEFT)
+        self.text.config(state=tk.DISABLED)
+
+        # Keep the message the user was looking at in place; the next
+        # redraw trims the paged-in messages again
+        self.first = start
+        self.text.yview(top)
+
+    def close(self):
+        self.log.close()
+
+
+def timestamp():
+    return datetime.now().strftime("%I:%M %p")